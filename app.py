@@ -1,15 +1,23 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-from datetime import datetime
-import google.generativeai as genai
+import streamlit.components.v1 as components
+from datetime import datetime, timedelta
 import json
 import re
-import requests
+from html import escape
 import utils.importers as importers
+from utils.formatting import format_currency
+from services.cache import family_cache
+from services.bulk_writer import BulkWriteError
+from services.parallel import run_parallel
+from services.briefings import briefing_worker, fallback_briefing
+import services.ocr as ocr
+import services.debt_strategy as debt_strategy
+import services.avatars as avatars
+from services.live import live_store
+from services.repository import Repository, client_from_config
+from services.auth_client import AuthError, RequestError, get_auth_client
+import services.sessions as sessions
+from services import llm
 
 # --- CONFIGURAÇÃO DA MARCA DOIS PÉS ---
 st.set_page_config(page_title="DoisPés", page_icon="dois-pes.png", layout="wide")
@@ -23,18 +31,31 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- CONEXÃO SEGURA COM A NUVEM (SEGREDOS) ---
-try:
-    if "FIREBASE_KEY" in st.secrets and "GEMINI_KEY" in st.secrets:
-        # Configura a IA
-        genai.configure(api_key=st.secrets["GEMINI_KEY"])
+@st.cache_resource(show_spinner=False)
+def get_db(firebase_key, backend, path):
+    """Firebase Admin e cliente do banco, criados uma vez por processo (não a cada rerun)"""
+    if firebase_key:
+        import firebase_admin
+        from firebase_admin import credentials
         
-        # Configura o Banco
         if not firebase_admin._apps:
-            key_dict = json.loads(st.secrets["FIREBASE_KEY"])
-            cred = credentials.Certificate(key_dict)
-            firebase_admin.initialize_app(cred)
+            firebase_admin.initialize_app(credentials.Certificate(json.loads(firebase_key)))
+    # Banco de dados: Firestore (padrão) ou local, via STORAGE_BACKEND
+    return client_from_config({'STORAGE_BACKEND': backend, 'STORAGE_PATH': path})
+
+try:
+    backend = st.secrets.get("STORAGE_BACKEND", "firestore")
+    # Com banco local o Firebase só é necessário para criar contas
+    if "GEMINI_KEY" in st.secrets and ("FIREBASE_KEY" in st.secrets or backend != "firestore"):
+        # A IA só carrega o SDK na primeira chamada; limites do gateway compartilhado pelo processo
+        llm.set_api_key(st.secrets["GEMINI_KEY"])
+        llm.configure(
+            rate=float(st.secrets.get("LLM_RATE", llm.DEFAULT_RATE)),
+            timeout=float(st.secrets.get("LLM_TIMEOUT", llm.DEFAULT_TIMEOUT))
+        )
         
-        db = firestore.client()
+        db = get_db(st.secrets.get("FIREBASE_KEY"), backend, st.secrets.get("STORAGE_PATH"))
+        repo = Repository(db)
     else:
         raise Exception("Chaves não encontradas")
 except Exception:
@@ -53,10 +74,6 @@ except Exception:
 
 
 
-def format_currency(value):
-    """Formata valor float para moeda BRL (R$ 1.000,00)"""
-    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
 def validate_password(password):
     """Valida força da senha: mínimo 8 caracteres, letras e números"""
     if len(password) < 8:
@@ -82,10 +99,12 @@ def register_user(email, password, family_code):
     
     try:
         # Criar usuário no Firebase Auth
+        from firebase_admin import auth
+        
         user = auth.create_user(email=email, password=password)
         
         # Criar profile inicial no Firestore
-        db.collection('users').document(user.uid).set({
+        repo.create_user(user.uid, {
             'email': email,
             'family_id': family_code.upper().strip(),
             'setup_completed': False,
@@ -100,6 +119,45 @@ def register_user(email, password, family_code):
         else:
             st.error(f"❌ Erro ao criar conta: {error_msg}")
 
+def auth_api(api_key):
+    """Cliente compartilhado da API de login (URLs configuráveis para o emulador)"""
+    return get_auth_client(api_key, st.secrets.get("FIREBASE_AUTH_URL"), st.secrets.get("FIREBASE_TOKEN_URL"))
+
+def start_user_session(user_id, email, data, id_token):
+    """Preenche o session_state do usuário autenticado"""
+    st.session_state.user_id = user_id
+    st.session_state.email = email
+    st.session_state.family_id = data.get('family_id')
+    st.session_state.user_name = data.get('display_name', email.split('@')[0])
+    st.session_state.setup_completed = data.get('setup_completed', False)
+    st.session_state.auth_token = id_token
+
+def set_session_cookie(session_id, days=sessions.SESSION_DAYS):
+    """Grava (ou apaga, com session_id=None) o cookie da sessão no navegador"""
+    max_age = days * 86400 if session_id else 0
+    components.html(f"""<script>
+        const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';
+        window.parent.document.cookie = {json.dumps(sessions.COOKIE_NAME)} + '=' + {json.dumps(session_id or '')}
+            + '; Max-Age={max_age}; Path=/; SameSite=Strict' + secure;
+    </script>""", height=0)
+
+def restore_session():
+    """Reabre a sessão do cookie (reload/reconexão) sem pedir a senha de novo"""
+    session_id = st.context.cookies.get(sessions.COOKIE_NAME)
+    api_key = st.secrets.get("FIREBASE_API_KEY")
+    if not session_id or not api_key:
+        return
+    try:
+        restored = sessions.restore_session(repo, auth_api(api_key), session_id)
+    except Exception:
+        return  # Rede instável: segue para a tela de login
+    if restored and restored['profile'].get('family_id'):
+        profile = restored['profile']
+        start_user_session(restored['uid'], profile.get('email', ''), profile, restored['id_token'])
+        # O id é rotacionado a cada reconexão: o cookie antigo expira em instantes
+        st.session_state.session_id = restored['session_id']
+        st.session_state.pending_session_cookie = restored['session_id']
+
 def login_user(email, password):
     """Login seguro com verificação de senha via Firebase REST API"""
     try:
@@ -111,19 +169,11 @@ def login_user(email, password):
             st.error("⚠️ Configuração incompleta. Configure FIREBASE_API_KEY em secrets.toml")
             return
         
-        # Autenticar via Firebase REST API
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={api_key}"
-        payload = {
-            "email": email,
-            "password": password,
-            "returnSecureToken": True
-        }
-        
-        response = requests.post(url, json=payload)
-        
-        if response.status_code != 200:
-            error_data = response.json()
-            error_msg = error_data.get('error', {}).get('message', '')
+        # Autenticar via Firebase REST API (conexão reaproveitada, com timeout e retry)
+        try:
+            auth_data = auth_api(api_key).sign_in(email, password)
+        except AuthError as e:
+            error_msg = e.code
             
             if "INVALID_PASSWORD" in error_msg or "INVALID_LOGIN_CREDENTIALS" in error_msg:
                 st.error("❌ Email ou senha incorretos")
@@ -136,14 +186,12 @@ def login_user(email, password):
             return
         
         # Login bem-sucedido, buscar dados do usuário
-        auth_data = response.json()
         user_id = auth_data['localId']
         
         # Buscar profile do Firestore
-        doc = db.collection('users').document(user_id).get()
+        data = repo.get_user(user_id)
         
-        if doc.exists:
-            data = doc.to_dict()
+        if data is not None:
             
             # Validar que o usuário pertence a uma família
             if not data.get('family_id'):
@@ -151,18 +199,22 @@ def login_user(email, password):
                 return
             
             # Salvar sessão
-            st.session_state.user_id = user_id
-            st.session_state.email = email
-            st.session_state.family_id = data.get('family_id')
-            st.session_state.user_name = data.get('display_name', email.split('@')[0])
-            st.session_state.setup_completed = data.get('setup_completed', False)
-            st.session_state.auth_token = auth_data.get('idToken')  # Para uso futuro
+            start_user_session(user_id, email, data, auth_data.get('idToken'))
+            
+            # Sessão persistente: o cookie leva só o id, o refresh token fica no servidor
+            if auth_data.get('refreshToken'):
+                try:
+                    session_id = sessions.create_session(db, user_id, data['family_id'], auth_data['refreshToken'])
+                    st.session_state.session_id = session_id
+                    st.session_state.pending_session_cookie = session_id
+                except Exception:
+                    pass  # Sem persistência o login continua valendo nesta aba
             
             st.rerun()
         else:
             st.error("❌ Usuário não encontrado no banco de dados")
             
-    except requests.exceptions.RequestException as e:
+    except RequestError as e:
         st.error(f"❌ Erro de conexão: {e}")
     except Exception as e:
         st.error(f"❌ Erro inesperado: {e}")
@@ -176,19 +228,11 @@ def reset_password(email):
             st.error("⚠️ Configuração incompleta")
             return
         
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:sendOobCode?key={api_key}"
-        payload = {
-            "requestType": "PASSWORD_RESET",
-            "email": email
-        }
-        
-        response = requests.post(url, json=payload)
-        
-        if response.status_code == 200:
+        try:
+            auth_api(api_key).send_password_reset(email)
             st.success("✅ Email de recuperação enviado! Verifique sua caixa de entrada.")
-        else:
-            error_data = response.json()
-            error_msg = error_data.get('error', {}).get('message', '')
+        except AuthError as e:
+            error_msg = e.code
             
             if "EMAIL_NOT_FOUND" in error_msg:
                 st.error("❌ Email não cadastrado")
@@ -236,51 +280,30 @@ def get_user_family_id():
 
 
 def save_wizard_data(data):
-    uid = st.session_state.user_id
-    batch = db.batch()
-    
-    # 1. Update User Profile
-    user_ref = db.collection('users').document(uid)
-    batch.update(user_ref, {
-        'income': data['income'],
-        'initial_balance': data['initial_balance'],
-        'setup_completed': True
-    })
-    
-    # 2. Add Fixed Expenses
-    for item in data['fixed_expenses']:
-        ref = db.collection('recurring_expenses').document()
-        item['family_id'] = st.session_state.family_id
-        item['user_id'] = uid
-        batch.set(ref, item)
-        
-    # 3. Add Debts
-    for item in data['debts']:
-        ref = db.collection('debts').document()
-        item['family_id'] = st.session_state.family_id
-        item['user_id'] = uid
-        batch.set(ref, item)
-        
-    # 4. Add Initial Balance Transaction
+    initial = None
     if data['initial_balance'] > 0:
-        trans_ref = db.collection('transactions').document()
-        batch.set(trans_ref, {
-            'family_id': st.session_state.family_id,
+        initial = {
             'user_name': st.session_state.email.split('@')[0],
             'type': 'Receita',
             'value': float(data['initial_balance']),
             'description': 'Saldo Inicial (Importado)',
             'category': 'Saldo Inicial',
             'date': datetime.now()
-        })
-
-    batch.commit()
+        }
+    # Perfil, contas fixas, dívidas e saldo inicial num único batch
+    repo.complete_setup(
+        st.session_state.user_id, st.session_state.family_id,
+        {'income': data['income'], 'initial_balance': data['initial_balance']},
+        data['fixed_expenses'], data['debts'], initial
+    )
     st.session_state.setup_completed = True
     st.rerun()
 
 # --- WIZARD COMPONENTS ---
 
 def wizard_flow():
+    import pandas as pd
+    
     st.title("🚀 Configuração Inicial")
     st.progress(st.session_state.get('wizard_step', 1) / 5)
     
@@ -412,11 +435,12 @@ def wizard_flow():
 
 # --- DASHBOARD (CÓDIGO EXISTENTE REFATORADO) ---
 def render_debts_view():
+    import pandas as pd
+    
     st.title("💳 Gestão de Dívidas")
     
     family_id = st.session_state.family_id
-    loans = db.collection('debts').where('family_id', '==', family_id).stream()
-    data = [d.to_dict() | {'id': d.id} for d in loans]
+    data = repo.list_family('debts', family_id)
     
     if data:
         # --- HEADER METRICS ---
@@ -434,28 +458,38 @@ def render_debts_view():
         # --- AI STRATEGIST ---
         with st.expander("🤖 Consultor de Quitação (IA)", expanded=False):
             st.write("A IA pode analisar suas dívidas e sugerir qual ordem de pagamento economiza mais juros (Método Avalanche vs Bola de Neve).")
-            if st.button("Gerar Estratégia de Pagamento"):
+            cached_strategy = debt_strategy.get_cached(db, family_id, data)
+            ai_ready = llm.available()
+            if cached_strategy:
+                st.caption("💾 Análise salva para a sua lista atual de dívidas.")
+                st.markdown(cached_strategy)
+                run_strategy = st.button("🔄 Regenerar", disabled=not ai_ready)
+            else:
+                run_strategy = st.button("Gerar Estratégia de Pagamento", disabled=not ai_ready)
+            
+            if not ai_ready:
+                st.caption("🔌 A IA está instável agora. Tente de novo em alguns instantes.")
+            
+            if run_strategy:
                 with st.spinner("Analisando contratos e valores..."):
-                    # Prepare data for AI
-                    debts_summary = "\n".join([f"- {d['description']}: R$ {d['total_value']} (Parcela R$ {d.get('installment_value',0)})" for d in data])
-                    
-                    prompt = f"""
-                    Atue como um especialista em recuperação de crédito. Analise essa lista de dívidas pessoais:
-                    {debts_summary}
-                    
-                    1. Identifique quais provavelmente têm os juros mais abusivos (ex: Crefisa, Cheque Especial, Cartão) e devem ser prioridade.
-                    2. Sugira uma estratégia de quitação (Avalanche ou Bola de Neve) explicando o porquê.
-                    3. Liste 3 perguntas que o usuário deve fazer ao credor para tentar negociar um desconto à vista.
-                    
-                    Seja direto e prático. Use formatação markdown.
-                    """
-                    
-                    model = genai.GenerativeModel('gemini-2.0-flash')
                     try:
-                        response = model.generate_content(prompt)
-                        st.markdown(response.text)
+                        debt_strategy.generate_strategy(db, family_id, data)
+                        st.rerun()
+                    except llm.LLMUnavailable as e:
+                        st.warning(f"🔌 {e}")
+                        ai_ready = False
                     except Exception as e:
                         st.error(f"Erro na análise: {e}")
+            
+            if not ai_ready and not cached_strategy:
+                saved = debt_strategy.get_saved(db, family_id)
+                if saved:
+                    st.caption("💾 Última análise salva (feita antes das mudanças nas dívidas):")
+                    st.markdown(saved)
+
+        # --- PAYOFF SIMULATOR (LOCAL) ---
+        with st.expander("📈 Simulador de Quitação (Avalanche x Bola de Neve)", expanded=False):
+            render_payoff_simulator(data)
 
         st.markdown("### 📋 Seus Contratos")
         
@@ -490,12 +524,12 @@ def render_debts_view():
                         margin-bottom: 15px;
                     ">
                         <div style="display: flex; justify-content: space-between; align-items: center;">
-                            <h3 style="margin: 0; font-size: 18px; color: white;">{icon} {debt['description']}</h3>
+                            <h3 style="margin: 0; font-size: 18px; color: white;">{icon} {escape(str(debt['description']))}</h3>
                             <span style="background-color: #e74c3c; color: white; padding: 2px 8px; border-radius: 4px; font-size: 12px;">R$ {val:,.2f}</span>
                         </div>
                         <div style="display: flex; gap: 20px; margin-top: 10px; color: #cccccc; font-size: 14px;">
                             <span>📦 Parcela: <b>R$ {inst_val:,.2f}</b></span>
-                            <span>⏳ Restam: <b>{restam}x</b></span>
+                            <span>⏳ Restam: <b>{escape(str(restam))}x</b></span>
                         </div>
                     </div>
                     """, 
@@ -505,7 +539,7 @@ def render_debts_view():
                 # Context Actions
                 c_act1, c_act2 = st.columns([1, 4])
                 if c_act1.button("🗑️", key=f"del_{debt['id']}", help="Excluir dívida"):
-                    db.collection('debts').document(debt['id']).delete()
+                    repo.delete('debts', family_id, debt['id'])
                     st.rerun()
                 
                 # Placeholder for negotiation status styling (could be a badge in future)
@@ -513,12 +547,60 @@ def render_debts_view():
     else:
         st.info("Nenhuma dívida cadastrada (Amém? 🙏)")
 
+def render_payoff_simulator(data):
+    """Compara estratégias de quitação com o simulador local (sem IA)"""
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    import services.payoff as payoff
+    
+    st.caption("Cálculo local com as parcelas e juros (% a.m.) cadastrados. Dívidas sem juros informados contam como 0%.")
+    
+    c1, c2 = st.columns([1, 2])
+    extra = c1.number_input("Extra por mês (R$)", min_value=0.0, step=50.0, value=0.0, key="payoff_extra")
+    labels = {i: d['description'] for i, d in enumerate(data)}
+    custom = c2.multiselect("Ordem personalizada (opcional)", options=list(labels), format_func=labels.get, key="payoff_order")
+    
+    results = payoff.compare_strategies(data, extra, order=custom or None)
+    
+    rows = []
+    for strategy, res in results.items():
+        months = int(res['months'][0])
+        end = payoff.payoff_date(months)
+        rows.append({
+            "Estratégia": payoff.STRATEGIES[strategy],
+            "Quitação": end.strftime("%m/%Y") if end else "Não quita",
+            "Meses": months if months >= 0 else None,
+            "Juros Totais": float(res['total_interest'][0])
+        })
+    st.dataframe(
+        pd.DataFrame(rows), use_container_width=True, hide_index=True,
+        column_config={"Juros Totais": st.column_config.NumberColumn(format="R$ %.2f")}
+    )
+    
+    # Saldo total mês a mês por estratégia
+    fig = go.Figure()
+    for strategy, res in results.items():
+        fig.add_trace(go.Scatter(y=res['balance'][0], mode='lines', name=payoff.STRATEGIES[strategy]))
+    fig.update_layout(title="Saldo devedor ao longo do tempo", xaxis_title="Meses", yaxis_title="R$", plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Varredura de cenários: quanto cada real extra economiza de juros
+    extras = np.linspace(0, max(extra * 3, 2000.0), 200)
+    sweep = payoff.simulate(data, extras, 'avalanche')
+    df_sweep = pd.DataFrame({"Extra por mês": extras, "Juros Totais": sweep['total_interest']})
+    st.plotly_chart(px.line(df_sweep, x="Extra por mês", y="Juros Totais", title="Juros totais x pagamento extra (Avalanche)"), use_container_width=True)
+
 def render_recurring_view():
+    import pandas as pd
+    import plotly.express as px
+    
     st.title("📅 Contas Fixas (Recorrentes)")
     
     family_id = st.session_state.family_id
-    recs = db.collection('recurring_expenses').where('family_id', '==', family_id).stream()
-    data = [r.to_dict() | {'id': r.id} for r in recs]
+    data = repo.list_family('recurring_expenses', family_id)
     
     if data:
         df = pd.DataFrame(data)
@@ -586,7 +668,7 @@ def render_recurring_view():
                     ">
                         <div>
                             <div style="font-size: 16px; font-weight: bold; color: white;">
-                                {icon} {row['description']}
+                                {icon} {escape(str(row['description']))}
                             </div>
                             <div style="font-size: 13px; color: #aaaaaa; margin-top: 2px;">
                                 Vence dia {int(row['due_day'])}
@@ -624,8 +706,7 @@ def render_cards_view():
             
             if st.form_submit_button("Salvar Cartão"):
                 if name and limit > 0:
-                    ref = db.collection('credit_cards').document()
-                    ref.set({
+                    repo.add('credit_cards', {
                         'name': name,
                         'limit': limit,
                         'closing_day': int(close_day),
@@ -641,8 +722,7 @@ def render_cards_view():
 
     # Listar cartões
     family_id = st.session_state.family_id
-    cards = db.collection('credit_cards').where('family_id', '==', family_id).stream()
-    data = [c.to_dict() | {'id': c.id} for c in cards] # Include ID
+    data = repo.list_family('credit_cards', family_id) # Include ID
     
     if data:
         st.subheader("Meus Cartões")
@@ -659,114 +739,101 @@ def render_cards_view():
                 c1.progress(0, text=f"Limite: {format_currency(limit_val)}")
                 
                 if c2.button("🗑️", key=f"del_{card['id']}"):
-                    db.collection('credit_cards').document(card['id']).delete()
+                    repo.delete('credit_cards', family_id, card['id'])
                     st.rerun()
     else:
         st.info("Nenhum cartão cadastrado. Adicione um acima! 👆")
 
 
 def save_imported_data(items):
-    """Salva itens importados nas coleções apropriadas"""
-    batch = db.batch()
-    uid = st.session_state.user_id
+    """Salva itens importados nas coleções apropriadas, em blocos paralelos"""
     family_id = st.session_state.family_id
     
-    count_rec = 0
-    count_debt = 0
-    count_trans = 0
-    
-    for item in items:
-        # 1. Dívidas
-        if item['type'] == 'debt':
-            ref = db.collection('debts').document()
-            batch.set(ref, {
-                'description': item['description'],
-                'total_value': float(item['value']),
-                'remaining_installments': int(item.get('installments_count', 1)),
-                'installment_value': float(item.get('installment_value', item['value'])),
-                'family_id': family_id,
-                'user_id': uid,
-                'created_at': datetime.now()
-            })
-            count_debt += 1
-            
-        # 2. Despesas Fixas / Recorrentes
-        elif item['type'] == 'recurring':
-            ref = db.collection('recurring_expenses').document()
-            day = 1
-            if item.get('date'):
-                day = item['date'].day
-            
-            batch.set(ref, {
-                'description': item['description'],
-                'amount': float(item['value']),
-                'due_day': int(day),
-                'family_id': family_id,
-                'user_id': uid
-            })
-            count_rec += 1
-            
-        # 3. Transações (Despesas comuns)
-        else:
-            ref = db.collection('transactions').document()
-            date_val = datetime.now()
-            if item.get('date'):
-                # Converter date object para datetime
-                d = item['date']
-                date_val = datetime(d.year, d.month, d.day)
-                
-            batch.set(ref, {
-                'description': item['description'],
-                'value': float(item['value']),
-                'type': 'Despesa',
-                'category': 'Importado',
-                'date': date_val,
-                'family_id': family_id,
-                'user_name': st.session_state.get('user_name', 'User'),
-                'user_id': uid
-            })
-            count_trans += 1
-            
-    batch.commit()
-    st.success(f"✅ Importação concluída! Dívidas: {count_debt}, Fixas: {count_rec}, Transações: {count_trans}")
+    bar = st.progress(0.0, text="Importando...")
+    def on_progress(done, total):
+        bar.progress(done / total if total else 1.0, text=f"Importando... {done}/{total}")
+    
+    try:
+        counts = repo.import_items(
+            family_id, items, st.session_state.user_id, st.session_state.get('user_name', 'User'), progress=on_progress
+        )
+    except BulkWriteError as e:
+        st.error(f"❌ Importação interrompida: {e}. Já gravados: {dict(e.counts)}")
+        return e.counts
+    
+    st.success(f"✅ Importação concluída! Dívidas: {counts['debts']}, Fixas: {counts['recurring_expenses']}, Transações: {counts['transactions']}")
+    if counts['skipped']:
+        st.info(f"♻️ {counts['skipped']} itens já tinham sido importados antes e foram ignorados.")
     st.balloons()
+    return counts
+
 
+def render_danger_zone():
+    uid = st.session_state.user_id
+    family_id = st.session_state.family_id
+    collections = ['transactions', 'debts', 'recurring_expenses']
+    
+    # Checkpoint na sessão: se a limpeza for interrompida, o botão retoma de onde parou
+    job = st.session_state.get('reset_job')
+    if job and not all(job.get(c, {}).get('done') for c in collections):
+        st.warning(f"Limpeza anterior interrompida ({sum(c['deleted'] for c in job.values())} registros já apagados).")
+        label = "▶️ Retomar limpeza"
+    else:
+        label = "🗑️ Limpar TODO o Banco de Dados (Use com cautela)"
+    
+    if st.button(label):
+        job = st.session_state.setdefault('reset_job', {})
+        bar = st.progress(0.0, text="Limpando...")
+        def on_progress(collection, deleted, total):
+            bar.progress(min(deleted / total, 1.0) if total else 0.0, text=f"{collection}: {deleted} apagados")
+        
+        repo.delete_user_data(uid, family_id, collections, checkpoint=job, progress=on_progress)
+        del st.session_state['reset_job']
+        st.toast("Banco limpo!")
+        st.rerun()
+    
+    st.markdown("---")
+    st.caption("Apagar lançamentos de um período")
+    period = st.date_input("Período", value=(), format="DD/MM/YYYY", key="delete_period")
+    if len(period) == 2 and st.button("🗑️ Apagar lançamentos do período"):
+        start, end = (datetime.combine(d, datetime.min.time()) for d in period)
+        bar = st.progress(0.0, text="Apagando...")
+        def on_page(deleted, total):
+            bar.progress(min(deleted / total, 1.0) if total else 0.0, text=f"{deleted} apagados")
+        
+        # Fim inclusivo: até o início do dia seguinte
+        deleted = repo.delete_transactions_between(family_id, start, end + timedelta(days=1), progress=on_page)
+        st.toast(f"{deleted} lançamentos apagados.")
+        st.rerun()
 
 def render_import_view():
     st.title("📥 Importar Dados")
     
     # Adicionar opção de limpar tudo para testes
     with st.expander("⚠️ Zona de Perigo"):
-        if st.button("🗑️ Limpar TODO o Banco de Dados (Use com cautela)"):
-            uid = st.session_state.user_id
-            # Clean collections
-            for coll in ['transactions', 'debts', 'recurring_expenses']:
-                docs = db.collection(coll).where('user_id', '==', uid).stream()
-                for doc in docs:
-                    doc.reference.delete()
-            st.warning("Banco limpo!")
-            st.rerun()
+        render_danger_zone()
 
-    st.write("Importe suas contas a partir de arquivos XML ou use a IA para ler extratos.")
+    st.write("Importe suas contas a partir de planilhas XML ou dos extratos do banco (OFX ou CSV), ou use a IA para ler extratos.")
     
     if 'uploader_key_xml' not in st.session_state:
         st.session_state.uploader_key_xml = 0
 
-    uploaded_file = st.file_uploader("📂 Selecione o arquivo XML (Excel 2003)", type=['xml'], key=f"xml_uploader_{st.session_state.uploader_key_xml}")
+    uploaded_file = st.file_uploader("📂 Selecione o arquivo (XML do Excel 2003, OFX ou CSV do banco)", type=importers.supported_extensions(), key=f"xml_uploader_{st.session_state.uploader_key_xml}")
+    formats = {"Automático": None} | {imp.label: imp.name for imp in importers.IMPORTERS.values()}
+    chosen = st.selectbox("Formato", list(formats), key="import_format")
     
     if uploaded_file:
         try:
             # GARANTIR ponteiro no início
             uploaded_file.seek(0)
-            content = uploaded_file.read().decode('utf-8')
-            
-            result = importers.parse_excel_xml(content)
+            # Passa o upload binário direto: o parser lê em streaming e detecta formato e encoding
+            result = importers.parse_file(uploaded_file, uploaded_file.name, format=formats[chosen])
             
             if "error" in result:
                 st.error(f"Erro ao ler arquivo: {result['error']}")
             else:
                 items = result['items']
-                st.info(f"{len(items)} itens encontrados no arquivo.")
+                st.info(f"{len(items)} itens encontrados no arquivo ({importers.IMPORTERS[result['format']].label}).")
                 
                 # Preview matches logic
                 import pandas as pd
@@ -786,7 +853,28 @@ def render_import_view():
             st.error(f"Erro inesperado: {e}")
             print(f"Erro na importação: {e}")
 
+def connect_live_family():
+    """Liga a sessão aos listeners em tempo real da família (um por família no processo)"""
+    family_id = st.session_state.family_id
+    if st.session_state.get('live_family') != family_id:
+        st.session_state.live_family = family_id
+        # O lease antigo, se houver, é liberado quando sai do session_state
+        st.session_state.live_lease = live_store.acquire(db, family_id) if st.secrets.get("REALTIME_SYNC", True) else None
+    return st.session_state.live_lease is not None
+
+@st.fragment(run_every=3)
+def watch_live_family():
+    """Rerun quando chegam alterações da família (ex.: lançamento do parceiro); só lê a memória"""
+    version = live_store.version(st.session_state.family_id)
+    if version is None:
+        return
+    if st.session_state.setdefault('live_version', version) != version:
+        st.session_state.live_version = version
+        st.rerun()
+
 def main_dashboard():
+    live = connect_live_family()
+    
     # --- SIDEBAR NAVIGATION ---
     with st.sidebar:
         st.image("dois-pes.png", width=120)
@@ -807,10 +895,21 @@ def main_dashboard():
             key="menu_selection"
         )
         
+        if live:
+            watch_live_family()
+        
         st.divider()
         if st.button("Sair"):
+            if st.session_state.get('session_id'):
+                try:
+                    sessions.delete_session(db, st.session_state.session_id)
+                except Exception:
+                    pass
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
+            # Não tenta reabrir pelo cookie antigo e apaga o cookie no navegador
+            st.session_state.session_checked = True
+            st.session_state.pending_session_cookie = None
             st.rerun()
 
     # --- ROUTING ---
@@ -833,30 +932,26 @@ def render_profile_view():
     st.title("👤 Meu Perfil")
     
     # User Data
-    user_ref = db.collection('users').document(st.session_state.user_id)
-    user_doc = user_ref.get()
-    user_data = user_doc.to_dict() if user_doc.exists else {}
+    user_data = repo.get_user(st.session_state.user_id) or {}
     
     col_l, col_r = st.columns([1, 2])
     
     with col_l:
         # Avatar Logic
-        current_avatar = user_data.get('avatar_base64')
-        if current_avatar:
-            import base64
-            from io import BytesIO
-            from PIL import Image
-            
-            # Decode for display
+        avatar_hash = user_data.get('avatar_hash')
+        if not avatar_hash and user_data.get('avatar_base64'):
+            # Perfil antigo com a imagem embutida: migra para o armazenamento por hash
             try:
-                msg = base64.b64decode(current_avatar)
-                buf = BytesIO(msg)
-                img = Image.open(buf)
-                st.image(img, width=150)
-            except:
-                st.error("Erro ao carregar avatar.")
-                st.image("https://www.w3schools.com/howto/img_avatar.png", width=150)
+                avatar_hash = repo.migrate_avatar(st.session_state.user_id, st.session_state.family_id, user_data['avatar_base64'])
+            except Exception:
+                avatar_hash = None
+        
+        avatar_bytes = repo.load_avatar(avatar_hash) if avatar_hash else None
+        if avatar_bytes:
+            st.image(avatar_bytes, width=150)
         else:
+            if avatar_hash:
+                st.error("Erro ao carregar avatar.")
             st.image("https://www.w3schools.com/howto/img_avatar.png", width=150)
             
         # Upload
@@ -864,23 +959,12 @@ def render_profile_view():
         if new_avatar:
             if st.button("Salvar Nova Foto"):
                 try:
-                    from PIL import Image
-                    import io
-                    import base64
-                    
-                    image = Image.open(new_avatar)
-                    
                     # Resize to optimized thumbnail
-                    image.thumbnail((200, 200))
+                    thumbnail = avatars.make_thumbnail(new_avatar)
                     
-                    # Convert to base64
-                    buffered = io.BytesIO()
-                    image.save(buffered, format="JPEG", quality=80) # Compress
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    
-                    # Save to DB
-                    user_ref.update({'avatar_base64': img_str})
-                    st.session_state.user_avatar = img_str # Update session
+                    # Save to DB (só o hash vai para o documento do usuário)
+                    digest = repo.set_avatar(st.session_state.user_id, st.session_state.family_id, thumbnail)
+                    st.session_state.user_avatar = digest # Update session
                     st.success("Avatar atualizado!")
                     st.rerun()
                 except Exception as e:
@@ -900,7 +984,7 @@ def render_profile_view():
         goals = st.text_area("Objetivo Financeiro", value=user_data.get('goals', ''), placeholder="Ex: Comprar um carro, Aposentar cedo...")
         
         if st.button("💾 Atualizar Perfil"):
-            user_ref.update({
+            repo.update_user(st.session_state.user_id, st.session_state.family_id, {
                 'name': name_val,
                 'income': income,
                 'goals': goals
@@ -908,11 +992,135 @@ def render_profile_view():
             st.session_state.user_name = name_val # Update session immediately
             st.success("Dados salvos!")
 
+RECEIPT_CATEGORIES = ["Casa", "Mercado", "Lazer", "Transporte", "Salário", "Investimento", "Outros"]
+RECEIPT_TYPES = ["Despesa", "Receita", "Investimento"]
+
+def receipt_row(result):
+    """Linha da tabela de revisão para um comprovante lido (ou que falhou)"""
+    data = result.data if isinstance(result.data, dict) else {}
+    error = result.error
+    if result.data and not data:
+        error = error or ValueError("resposta da IA em formato inesperado")
+    # Saída do modelo sem garantia de tipo: um valor ruim marca só esta linha como falha
+    try:
+        value = float(data.get('value') or 0.0)
+    except (ValueError, TypeError):
+        value = 0.0
+        error = error or ValueError(f"valor inválido: {data.get('value')!r}")
+    try:
+        date = datetime.strptime(str(data.get('date') or ''), '%Y-%m-%d').date()
+    except ValueError:
+        date = datetime.now().date()
+    if result.duplicate_of:
+        status = f"♊ Duplicado de {result.duplicate_of}"
+    elif isinstance(error, llm.LLMUnavailable):
+        status = f"🔌 {error} (preencha à mão)"
+    elif error:
+        status = f"❌ {error}"
+    elif not data:
+        status = "⚠️ Nada encontrado"
+    else:
+        status = "⚡ Cache" if result.from_cache else "✅ Lido"
+    return {
+        'incluir': bool(data) and error is None,
+        'arquivo': result.name,
+        'data': date,
+        'descricao': str(data.get('description') or ""),
+        'valor': value,
+        'categoria': data.get('category') if data.get('category') in RECEIPT_CATEGORIES else "Outros",
+        'tipo': data.get('type') if data.get('type') in RECEIPT_TYPES else "Despesa",
+        'status': status,
+        'digest': result.digest,
+    }
+
+def render_receipt_batch():
+    """Vários comprovantes de uma vez: leitura concorrente pela IA e revisão numa tabela editável antes de salvar"""
+    import pandas as pd
+    
+    family_id = st.session_state.family_id
+    if 'receipt_batch_msg' in st.session_state:
+        st.success(st.session_state.pop('receipt_batch_msg'))
+    if 'batch_uploader_key' not in st.session_state:
+        st.session_state.batch_uploader_key = 0
+    files = st.file_uploader(
+        "📸 Fotos ou PDFs dos comprovantes", type=["jpg", "png", "jpeg", "webp", "pdf"],
+        accept_multiple_files=True, key=f"batch_uploader_{st.session_state.batch_uploader_key}"
+    )
+    if not files:
+        st.caption("Envie os comprovantes do mês de uma vez: a IA lê vários em paralelo e você confere tudo numa tabela.")
+        return
+    
+    batch_id = (st.session_state.batch_uploader_key, tuple(f.file_id for f in files))
+    state = st.session_state.get('receipt_batch')
+    if not state or state['id'] != batch_id:
+        rows = [None] * len(files)
+        bar = st.progress(0.0, text="🤖 A IA está lendo os comprovantes...")
+        live_table = st.empty()
+        results = ocr.analyze_batch(
+            db, family_id, [(f.name, f.getvalue()) for f in files],
+            concurrency=int(st.secrets.get("OCR_CONCURRENCY", ocr.DEFAULT_CONCURRENCY))
+        )
+        # Cada comprovante aparece assim que termina, sem esperar o lote
+        for done, result in enumerate(results, start=1):
+            rows[result.index] = receipt_row(result)
+            bar.progress(done / len(files), text=f"🤖 Lendo comprovantes... {done}/{len(files)}")
+            live_table.dataframe(pd.DataFrame([r for r in rows if r]).drop(columns=['digest']), use_container_width=True, hide_index=True)
+        bar.empty()
+        live_table.empty()
+        state = st.session_state.receipt_batch = {'id': batch_id, 'rows': rows}
+    
+    edited = st.data_editor(
+        pd.DataFrame(state['rows']),
+        use_container_width=True,
+        hide_index=True,
+        disabled=['arquivo', 'status'],
+        column_config={
+            'incluir': st.column_config.CheckboxColumn("Incluir"),
+            'arquivo': "Arquivo",
+            'data': st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+            'descricao': "Descrição",
+            'valor': st.column_config.NumberColumn("Valor", format="R$ %.2f", min_value=0.0),
+            'categoria': st.column_config.SelectboxColumn("Categoria", options=RECEIPT_CATEGORIES),
+            'tipo': st.column_config.SelectboxColumn("Tipo", options=RECEIPT_TYPES),
+            'status': "Status",
+            'digest': None,
+        },
+        key=f"receipt_batch_editor_{st.session_state.batch_uploader_key}"
+    )
+    
+    # Um lançamento por comprovante: cópias marcadas à mão repetiriam o id
+    selected = edited[edited['incluir'] & (edited['valor'] > 0)].drop_duplicates('digest')
+    if st.button(f"💾 Salvar {len(selected)} lançamentos", type="primary", disabled=selected.empty):
+        user_name = st.session_state.email.split('@')[0]
+        trans = [{
+            'family_id': family_id,
+            'user_name': user_name,
+            'type': row['tipo'],
+            'value': float(row['valor']),
+            'description': row['descricao'],
+            'category': row['categoria'],
+            'date': datetime.combine(pd.Timestamp(row['data']).date(), datetime.min.time())
+        } for row in selected.to_dict('records')]
+        # Id pelo comprovante: salvar o mesmo lote de novo não duplica
+        ids = [ocr.receipt_id(family_id, digest) for digest in selected['digest']]
+        try:
+            counts = repo.add_transactions(family_id, trans, ids)
+        except BulkWriteError as e:
+            st.error(f"❌ Gravação interrompida: {e}. Já gravados: {dict(e.counts)}")
+            return
+        st.session_state.batch_uploader_key += 1
+        st.session_state.pop('receipt_batch', None)
+        msg = f"✅ {counts['transactions']} lançamentos salvos!"
+        if counts['skipped']:
+            msg += f" ({counts['skipped']} já existiam)"
+        st.session_state.receipt_batch_msg = msg
+        st.rerun()
+
 def render_launch_view():
     st.title("💸 Novo Lançamento")
     
     # Create Tabs for different launch types
-    tab1, tab2 = st.tabs(["📝 Transação Simples", "💳 Nova Dívida / Parcelamento"])
+    tab1, tab_batch, tab2 = st.tabs(["📝 Transação Simples", "📚 Comprovantes em Lote", "💳 Nova Dívida / Parcelamento"])
     
     # --- TAB 1: SIMPLE TRANSACTION (EXISTING LOGIC) ---
     with tab1:
@@ -933,49 +1141,33 @@ def render_launch_view():
             if 'last_analyzed_file' not in st.session_state or st.session_state.last_analyzed_file != current_file_id:
                 with st.spinner("🤖 A IA está lendo seu comprovante..."):
                     try:
-                        import PIL.Image
-                        
-                        if uploaded_file.type == "application/pdf":
-                            st.warning("⚠️ Suporte a PDF em breve! Por favor use imagem (JPG/PNG).")
-                        else:
-                            img = PIL.Image.open(uploaded_file)
-                            st.image(img, caption='Comprovante', width=200)
+                        raw = uploaded_file.getvalue()
+                        if not ocr.is_pdf(raw):
+                            st.image(raw, caption='Comprovante', width=200)
                             
-                            # Gemini Call
-                            model = genai.GenerativeModel('gemini-2.0-flash')
-                            prompt = """
-                            Analise esta imagem de comprovante/recibo financeiro e extraia um JSON:
-                            {
-                                "value": float (valor total, use ponto para decimais),
-                                "description": string (nome do estabelecimento ou resumo curto),
-                                "category": string (escolha uma: Casa, Mercado, Lazer, Transporte, Salário, Investimento, Outros),
-                                "type": string (escolha uma: Despesa, Receita, Investimento),
-                                "date": string (formato YYYY-MM-DD)
-                            }
-                            Se não encontrar algo, deixe null. Responda APENAS o JSON.
-                            """
-                            response = model.generate_content([prompt, img])
+                        # Gemini Call (imagem reduzida ou PDF + cache pelo hash do arquivo)
+                        data_ai, from_cache = ocr.analyze_receipt(db, st.session_state.family_id, raw)
+                        if from_cache:
+                            st.toast("⚡ Comprovante já lido antes, dados reaproveitados.")
                             
-                            # Clean json
-                            text = response.text.replace("```json", "").replace("```", "").strip()
-                            data_ai = json.loads(text)
-                            
-                            if data_ai:
-                                st.session_state.new_launch_val = float(data_ai.get('value', 0.0) or 0.0)
-                                st.session_state.new_launch_desc = data_ai.get('description', "") or ""
+                        if data_ai:
+                            st.session_state.new_launch_val = float(data_ai.get('value', 0.0) or 0.0)
+                            st.session_state.new_launch_desc = data_ai.get('description', "") or ""
                                 
-                                category = data_ai.get('category')
-                                if category in ["Casa", "Mercado", "Lazer", "Transporte", "Salário", "Investimento", "Outros"]:
-                                    st.session_state.new_launch_cat = category
+                            category = data_ai.get('category')
+                            if category in ["Casa", "Mercado", "Lazer", "Transporte", "Salário", "Investimento", "Outros"]:
+                                st.session_state.new_launch_cat = category
                                 
-                                type_ = data_ai.get('type')
-                                if type_ in ["Despesa", "Receita", "Investimento"]:
-                                    st.session_state.new_launch_type = type_
+                            type_ = data_ai.get('type')
+                            if type_ in ["Despesa", "Receita", "Investimento"]:
+                                st.session_state.new_launch_type = type_
                                 
-                                st.session_state.last_analyzed_file = current_file_id
-                                st.success("✅ Dados extraídos! Confira abaixo.")
-                                st.rerun() # Rerun to update widgets with new session state values
+                            st.session_state.last_analyzed_file = current_file_id
+                            st.success("✅ Dados extraídos! Confira abaixo.")
+                            st.rerun() # Rerun to update widgets with new session state values
 
+                    except llm.LLMUnavailable as e:
+                        st.warning(f"🔌 {e}. Preencha os dados abaixo manualmente.")
                     except Exception as e:
                         st.error(f"Erro na leitura da IA: {e}")
 
@@ -990,7 +1182,7 @@ def render_launch_view():
         cat = col4.selectbox("Categoria", ["Casa", "Mercado", "Lazer", "Transporte", "Salário", "Investimento", "Outros"], key="new_launch_cat")
         
         def save_transaction():
-            db.collection('transactions').add({
+            trans = {
                 'family_id': st.session_state.family_id,
                 'user_name': st.session_state.email.split('@')[0],
                 'type': st.session_state.new_launch_type,
@@ -998,7 +1190,9 @@ def render_launch_view():
                 'description': st.session_state.new_launch_desc,
                 'category': st.session_state.new_launch_cat,
                 'date': datetime.combine(datetime.now(), datetime.min.time())
-            })
+            }
+            # Transação + resumo mensal no mesmo commit atômico
+            repo.add_transaction(trans)
             
             # Reset form safely in callback
             st.session_state.new_launch_val = 0.0
@@ -1013,6 +1207,10 @@ def render_launch_view():
 
         st.button("Salvar Lançamento", use_container_width=True, on_click=save_transaction)
 
+    # --- LOTE DE COMPROVANTES ---
+    with tab_batch:
+        render_receipt_batch()
+
     # --- TAB 2: REGISTER DEBT ---
     with tab2:
         st.info("Cadastre dívidas parceladas ou empréstimos de longo prazo.")
@@ -1026,16 +1224,18 @@ def render_launch_view():
         # Auto calculate installment
         calc_installment = d_total / d_installments if d_installments > 0 else 0
         d_inst_val = st.number_input(f"Valor da Parcela (Calc: R$ {calc_installment:.2f})", value=calc_installment, min_value=0.0, step=10.0)
+        d_rate = st.number_input("Juros (% ao mês, opcional)", min_value=0.0, step=0.1, format="%.2f", help="Usado no Simulador de Quitação")
         
         if st.button("💾 Salvar Dívida", use_container_width=True):
             if d_desc and d_total > 0:
-                db.collection('debts').add({
+                repo.add('debts', {
                     'family_id': st.session_state.family_id,
                     'user_id': st.session_state.user_id,
                     'description': d_desc,
                     'total_value': d_total,
                     'installment_value': d_inst_val,
                     'remaining_installments': d_installments,
+                    'interest_rate': d_rate,
                     'created_at': datetime.now()
                 })
                 st.success("Dívida cadastrada com sucesso!")
@@ -1045,59 +1245,51 @@ def render_launch_view():
 
 
 # --- AI SERVICES ---
-def get_daily_briefing(family_id, user_name, rec_expenses, debts_total, current_balance):
+def render_briefing(family_id, context, doc):
     """
-    Gera ou recupera o briefing diário da IA.
-    Chave: YYYY-MM-DD_{family_id}
+    Mostra o briefing do dia sem bloquear o dashboard no LLM.
+    Se ainda não existe, a geração roda em segundo plano e um fragmento
+    consulta o resultado a cada poucos segundos.
     """
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    doc_id = f"{today_str}_{family_id}"
+    if doc.exists:
+        st.info(doc.to_dict()['content'], icon="🌅")
+        return
     
-    doc_ref = db.collection('daily_briefings').document(doc_id)
-    doc = doc_ref.get()
+    def fallback():
+        # IA fora do ar: resumo montado localmente, o briefing completo fica para depois
+        st.info(fallback_briefing(context), icon="🌅")
+        st.caption("🔌 Consultor IA indisponível agora; este é um resumo automático.")
     
-    if doc.exists:
-        return doc.to_dict()['content']
+    if not llm.available():
+        fallback()
+        return
     
-    # Se não existe, gerar novo
-    with st.spinner("🤖 O Consultor IA está preparando seu resumo matinal..."):
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Prepare context
-        prompt = f"""
-        Você é um consultor financeiro pessoal, amigável e motivador. O usuário é {user_name}.
-        Data de hoje: {today_str}.
-        
-        PANORAMA FINANCEIRO:
-        - Saldo Atual em Conta: {format_currency(current_balance)}
-        - Total de Dívidas (Longo Prazo): {format_currency(debts_total)}
-        - Contas Fixas Mensais: 
-          {', '.join([f"{r['description']} (Dia {r['due_day']})" for r in rec_expenses[:5]])} ... e mais {max(0, len(rec_expenses)-5)} contas.
-        
-        OBJETIVO:
-        Escreva um "Bom dia" curto e inspirador (max 3 parágrafos).
-        1. Comente sobre o saldo atual (dê um alerta sutil se negativo, ou parabéns se positivo).
-        2. Avise se tem alguma conta vencendo hoje ou amanhã (baseado no dia de hoje vs dia das contas fixas).
-        3. Dê uma dica rápida de economia baseada no contexto de ter dívidas (se tiver) ou de investir (se tiver sobrando).
-        
-        Tom de voz: Otimista, "Tamo junto", parceiro. Use emojis.
-        """
-        
-        try:
-            response = model.generate_content(prompt)
-            content = response.text
-            
-            # Save to cache
-            doc_ref.set({
-                'content': content,
-                'created_at': datetime.now(),
-                'family_id': family_id
-            })
-            return content
-        except Exception as e:
-            return f"Erro ao gerar briefing: {e}"
+    future = briefing_worker.submit(db, family_id, context)
+    if future.done():
+        error = future.exception()
+        if error is None:
+            st.info(future.result(), icon="🌅")
+        elif isinstance(error, llm.LLMUnavailable):
+            fallback()
+        else:
+            st.warning(f"Erro ao gerar briefing: {error}", icon="🌅")
+        return
+    
+    @st.fragment(run_every=2)
+    def pending_briefing():
+        if future.done():
+            st.rerun()  # Rerun completo: agora o caminho acima exibe o texto
+        st.info("🤖 O Consultor IA está preparando seu resumo matinal...", icon="🌅")
+    
+    pending_briefing()
 
 def render_dashboard_home():
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    import services.projection as projection
+    
     # --- ÁREA PRINCIPAL ---
     # Use name from session if available, else email fallback
     display_name = st.session_state.get('user_name') or st.session_state.email.split('@')[0]
@@ -1106,53 +1298,48 @@ def render_dashboard_home():
     family_id = get_user_family_id()
     
     # --- 2. DATA PROCESSING ---
-    # Family Income (Sum of all members)
-    # We need to find all users with the same family_id
-    # Note: Using a simple query since we don't have a direct 'users' index by family_id yet, 
-    # but strictly speaking we should query WHERE family_id == ...
-    # For now, let's assume we can query users. If index missing, might default to current user, 
-    # but let's try to do it right.
-    try:
-        family_users = db.collection('users').where('family_id', '==', family_id).stream()
-        family_income = sum([float(u.to_dict().get('income', 0.0)) for u in family_users])
-    except:
-        # Fallback if index issue
-        user_doc = db.collection('users').document(st.session_state.user_id).get()
-        family_income = float(user_doc.to_dict().get('income', 0.0)) if user_doc.exists else 0.0
-    
-    # Transactions (Restore deleted block)
-    docs_trans = db.collection('transactions').where("family_id", "==", family_id).stream()
-    trans_data = [doc.to_dict() for doc in docs_trans]
-    df_trans = pd.DataFrame(trans_data)
+    # As leituras são independentes: disparadas em paralelo, o tempo total
+    # fica perto da consulta mais lenta em vez da soma de todas.
+    user_id = st.session_state.user_id
+    
+    def load_family_income():
+        # Family Income (Sum of all members)
+        try:
+            family_users = repo.family_users(family_id)
+            return sum([float(u.get('income', 0.0)) for u in family_users])
+        except:
+            # Fallback if index issue
+            user_data = repo.get_user(user_id)
+            return float(user_data.get('income', 0.0)) if user_data else 0.0
+    
+    results, timings = run_parallel({
+        'users': load_family_income,
+        # Cubo de gastos pré-agregado, mantido a partir do snapshot local (só o que mudou vem da rede)
+        'rollup': lambda: repo.spending_rollup(family_id),
+        'debts': lambda: repo.list_family('debts', family_id),
+        'recurring_expenses': lambda: repo.list_family('recurring_expenses', family_id),
+        # Lido do resumo mensal pré-agregado: 1 documento, independe do tamanho do histórico
+        'summary': lambda: repo.month_summary(family_id),
+        # Últimos meses fechados, para a média de gastos variáveis da projeção
+        'history': lambda: repo.previous_summaries(family_id, months=3),
+        'briefing': lambda: repo.get_briefing(family_id),
+    }, metric_prefix='dashboard')
+    
+    family_income = results['users']
     
     # Debts (Installments vs Total)
-    docs_debts = db.collection('debts').where("family_id", "==", family_id).stream()
-    debts_data = [doc.to_dict() for doc in docs_debts]
+    debts_data = results['debts']
     total_debts_liability = sum(d['total_value'] for d in debts_data)
     total_debt_monthly = sum(d.get('installment_value', 0) for d in debts_data)
     
     # Recurring (Monthly Fixed)
-    docs_rec = db.collection('recurring_expenses').where("family_id", "==", family_id).stream()
-    rec_data = [doc.to_dict() for doc in docs_rec]
+    rec_data = results['recurring_expenses']
     total_rec_monthly = sum(r['amount'] for r in rec_data)
     
     # Transactions (Variable Spend this month)
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    rec_val = 0.0 # Receitas extras
-    desp_variable_val = 0.0 # Gastos variáveis
-    
-    if not df_trans.empty:
-        df_trans['date'] = pd.to_datetime(df_trans['date'])
-        # Filter current month for "Variable Spend" calculation
-        df_month = df_trans[(df_trans['date'].dt.month == current_month) & (df_trans['date'].dt.year == current_year)]
-        
-        rec_val = df_month[df_month['type']=='Receita']['value'].sum()
-        desp_variable_val = df_month[df_month['type']=='Despesa']['value'].sum()
-        
-        # Calculate Current Actual Balance (All time or synced bank balance)
-        # For this view, let's look at "Projected Month Result"
+    month_summary = results['summary']
+    rec_val = float(month_summary['totals'].get('Receita', 0.0)) # Receitas extras
+    desp_variable_val = float(month_summary['totals'].get('Despesa', 0.0)) # Gastos variáveis
         
     # --- CALCULO DA VISÃO CONJUNTA (DRE) ---
     total_obligations = total_rec_monthly + total_debt_monthly
@@ -1161,8 +1348,12 @@ def render_dashboard_home():
     remaining = total_income - total_spent
     
     # --- AI MORNING BRIEFING ---
-    briefing = get_daily_briefing(family_id, display_name, rec_data, total_debts_liability, remaining)
-    st.info(briefing, icon="🌅")
+    render_briefing(family_id, {
+        'user_name': display_name,
+        'rec_expenses': rec_data,
+        'debts_total': total_debts_liability,
+        'current_balance': remaining
+    }, results['briefing'])
 
     # --- 3. DASHBOARD UNIFICADO (VISÃO GERAL) ---
     st.markdown("### 🔭 Visão Mensal Unificada (Família)")
@@ -1189,9 +1380,32 @@ def render_dashboard_home():
     )
     st.plotly_chart(fig_waterfall, use_container_width=True)
 
+    # --- PROJEÇÃO DE CAIXA ---
+    with st.expander("📈 Saldo Projetado (próximos meses)", expanded=False):
+        horizon = st.radio("Horizonte", projection.HORIZONS, horizontal=True, format_func=lambda m: f"{m} meses", key="projection_horizon")
+        variable_avg = projection.average_variable_spend(results['history'], fallback=desp_variable_val)
+        proj = projection.project_cashflow(datetime.now().date(), horizon, family_income, rec_data, debts_data, variable_avg)
+        
+        fig_proj = go.Figure(go.Scatter(x=proj['dates'], y=proj['balance'], mode='lines', line=dict(color="#3498db"), fill='tozeroy'))
+        fig_proj.add_hline(y=0, line_color="#e74c3c", line_dash="dash")
+        fig_proj.update_layout(
+            title="Saldo acumulado projetado a partir de hoje",
+            showlegend=False,
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(0,0,0,0)",
+            font=dict(color="white")
+        )
+        st.plotly_chart(fig_proj, use_container_width=True)
+        
+        negative_day = projection.first_negative_day(proj)
+        if negative_day:
+            st.warning(f"⚠️ No ritmo atual o saldo fica negativo em {negative_day.strftime('%d/%m/%Y')}.")
+        st.caption(f"Renda {format_currency(family_income)}/mês, gastos variáveis médios {format_currency(variable_avg)}/mês, parcelas até a última prestação.")
+
     # --- 4. DETAILED CARDS ---
     def card(label, value, color, sub="", big=True):
         f_size = "24px" if big else "18px"
+        label, value, sub = escape(str(label)), escape(str(value)), escape(str(sub))
         st.markdown(
             f"""
             <div style="background-color: #1E1E1E; padding: 15px; border-radius: 10px; border-left: 5px solid {color}; height: 100%;">
@@ -1222,10 +1436,7 @@ def render_dashboard_home():
         tab1, tab2 = st.tabs(["Despesas do Mês", "Maiores Dívidas"])
         
         with tab1:
-            if not df_trans.empty and not df_trans[df_trans['type']=='Despesa'].empty:
-                st.plotly_chart(px.pie(df_trans[df_trans['type']=='Despesa'], values='value', names='category', hole=0.4), use_container_width=True)
-            else:
-                st.write("Sem dados de despesas este mês.")
+            render_spending_breakdown(results['rollup'])
                 
         with tab2:
             if debts_data:
@@ -1261,21 +1472,113 @@ def render_dashboard_home():
 
     # --- 5. EXTRATO ---
     with st.expander("📜 Extrato Detalhado", expanded=False):
-        if not df_trans.empty:
-            st.dataframe(
-                df_trans[['date', 'description', 'value', 'type']], 
-                use_container_width=True, 
-                hide_index=True,
-                column_config={
-                    "date": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
-                    "description": "Descrição",
-                    "value": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
-                    "type": "Tipo"
-                }
-            )
+        render_extrato(family_id)
+
+    if st.secrets.get("SHOW_TIMINGS", False):
+        render_timings(timings)
+
+def render_timings(timings):
+    """Tempos das leituras do dashboard (desta renderização e p95 do processo) e das chamadas à IA, para diagnóstico"""
+    import pandas as pd
+    from services import metrics
+
+    history = metrics.summary('dashboard.')
+    rows = [
+        {
+            "Leitura": name,
+            "Agora (ms)": round(seconds * 1000, 1),
+            "p95 (ms)": round(history.get(f"dashboard.{name}", {}).get('p95_ms', 0.0), 1),
+        }
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1])
+    ]
+    ai = llm.stats()
+    ai_rows = [
+        {"Chamada": name, "Qtd.": values['count'], "Média (ms)": round(values['avg_ms']), "p95 (ms)": round(values['p95_ms'])}
+        for name, values in sorted(ai['sites'].items())
+    ]
+    with st.expander("⏱️ Tempos de Carregamento", expanded=False):
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        st.caption(f"🤖 IA: circuito {ai['breaker']}")
+        if ai_rows:
+            st.dataframe(pd.DataFrame(ai_rows), hide_index=True, use_container_width=True)
+
+SPENDING_PERIODS = {"Este mês": 1, "3 meses": 3, "6 meses": 6, "12 meses": 12, "Tudo": None}
+
+def render_spending_breakdown(cube):
+    """Despesas por categoria a partir do cubo pré-agregado: qualquer período ou membro sem varrer as transações"""
+    import plotly.express as px
+
+    from services.rollups import months_window
+    
+    c1, c2 = st.columns(2)
+    period = c1.selectbox("Período", list(SPENDING_PERIODS), key="spending_period")
+    members = c2.multiselect("Quem gastou", cube.members, default=cube.members, key="spending_members")
+    months = SPENDING_PERIODS[period]
+    start, end = months_window(months) if months else (None, None)
+    
+    by_category = cube.totals(start, end, members=members)
+    if not by_category:
+        st.write("Sem dados de despesas neste período.")
+        return
+    st.plotly_chart(px.pie(names=list(by_category), values=list(by_category.values()), hole=0.4), use_container_width=True)
+    
+    # Drill-down: uma categoria mês a mês (ou por membro, no mês atual)
+    options = sorted(by_category, key=by_category.get, reverse=True)
+    category = st.selectbox("Detalhar categoria", ["Todas", *options], key="spending_category")
+    categories = None if category == "Todas" else [category]
+    if months == 1:
+        by_member = cube.totals(start, end, by='member', members=members, categories=categories)
+        st.plotly_chart(px.bar(x=list(by_member), y=list(by_member.values()), labels={'x': 'Membro', 'y': 'R$'}), use_container_width=True)
+    else:
+        dates, values = cube.monthly(start, end, members=members, categories=categories)
+        st.plotly_chart(px.bar(x=dates, y=values, labels={'x': 'Mês', 'y': 'R$'}), use_container_width=True)
+
+def render_extrato(family_id):
+    """Extrato paginado por cursor: carrega uma página por vez e acumula na sessão"""
+    import pandas as pd
+    
+    # Muda a cada escrita nas transações: de qualquer sessão do processo (cache) ou do parceiro (listener)
+    version = (family_cache.generation('transactions', family_id), live_store.version(family_id, 'transactions'))
+    state = st.session_state.get('extrato')
+    if not state or state['family_id'] != family_id or state['version'] != version:
+        rows, cursor = repo.transactions_page(family_id)
+        state = {'family_id': family_id, 'version': version, 'rows': rows, 'cursor': cursor}
+        st.session_state.extrato = state
+    
+    if state['rows']:
+        df_extrato = pd.DataFrame(state['rows'])
+        df_extrato['date'] = pd.to_datetime(df_extrato['date'])
+        st.dataframe(
+            df_extrato[['date', 'description', 'value', 'type']], 
+            use_container_width=True, 
+            hide_index=True,
+            column_config={
+                "date": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                "description": "Descrição",
+                "value": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                "type": "Tipo"
+            }
+        )
+        st.caption(f"{len(state['rows'])} lançamentos carregados")
+    else:
+        st.write("Nenhum lançamento ainda.")
+    
+    if state['cursor'] is not None and st.button("⬇️ Carregar mais", key="extrato_more"):
+        rows, cursor = repo.transactions_page(family_id, cursor=state['cursor'])
+        state['rows'].extend(rows)
+        state['cursor'] = cursor
+        st.rerun()
 
 # --- CONTROLLER PRINCIPAL ---
 
+# Primeira execução da sessão: tenta reabrir a sessão salva no cookie
+if 'user_id' not in st.session_state and 'session_checked' not in st.session_state:
+    st.session_state.session_checked = True
+    restore_session()
+
+if 'pending_session_cookie' in st.session_state:
+    set_session_cookie(st.session_state.pop('pending_session_cookie'))
+
 if 'user_id' not in st.session_state:
     # TELA DE LOGIN
     c1, c2 = st.columns([1, 4])
@@ -0,0 +1 @@
+"""Benchmarks reproduzíveis dos caminhos quentes (ver benchmarks/run.py)."""
@@ -0,0 +1,61 @@
+"""
+Compara dois relatórios de `benchmarks.run` (ex.: main x branch).
+
+    python -m benchmarks.compare anterior.json atual.json --threshold 0.2
+
+Sai com código 1 se algum caso piorou mais que o limite.
+"""
+import argparse
+import json
+import sys
+
+# Diferenças absolutas abaixo disso são ruído de medição
+NOISE_MS = 1.0
+
+
+def compare_reports(baseline, current, threshold=0.2):
+    """Linhas {'case', 'before_ms', 'after_ms', 'ratio', 'regression'} dos casos presentes nos dois relatórios."""
+    rows = []
+    before = baseline.get('results', {})
+    for case, stats in current.get('results', {}).items():
+        if case not in before:
+            continue
+        old, new = before[case]['median_ms'], stats['median_ms']
+        ratio = new / old if old else float('inf')
+        rows.append({
+            'case': case,
+            'before_ms': old,
+            'after_ms': new,
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold and new - old > NOISE_MS,
+        })
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'caso':32} {'antes (ms)':>12} {'depois (ms)':>12} {'razão':>8}")
+    for r in rows:
+        flag = '  ⚠️ regressão' if r['regression'] else ''
+        print(f"{r['case']:32} {r['before_ms']:>12.2f} {r['after_ms']:>12.2f} {r['ratio']:>7.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois relatórios de benchmark.")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.2, help="piora relativa da mediana considerada regressão")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare_reports(baseline, current, args.threshold)
+    print_comparison(rows)
+    if any(r['regression'] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
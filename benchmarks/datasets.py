@@ -0,0 +1,158 @@
+"""
+Famílias sintéticas e planilhas geradas para os benchmarks.
+
+Tudo é determinístico (semente fixa e datas ancoradas em ANCHOR), então
+duas execuções em commits diferentes medem exatamente os mesmos dados.
+As famílias grandes são gravadas uma vez em SQLite e reaproveitadas.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+from services import summaries
+from services.bulk_writer import BulkWriter, WriteOp
+from services.local_store import LocalClient
+
+# Mês "atual" dos dados: o dashboard é medido como se hoje fosse ANCHOR
+ANCHOR = datetime(2025, 12, 15)
+MONTHS = 12
+CATEGORIES = ["Casa", "Mercado", "Lazer", "Transporte", "Salário", "Investimento", "Outros"]
+MEMBERS = ["ana", "beto"]
+DATA_DIR = os.path.join(os.path.dirname(__file__), '.data')
+
+
+def family_id_for(n_transactions):
+    return f"BENCH{n_transactions}"
+
+
+def _transaction(rng, family_id):
+    days = rng.randrange(MONTHS * 30)
+    is_income = rng.random() < 0.1
+    return {
+        'family_id': family_id,
+        'user_name': rng.choice(MEMBERS),
+        'type': 'Receita' if is_income else 'Despesa',
+        'value': round(rng.uniform(5, 3000 if is_income else 400), 2),
+        'description': f"Lançamento {rng.randrange(10_000)}",
+        'category': 'Salário' if is_income else rng.choice(CATEGORIES),
+        'date': ANCHOR - timedelta(days=days),
+    }
+
+
+def populate_family(db, family_id, n_transactions, seed=0, debts=12, recurring=15, cards=3):
+    """Grava uma família completa (membros, dívidas, fixas, cartões, transações e resumos)."""
+    rng = random.Random(f"{seed}-{family_id}")
+    col = db.collection
+    ops = []
+    for i, name in enumerate(MEMBERS):
+        ops.append(WriteOp(col('users').document(f"{family_id}-u{i}"), {
+            'email': f"{name}@bench.local", 'family_id': family_id, 'name': name,
+            'income': float(rng.randrange(2000, 9000)), 'setup_completed': True,
+        }))
+    for i in range(debts):
+        installments = rng.randrange(2, 48)
+        installment = round(rng.uniform(50, 900), 2)
+        ops.append(WriteOp(col('debts').document(f"{family_id}-d{i}"), {
+            'family_id': family_id, 'user_id': f"{family_id}-u0", 'description': f"Dívida {i}",
+            'total_value': round(installment * installments, 2), 'installment_value': installment,
+            'remaining_installments': installments, 'interest_rate': round(rng.uniform(0, 8), 2),
+        }))
+    for i in range(recurring):
+        ops.append(WriteOp(col('recurring_expenses').document(f"{family_id}-r{i}"), {
+            'family_id': family_id, 'user_id': f"{family_id}-u0", 'description': f"Conta {i}",
+            'amount': round(rng.uniform(30, 1500), 2), 'due_day': rng.randrange(1, 29),
+        }))
+    for i in range(cards):
+        ops.append(WriteOp(col('credit_cards').document(f"{family_id}-c{i}"), {
+            'family_id': family_id, 'user_id': f"{family_id}-u0", 'name': f"Cartão {i}",
+            'limit': float(rng.randrange(1000, 20000, 500)), 'closing_day': rng.randrange(1, 29), 'due_day': rng.randrange(1, 29),
+        }))
+    writer = BulkWriter(db, chunk_size=500)
+    writer.write(ops)
+
+    # Transações em lotes para não materializar 1M dicts de uma vez
+    step = 50_000
+    for offset in range(0, n_transactions, step):
+        writer.write([
+            WriteOp(col('transactions').document(f"{family_id}-t{i:07d}"), _transaction(rng, family_id))
+            for i in range(offset, min(offset + step, n_transactions))
+        ])
+    summaries.rebuild_family(db, family_id)
+
+
+def open_family(n_transactions, seed=0, data_dir=DATA_DIR, log=print):
+    """
+    Retorna (cliente, family_id) de uma família com `n_transactions` transações,
+    gerando o arquivo SQLite na primeira vez.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    family_id = family_id_for(n_transactions)
+    path = os.path.join(data_dir, f"{family_id}-seed{seed}.sqlite3")
+    if os.path.exists(path):
+        return LocalClient(path), family_id
+
+    log(f"Gerando {family_id} ({n_transactions} transações)...")
+    tmp = path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = LocalClient(tmp)
+    populate_family(db, family_id, n_transactions, seed)
+    db.close()
+    os.replace(tmp, path)
+    return LocalClient(path), family_id
+
+
+def make_workbook(n_rows, seed=0):
+    """Planilha Excel 2003 XML no formato do importador, com dívidas, fixas e despesas. Retorna bytes."""
+    rng = random.Random(f"{seed}-workbook-{n_rows}")
+    rows = ['<Row><Cell><Data ss:Type="String">DESCRIÇÃO</Data></Cell><Cell><Data ss:Type="String">VALOR</Data></Cell></Row>']
+    for i in range(n_rows):
+        value = round(rng.uniform(10, 2000), 2)
+        date = (ANCHOR - timedelta(days=rng.randrange(365))).strftime('%Y-%m-%dT00:00:00.000')
+        cells = [
+            f'<Cell><Data ss:Type="String">{escape(f"Item {i}")}</Data></Cell>',
+            f'<Cell><Data ss:Type="Number">{value}</Data></Cell>',
+            f'<Cell><Data ss:Type="DateTime">{date}</Data></Cell>',
+        ]
+        if rng.random() < 0.3:
+            installments = rng.randrange(2, 24)
+            per = f"{value / installments:.2f}".replace('.', ',')
+            cells.append(f'<Cell ss:Index="5"><Data ss:Type="String">{per} x {installments}</Data></Cell>')
+        rows.append(f"<Row>{''.join(cells)}</Row>")
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Workbook xmlns="urn:schemas-microsoft-com:office:spreadsheet" '
+        'xmlns:ss="urn:schemas-microsoft-com:office:spreadsheet">'
+        '<Worksheet ss:Name="Planilha1"><Table>' + ''.join(rows) + '</Table></Worksheet></Workbook>'
+    ).encode('utf-8')
+
+
+def _statement_lines(n_rows, rng):
+    for i in range(n_rows):
+        amount = round(rng.uniform(5, 800), 2) * (1 if rng.random() < 0.1 else -1)
+        yield ANCHOR - timedelta(days=rng.randrange(31)), f"Compra {i}", amount
+
+
+def make_bank_csv(n_rows, seed=0):
+    """Extrato CSV de banco (cp1252, ';', valores 1.234,56 e preâmbulo). Retorna bytes."""
+    rng = random.Random(f"{seed}-csv-{n_rows}")
+    lines = ["Extrato Conta Corrente", "Agência;0001;Conta;12345-6", "", "Data;Histórico;Docto.;Valor (R$);Saldo (R$)"]
+    for date, description, amount in _statement_lines(n_rows, rng):
+        value = f"{amount:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+        lines.append(f"{date:%d/%m/%Y};{description};{rng.randrange(10**6)};{value};")
+    return ('\r\n'.join(lines) + '\r\n').encode('cp1252')
+
+
+def make_ofx(n_rows, seed=0):
+    """Extrato OFX 1.x (SGML, sem tags de fechamento nos campos). Retorna bytes."""
+    rng = random.Random(f"{seed}-ofx-{n_rows}")
+    parts = ["OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nCHARSET:1252\n\n<OFX>\n<BANKMSGSRSV1><STMTTRNRS><STMTRS>\n<BANKTRANLIST>\n"]
+    for i, (date, description, amount) in enumerate(_statement_lines(n_rows, rng)):
+        parts.append(
+            f"<STMTTRN>\n<TRNTYPE>{'CREDIT' if amount > 0 else 'DEBIT'}\n<DTPOSTED>{date:%Y%m%d}100000[-3:BRT]\n"
+            f"<TRNAMT>{amount:.2f}\n<FITID>{i}\n<MEMO>{description}\n</STMTTRN>\n"
+        )
+    parts.append("</BANKTRANLIST>\n</STMTRS></STMTTRNRS></BANKMSGSRSV1>\n</OFX>\n")
+    return ''.join(parts).encode('cp1252')
@@ -0,0 +1,250 @@
+"""
+Benchmarks dos caminhos quentes do app sobre o backend local (SQLite).
+
+    python -m benchmarks.run                                  # 100 e 10k transações
+    python -m benchmarks.run --scales 100 10000 1000000 --repeat 3
+    python -m benchmarks.run --output atual.json --baseline anterior.json
+
+Cada caso roda `--repeat` vezes a frio: cache da família vazio, sem o
+snapshot Arrow em disco e sem o cubo de gastos em memória. O relatório
+JSON guarda mínimo, mediana e máximo em ms. Os relatórios de dois
+commits podem ser comparados com `python -m benchmarks.compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import datasets
+from benchmarks.compare import compare_reports, print_comparison
+from services import imports, payoff, projection, rollups, snapshots, summaries, transactions
+from services.cache import family_cache
+from services.local_store import LocalClient
+from services.parallel import run_parallel
+from services.repository import Repository
+from utils import importers
+
+DEFAULT_SCALES = [100, 10_000]
+DEFAULT_WORKBOOK_ROWS = [100, 1_000, 10_000]
+DEFAULT_IMPORT_ROWS = [100, 1_000, 10_000]
+SNAPSHOT_DIR = os.path.join(datasets.DATA_DIR, 'snapshots')
+
+
+def measure(fn, repeat, setup=None):
+    """Roda `fn` `repeat` vezes (com `setup()` fora da medição). Retorna as estatísticas em ms."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append(1000 * (time.perf_counter() - start))
+    return {
+        'runs': repeat,
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+# --- Casos ---
+
+def dashboard(repo, family_id):
+    """Mesmas leituras e agregações do dashboard, no mês de ANCHOR."""
+    now = datasets.ANCHOR
+    results, _ = run_parallel({
+        'users': lambda: sum(float(u.get('income', 0.0)) for u in repo.family_users(family_id)),
+        'rollup': lambda: snapshots.rollup(repo.client, family_id, directory=SNAPSHOT_DIR),
+        'debts': lambda: repo.list_family('debts', family_id),
+        'recurring_expenses': lambda: repo.list_family('recurring_expenses', family_id),
+        'summary': lambda: repo.month_summary(family_id, now),
+        'history': lambda: summaries.get_previous_summaries(repo.client, family_id, months=3, date=now),
+        'briefing': lambda: repo.get_briefing(family_id, now),
+    })
+    results['rollup'].totals(*transactions.month_range(now))
+    spent = float(results['summary']['totals'].get('Despesa', 0.0))
+    variable_avg = projection.average_variable_spend(results['history'], fallback=spent)
+    projection.project_cashflow(now.date(), 6, results['users'], results['recurring_expenses'], results['debts'], variable_avg)
+
+
+def debts_view(repo, family_id):
+    debts = repo.list_family('debts', family_id)
+    payoff.compare_strategies(debts, 500.0)
+
+
+def recurring_view(repo, family_id):
+    rec = repo.list_family('recurring_expenses', family_id)
+    sorted((r for r in rec if r['due_day'] >= datasets.ANCHOR.day), key=lambda r: r['due_day'])
+    sum(r['amount'] for r in rec)
+
+
+def extrato_page(repo, family_id):
+    repo.transactions_page(family_id)
+
+
+def spending_drilldown(repo, family_id):
+    """Recortes da pizza de despesas: cada período, por membro e uma categoria mês a mês."""
+    cube = snapshots.rollup(repo.client, family_id, directory=SNAPSHOT_DIR)
+    for months in (1, 3, 6, 12, None):
+        start, end = rollups.months_window(months, datasets.ANCHOR) if months else (None, None)
+        by_category = cube.totals(start, end)
+        cube.totals(start, end, by='member', categories=list(by_category)[:1])
+        cube.monthly(start, end, members=cube.members[:1])
+
+
+FAMILY_CASES = {
+    'dashboard': dashboard,
+    'debts_view': debts_view,
+    'recurring_view': recurring_view,
+    'extrato_page': extrato_page,
+    'spending_drilldown': spending_drilldown,
+}
+
+
+def _reset(family_id):
+    """Estado frio (fora da medição): sem caches em memória e sem o snapshot da família no disco."""
+    family_cache.clear()
+    projection._project.cache_clear()
+    snapshots._rollups.pop(family_id, None)
+    for path in snapshots._paths(family_id, SNAPSHOT_DIR):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def run_family_cases(scales, repeat, seed, only=None, log=print):
+    results = {}
+    for n in scales:
+        db, family_id = datasets.open_family(n, seed, log=log)
+        repo = Repository(db)
+        for name, fn in FAMILY_CASES.items():
+            if only and name not in only:
+                continue
+            key = f"{name}[{n}]"
+            log(f"  {key}")
+            results[key] = measure(lambda _: fn(repo, family_id), repeat, setup=lambda: _reset(family_id))
+        db.close()
+    return results
+
+
+PARSER_CASES = {
+    'parse_excel_xml': (datasets.make_workbook, importers.parse_excel_xml),
+    'parse_bank_csv': (datasets.make_bank_csv, lambda data: importers.parse_file(data, format='csv')),
+    'parse_ofx': (datasets.make_ofx, lambda data: importers.parse_file(data, format='ofx')),
+}
+
+
+def run_parser_cases(sizes, repeat, seed, only=None, log=print):
+    results = {}
+    for name, (make, parse) in PARSER_CASES.items():
+        if only and name not in only:
+            continue
+        for n in sizes:
+            data = make(n, seed)
+            key = f"{name}[{n}]"
+            log(f"  {key}")
+            results[key] = measure(lambda: parse(data), repeat)
+            results[key]['bytes'] = len(data)
+    return results
+
+
+def run_import_cases(sizes, repeat, seed, log=print):
+    """
+    `save_imported_data` sem a UI: monta as operações e grava em blocos num
+    banco vazio (save_import) e num banco que já tem o mesmo arquivo (reimport).
+    """
+    results = {}
+    for n in sizes:
+        items = importers.parse_excel_xml(datasets.make_workbook(n, seed))['items']
+        family_id = datasets.family_id_for(n)
+
+        def save(db):
+            ops = imports.build_import_ops(db, items, family_id, 'bench-user')
+            imports.write_import(db, ops, family_id)
+            db.close()
+
+        key = f"save_import[{n}]"
+        log(f"  {key}")
+        results[key] = measure(save, repeat, setup=LocalClient)
+
+        def imported():
+            # Banco que já recebeu o mesmo arquivo: a reimportação só consulta e pula
+            db = LocalClient()
+            imports.write_import(db, imports.build_import_ops(db, items, family_id, 'bench-user'), family_id)
+            return db
+
+        key = f"reimport[{n}]"
+        log(f"  {key}")
+        results[key] = measure(save, repeat, setup=imported)
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales=DEFAULT_SCALES, workbook_rows=DEFAULT_WORKBOOK_ROWS, import_rows=DEFAULT_IMPORT_ROWS,
+        repeat=5, seed=0, only=None, log=print):
+    """Roda os benchmarks e retorna o relatório (dict serializável em JSON)."""
+    results = {}
+    if not only or set(only) & set(FAMILY_CASES):
+        results.update(run_family_cases(scales, repeat, seed, only, log))
+    if not only or set(only) & set(PARSER_CASES):
+        results.update(run_parser_cases(workbook_rows, repeat, seed, only, log))
+    if not only or {'save_import', 'reimport'} & set(only):
+        results.update(run_import_cases(import_rows, repeat, seed, log))
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'sqlite',
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes com famílias sintéticas.")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help="transações por família")
+    parser.add_argument('--workbook-rows', type=int, nargs='+', default=DEFAULT_WORKBOOK_ROWS, help="linhas das planilhas e extratos dos parsers")
+    parser.add_argument('--import-rows', type=int, nargs='+', default=DEFAULT_IMPORT_ROWS, help="itens gravados na importação")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help=f"casos a rodar: {', '.join([*FAMILY_CASES, *PARSER_CASES, 'save_import', 'reimport'])}")
+    parser.add_argument('--output', default='benchmark-report.json', help="arquivo do relatório JSON")
+    parser.add_argument('--baseline', help="relatório anterior para comparar")
+    parser.add_argument('--threshold', type=float, default=0.2, help="piora relativa da mediana considerada regressão")
+    args = parser.parse_args()
+
+    report = run(args.scales, args.workbook_rows, args.import_rows, args.repeat, args.seed, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Relatório salvo em {args.output}")
+
+    for key, stats in report['results'].items():
+        print(f"{key:32} {stats['median_ms']:>12.2f} ms")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare_reports(baseline, report, args.threshold)
+        print_comparison(rows)
+        if any(r['regression'] for r in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Perfil de partida a frio do app: tempo de import e do primeiro render.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 3 --output startup.json
+
+Cada execução roda o app.py num processo novo (`python -X importtime`),
+com o backend em memória e a tela de login, via `streamlit.testing`. O
+relatório mostra o tempo até o primeiro render, os imports mais caros e
+se algum módulo pesado (pandas, plotly, Gemini, pyarrow) foi carregado
+antes de ser necessário.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+# O próprio Streamlit já carrega numpy (page_icon) e plotly.graph_objects
+HEAVY_MODULES = ('pandas', 'plotly.express', 'google.generativeai', 'pyarrow')
+
+# Roda dentro do processo filho; imprime o JSON na última linha do stdout
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+ready = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.secrets['GEMINI_KEY'] = 'startup-profile'
+at.secrets['STORAGE_BACKEND'] = 'memory'
+at.run()
+done = time.perf_counter()
+heavy = [m for m in sys.argv[2:] if m in sys.modules]
+print(json.dumps({
+    'streamlit_ms': 1000 * (ready - start),
+    'first_render_ms': 1000 * (done - ready),
+    'exceptions': [e.message for e in at.exception],
+    'heavy_loaded': heavy,
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Linhas do `-X importtime` em [(módulo, self_us, cumulativo_us, nível)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2))
+        except ValueError:
+            continue
+    return rows
+
+
+def profile_once(app=APP):
+    """Uma partida a frio num processo novo. Retorna (medidas, linhas do importtime)."""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD, app, *HEAVY_MODULES],
+        capture_output=True, text=True, cwd=os.path.dirname(app), check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1]), parse_importtime(out.stderr)
+
+
+def profile(runs=3, top=15, app=APP):
+    """Relatório (dict serializável) com a mediana de `runs` partidas a frio."""
+    samples = [profile_once(app) for _ in range(runs)]
+    measures = [m for m, _ in samples]
+    # Imports de primeiro nível da última execução, do mais caro ao mais barato
+    imports = sorted((r for r in samples[-1][1] if r[3] == 0), key=lambda r: r[2], reverse=True)
+    return {
+        'runs': runs,
+        'streamlit_ms': round(statistics.median(m['streamlit_ms'] for m in measures), 1),
+        'first_render_ms': round(statistics.median(m['first_render_ms'] for m in measures), 1),
+        'heavy_loaded': measures[-1]['heavy_loaded'],
+        'exceptions': measures[-1]['exceptions'],
+        'top_imports': [{'module': name, 'cumulative_ms': round(cum / 1000, 1)} for name, _, cum, _ in imports[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de partida a frio do app (imports e primeiro render).")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help="imports mais caros listados")
+    parser.add_argument('--output', help="arquivo do relatório JSON")
+    args = parser.parse_args()
+
+    report = profile(args.runs, args.top)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório salvo em {args.output}")
+
+    print(f"{'import streamlit':32} {report['streamlit_ms']:>10.1f} ms")
+    print(f"{'primeiro render (login)':32} {report['first_render_ms']:>10.1f} ms")
+    print(f"módulos pesados carregados: {', '.join(report['heavy_loaded']) or 'nenhum'}")
+    for e in report['exceptions']:
+        print(f"exceção no app: {e}")
+    for row in report['top_imports']:
+        print(f"  {row['module']:30} {row['cumulative_ms']:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Cliente HTTP da API REST do Firebase Auth (Identity Toolkit).
+
+Uma `requests.Session` por chave de API, compartilhada pelo processo: as
+conexões ficam no pool (keep-alive) e o login não paga um handshake TLS
+novo a cada chamada. Toda requisição tem timeout, e erros de rede ou 5xx
+são repetidos algumas vezes com backoff e jitter (menos o envio do email de
+recuperação de senha, que não é idempotente).
+
+`base_url` e `token_url` permitem apontar para o emulador do Firebase Auth
+ou para um servidor local de teste, ex.:
+    http://localhost:9099/identitytoolkit.googleapis.com/v1
+    http://localhost:9099/securetoken.googleapis.com/v1/token
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+IDENTITY_TOOLKIT_URL = "https://identitytoolkit.googleapis.com/v1"
+SECURE_TOKEN_URL = "https://securetoken.googleapis.com/v1/token"
+# (conexão, leitura) em segundos
+DEFAULT_TIMEOUT = (3.05, 10)
+RETRY_STATUS = {500, 502, 503, 504}
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+# Falha de rede sem resposta da API; quem chama captura daqui sem importar o requests
+RequestError = requests.exceptions.RequestException
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class AuthError(Exception):
+    """Erro retornado pela API; `code` é a mensagem do Firebase (ex.: INVALID_PASSWORD)."""
+
+    def __init__(self, code, status=None):
+        super().__init__(code)
+        self.code = code
+        self.status = status
+
+
+class AuthClient:
+    def __init__(self, api_key, base_url=IDENTITY_TOOLKIT_URL, token_url=SECURE_TOKEN_URL,
+                 timeout=DEFAULT_TIMEOUT, max_retries=2, base_delay=0.2, pool_size=10):
+        """
+        Args:
+            api_key: FIREBASE_API_KEY (chave web do projeto).
+            base_url: raiz da API, sem barra no final.
+            token_url: endpoint de troca do refresh token.
+            timeout: segundos, número ou (conexão, leitura).
+            max_retries: novas tentativas em erro de rede ou 5xx.
+            base_delay: espera inicial do backoff, em segundos.
+            pool_size: conexões mantidas abertas por host.
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.token_url = token_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.session = requests.Session()
+        # Retry próprio (abaixo), então o adapter não repete nada
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _post(self, url, max_retries=None, **body):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            try:
+                response = self.session.post(url, params={'key': self.api_key}, timeout=self.timeout, **body)
+            except RETRYABLE_ERRORS:
+                if attempt == max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS or attempt == max_retries:
+                    return self._result(response)
+            time.sleep(self.base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    @staticmethod
+    def _result(response):
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if response.status_code != 200:
+            code = data.get('error', {}).get('message') or f"HTTP {response.status_code}"
+            raise AuthError(code, response.status_code)
+        return data
+
+    def sign_in(self, email, password):
+        """Verifica email e senha. Retorna a resposta (localId, idToken, refreshToken...)."""
+        return self._post(f"{self.base_url}/accounts:signInWithPassword", json={
+            "email": email,
+            "password": password,
+            "returnSecureToken": True
+        })
+
+    def send_password_reset(self, email):
+        """Envia o email de recuperação de senha, sem retry: um 5xx pode ter enviado o email mesmo assim."""
+        return self._post(f"{self.base_url}/accounts:sendOobCode", max_retries=0, json={
+            "requestType": "PASSWORD_RESET",
+            "email": email
+        })
+
+    def refresh(self, refresh_token):
+        """Troca o refresh token por um ID token novo (id_token, refresh_token, user_id, expires_in)."""
+        return self._post(self.token_url, data={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token
+        })
+
+    def close(self):
+        self.session.close()
+
+
+def get_auth_client(api_key, base_url=None, token_url=None):
+    """Cliente compartilhado pelo processo para a chave (e URLs) informada."""
+    key = (api_key, base_url, token_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = AuthClient(api_key, base_url or IDENTITY_TOOLKIT_URL, token_url or SECURE_TOKEN_URL)
+        return _clients[key]
@@ -0,0 +1,80 @@
+"""
+Avatares em armazenamento endereçado por conteúdo (coleção `avatars`).
+
+O documento `avatars/{sha256}` guarda a miniatura JPEG em base64; o perfil
+em `users/{uid}` guarda só `avatar_hash`. Assim as leituras do usuário
+(login, renda da família) não trazem a imagem. Como o conteúdo de um hash
+nunca muda, os bytes ficam em cache no processo sem invalidação.
+"""
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from google.cloud.firestore import DELETE_FIELD
+
+COLLECTION = 'avatars'
+THUMBNAIL_SIZE = (200, 200)
+MAX_CACHED = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def make_thumbnail(file):
+    """Reduz a imagem enviada para a miniatura do avatar. Retorna bytes JPEG."""
+    from PIL import Image
+
+    image = Image.open(file)
+    image.thumbnail(THUMBNAIL_SIZE)
+    buffered = io.BytesIO()
+    image.convert('RGB').save(buffered, format="JPEG", quality=80)  # Compress
+    return buffered.getvalue()
+
+
+def _remember(digest, data):
+    with _lock:
+        _cache[digest] = data
+        _cache.move_to_end(digest)
+        while len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+
+
+def store_avatar(db, jpeg_bytes):
+    """Grava a imagem (idempotente) e retorna o hash."""
+    digest = hashlib.sha256(jpeg_bytes).hexdigest()
+    db.collection(COLLECTION).document(digest).set({
+        'data': base64.b64encode(jpeg_bytes).decode(),
+        'content_type': 'image/jpeg',
+        'created_at': datetime.now()
+    })
+    _remember(digest, jpeg_bytes)
+    return digest
+
+
+def load_avatar(db, digest):
+    """Bytes da imagem do hash, do cache do processo ou do Firestore (None se não existe)."""
+    with _lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+    doc = db.collection(COLLECTION).document(digest).get()
+    if not doc.exists:
+        return None
+    data = base64.b64decode(doc.to_dict()['data'])
+    _remember(digest, data)
+    return data
+
+
+def set_user_avatar(db, user_ref, jpeg_bytes):
+    """Grava o avatar e aponta o perfil para o hash, removendo o base64 legado."""
+    digest = store_avatar(db, jpeg_bytes)
+    user_ref.update({'avatar_hash': digest, 'avatar_base64': DELETE_FIELD})
+    return digest
+
+
+def migrate_legacy_avatar(db, user_ref, avatar_base64):
+    """Move um `avatar_base64` antigo do documento do usuário para `avatars`."""
+    return set_user_avatar(db, user_ref, base64.b64decode(avatar_base64))
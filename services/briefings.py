@@ -0,0 +1,203 @@
+"""
+Briefing diário da IA (coleção `daily_briefings`), gerado fora do render.
+
+O dashboard nunca espera o LLM: se o documento do dia não existe, a geração
+vai para o `briefing_worker` em segundo plano e a tela mostra um aviso até
+o texto ficar pronto. Com a IA indisponível (disjuntor do `services.llm`
+aberto) a tela mostra `fallback_briefing`, montado sem o LLM e não salvo.
+
+Pré-geração em lote para todas as famílias ativas (ex.: cron às 5h):
+    python -m services.briefings --workers 4 --rate 1
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from services import llm
+from utils.formatting import format_currency
+
+COLLECTION = 'daily_briefings'
+# Depois de uma falha, espera este tempo antes de tentar gerar de novo (segundos)
+RETRY_AFTER = 600
+
+
+def briefing_id(family_id, date=None):
+    """Chave: YYYY-MM-DD_{family_id}"""
+    return f"{(date or datetime.now()).strftime('%Y-%m-%d')}_{family_id}"
+
+
+def build_prompt(user_name, rec_expenses, debts_total, current_balance, today_str):
+    return f"""
+        Você é um consultor financeiro pessoal, amigável e motivador. O usuário é {user_name}.
+        Data de hoje: {today_str}.
+
+        PANORAMA FINANCEIRO:
+        - Saldo Atual em Conta: {format_currency(current_balance)}
+        - Total de Dívidas (Longo Prazo): {format_currency(debts_total)}
+        - Contas Fixas Mensais:
+          {', '.join([f"{r['description']} (Dia {r['due_day']})" for r in rec_expenses[:5]])} ... e mais {max(0, len(rec_expenses)-5)} contas.
+
+        OBJETIVO:
+        Escreva um "Bom dia" curto e inspirador (max 3 parágrafos).
+        1. Comente sobre o saldo atual (dê um alerta sutil se negativo, ou parabéns se positivo).
+        2. Avise se tem alguma conta vencendo hoje ou amanhã (baseado no dia de hoje vs dia das contas fixas).
+        3. Dê uma dica rápida de economia baseada no contexto de ter dívidas (se tiver) ou de investir (se tiver sobrando).
+
+        Tom de voz: Otimista, "Tamo junto", parceiro. Use emojis.
+        """
+
+
+def gemini_generate(prompt):
+    return llm.generate(prompt, site='briefing')
+
+
+def fallback_briefing(context, date=None):
+    """Resumo sem IA (saldo, contas vencendo hoje/amanhã e dívidas) para quando o Gemini está fora."""
+    date = date or datetime.now()
+    days = {date.day, (date + timedelta(days=1)).day}
+    due = [r['description'] for r in context['rec_expenses'] if r.get('due_day') in days]
+    lines = [f"Bom dia, {context['user_name']}! ☀️ Seu saldo atual é {format_currency(context['current_balance'])}."]
+    if due:
+        lines.append(f"📅 Vencendo hoje ou amanhã: {', '.join(due)}.")
+    if context['debts_total']:
+        lines.append(f"💳 Dívidas em aberto: {format_currency(context['debts_total'])}.")
+    return "\n\n".join(lines)
+
+
+def generate_briefing(db, family_id, context, generate=gemini_generate, date=None):
+    """
+    Gera o briefing com o LLM e grava em `daily_briefings`.
+
+    `context`: dict com user_name, rec_expenses, debts_total e current_balance.
+    """
+    date = date or datetime.now()
+    prompt = build_prompt(
+        context['user_name'], context['rec_expenses'], context['debts_total'],
+        context['current_balance'], date.strftime("%Y-%m-%d")
+    )
+    content = generate(prompt)
+    db.collection(COLLECTION).document(briefing_id(family_id, date)).set({
+        'content': content,
+        'created_at': datetime.now(),
+        'family_id': family_id
+    })
+    return content
+
+
+class BriefingWorker:
+    """
+    Gera briefings em threads de fundo, no máximo um por família por dia.
+    Sessões da mesma família (o casal) recebem o mesmo Future.
+    """
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='doispes-briefing')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, db, family_id, context, generate=gemini_generate):
+        doc_id = briefing_id(family_id)
+        with self._lock:
+            # Descarta jobs de outros dias
+            for key in [k for k in self._jobs if not k.startswith(doc_id[:10])]:
+                del self._jobs[key]
+            job = self._jobs.get(doc_id)
+            if job is not None:
+                future, submitted_at = job
+                failed = future.done() and future.exception() is not None
+                if not failed or not self._can_retry(future.exception(), submitted_at):
+                    return future
+            future = self._pool.submit(generate_briefing, db, family_id, context, generate)
+            self._jobs[doc_id] = (future, time.monotonic())
+            return future
+
+    @staticmethod
+    def _can_retry(error, submitted_at):
+        # Recusada pelo gateway (IA fora): tenta de novo assim que o circuito reabrir
+        if isinstance(error, llm.LLMUnavailable):
+            return llm.available()
+        return time.monotonic() - submitted_at >= RETRY_AFTER
+
+
+briefing_worker = BriefingWorker()
+
+
+def family_context(db, family_id):
+    """Monta o contexto do prompt a partir do banco (usado pelo job em lote)."""
+    from services.summaries import get_month_summary
+
+    def family_docs(collection):
+        return [d.to_dict() for d in db.collection(collection).where('family_id', '==', family_id).stream()]
+
+    users = family_docs('users')
+    debts = family_docs('debts')
+    rec = family_docs('recurring_expenses')
+    totals = get_month_summary(db, family_id)['totals']
+
+    income = sum(float(u.get('income', 0.0)) for u in users) + float(totals.get('Receita', 0.0))
+    spent = (sum(r['amount'] for r in rec) + sum(d.get('installment_value', 0) for d in debts)
+             + float(totals.get('Despesa', 0.0)))
+    names = [u.get('name') or u.get('display_name') or u.get('email', '').split('@')[0] for u in users]
+    return {
+        'user_name': ' e '.join(n for n in names if n) or family_id,
+        'rec_expenses': rec,
+        'debts_total': sum(d['total_value'] for d in debts),
+        'current_balance': income - spent,
+    }
+
+
+def active_families(db):
+    """Famílias com pelo menos um membro que concluiu o setup."""
+    users = db.collection('users').where('setup_completed', '==', True).stream()
+    return sorted({u.to_dict().get('family_id') for u in users} - {None})
+
+
+def prewarm(db, families, workers=4, rate=1.0, generate=gemini_generate, log=print):
+    """
+    Gera o briefing do dia das famílias que ainda não têm, com no máximo
+    `workers` chamadas simultâneas e `rate` chamadas/segundo ao LLM (o
+    limite do gateway do processo). Retorna {'generated', 'skipped', 'failed'}.
+    """
+    llm.configure(rate=rate, burst=workers)
+    stats = {'generated': 0, 'skipped': 0, 'failed': 0}
+
+    def run(family_id):
+        if db.collection(COLLECTION).document(briefing_id(family_id)).get().exists:
+            return 'skipped'
+        context = family_context(db, family_id)
+        generate_briefing(db, family_id, context, generate)
+        return 'generated'
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, f): f for f in families}
+        for future in as_completed(futures):
+            try:
+                status = future.result()
+            except Exception as e:
+                status = 'failed'
+                log(f"{futures[future]}: erro {e}")
+            stats[status] += 1
+    return stats
+
+
+def main():
+    from services.firebase import init_db, load_secrets
+
+    parser = argparse.ArgumentParser(description="Pré-gera os briefings diários das famílias ativas.")
+    parser.add_argument('--workers', type=int, default=4, help="chamadas simultâneas ao LLM")
+    parser.add_argument('--rate', type=float, default=1.0, help="chamadas por segundo ao LLM")
+    parser.add_argument('--family', action='append', help="limita a uma ou mais famílias")
+    args = parser.parse_args()
+
+    llm.set_api_key(os.environ.get('GEMINI_KEY') or load_secrets().get('GEMINI_KEY'))
+    db = init_db()
+    families = args.family or active_families(db)
+    stats = prewarm(db, families, workers=args.workers, rate=args.rate)
+    print(f"{len(families)} famílias: {stats}")
+
+
+if __name__ == '__main__':
+    main()
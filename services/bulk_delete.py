@@ -0,0 +1,86 @@
+"""
+Exclusão em massa: pagina os documentos por cursor e apaga cada página em
+batches paralelos (via BulkWriter).
+
+É seguro interromper e rodar de novo: os documentos já apagados somem da
+consulta, então uma nova execução continua de onde parou. O `checkpoint`
+(um dict, ex.: guardado no session_state) registra o que já terminou.
+"""
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from services.bulk_writer import BulkWriter, WriteOp
+
+PAGE_SIZE = 1000
+
+
+def count_query(query):
+    """Total de documentos da consulta via agregação (1 leitura a cada 1000 docs), ou None."""
+    try:
+        return int(query.count().get()[0][0].value)
+    except Exception:
+        return None
+
+
+def delete_query(db, query, page_size=PAGE_SIZE, progress=None, writer=None):
+    """
+    Apaga todos os documentos de `query`, que precisa ter ordenação total
+    (ex.: terminar em order_by do id do documento).
+
+    `progress(deleted, total)` é chamado a cada página; total pode ser None.
+    Retorna quantos documentos foram apagados.
+    """
+    writer = writer or BulkWriter(db)
+    total = count_query(query)
+    deleted = 0
+    cursor = None
+    while True:
+        page = query.limit(page_size)
+        if cursor is not None:
+            page = page.start_after(cursor)
+        docs = list(page.stream())
+        if not docs:
+            break
+        writer.write([WriteOp(d.reference, None) for d in docs])
+        deleted += len(docs)
+        cursor = docs[-1]
+        if progress:
+            progress(deleted, total)
+        if len(docs) < page_size:
+            break
+    return deleted
+
+
+def delete_where(db, collection, filters, page_size=PAGE_SIZE, progress=None, writer=None):
+    """Apaga os documentos de `collection` que atendem `filters` [(campo, op, valor), ...]."""
+    query = db.collection(collection)
+    for field, op, value in filters:
+        query = query.where(field, op, value)
+    query = query.order_by(FieldPath.document_id())
+    return delete_query(db, query, page_size, progress, writer)
+
+
+def delete_collections(db, collections, filters, checkpoint=None, progress=None, writer=None):
+    """
+    Apaga de cada coleção os documentos que atendem `filters`.
+
+    `checkpoint` ({coleção: {'deleted', 'done'}}) é atualizado no lugar;
+    coleções marcadas como concluídas são puladas numa nova execução.
+    `progress(coleção, apagados, total)` recebe o andamento; `writer` é o
+    BulkWriter usado nos deletes (ex.: com um `before_commit`).
+    Retorna o checkpoint.
+    """
+    checkpoint = {} if checkpoint is None else checkpoint
+    for collection in collections:
+        state = checkpoint.setdefault(collection, {'deleted': 0, 'done': False})
+        if state['done']:
+            continue
+        base = state['deleted']
+
+        def on_page(deleted, total, collection=collection, base=base):
+            state['deleted'] = base + deleted
+            if progress:
+                progress(collection, state['deleted'], None if total is None else base + total)
+
+        delete_where(db, collection, filters, progress=on_page, writer=writer)
+        state['done'] = True
+    return checkpoint
@@ -0,0 +1,138 @@
+"""
+Escrita em massa no Firestore, acima do limite de 500 operações por batch.
+
+As operações são divididas em blocos, e cada bloco vira um batch atômico.
+Os blocos são gravados em paralelo, com retry e backoff exponencial
+(com jitter) quando há contenção ou indisponibilidade.
+
+Com `skip_existing`, os documentos (de ids determinísticos) que já existem
+são pulados: cada bloco faz um único get_all dos seus refs e grava o resto
+com `create`, que falha em vez de sobrescrever se outra escrita chegou antes.
+"""
+import random
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from google.api_core import exceptions as gexc
+
+MAX_BATCH_WRITES = 500
+# Metade do limite: `before_commit` pode acrescentar até 1 write por operação
+# do bloco (ex.: incrementos dos resumos mensais)
+DEFAULT_CHUNK_SIZE = 250
+
+RETRYABLE_ERRORS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.ServiceUnavailable,
+    gexc.ResourceExhausted,
+    gexc.InternalServerError,
+)
+
+# data=None significa delete
+WriteOp = namedtuple('WriteOp', ['ref', 'data', 'merge'], defaults=[False])
+
+
+class BulkWriteError(Exception):
+    """Falha definitiva em um bloco; `counts` tem o que já foi gravado."""
+
+    def __init__(self, message, counts):
+        super().__init__(message)
+        self.counts = counts
+
+
+class BulkWriter:
+    def __init__(self, db, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=4, max_retries=5, base_delay=0.5, before_commit=None,
+                 skip_existing=False):
+        """
+        Args:
+            db: cliente Firestore.
+            chunk_size: operações por batch (<= MAX_BATCH_WRITES).
+            max_workers: commits simultâneos.
+            max_retries: novas tentativas por bloco em erros transitórios.
+            base_delay: espera inicial do backoff, em segundos.
+            before_commit: callable(batch, chunk) chamado antes de cada commit
+                para acrescentar writes derivados do bloco no mesmo batch.
+            skip_existing: não grava os documentos que já existem; `chunk` no
+                before_commit e as contagens trazem só os efetivamente gravados,
+                e os pulados ficam em `self.skipped`.
+        """
+        if not 0 < chunk_size <= MAX_BATCH_WRITES:
+            raise ValueError(f"chunk_size deve estar entre 1 e {MAX_BATCH_WRITES}")
+        self.db = db
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.before_commit = before_commit
+        self.skip_existing = skip_existing
+        self.skipped = Counter()
+
+    def write(self, ops, progress=None):
+        """
+        Grava todas as `ops` (WriteOp) e retorna um Counter por coleção.
+
+        `progress(done, total)` é chamado na thread de quem chamou a cada bloco
+        concluído, então pode atualizar widgets do Streamlit com segurança.
+        """
+        ops = list(ops)
+        chunks = [ops[i:i + self.chunk_size] for i in range(0, len(ops), self.chunk_size)]
+        counts = Counter()
+        done = 0
+        if progress:
+            progress(0, len(ops))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._commit_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    written = future.result()
+                except Exception as e:
+                    for f in futures:
+                        f.cancel()
+                    raise BulkWriteError(f"Falha ao gravar bloco de {len(chunk)} operações: {e}", counts) from e
+                counts.update(op.ref.parent.id for op in written)
+                if len(written) < len(chunk):
+                    kept = {id(op) for op in written}
+                    self.skipped.update(op.ref.parent.id for op in chunk if id(op) not in kept)
+                done += len(chunk)
+                if progress:
+                    progress(done, len(ops))
+        return counts
+
+    def _missing(self, chunk):
+        """Operações do bloco cujo documento ainda não existe (um get_all para o bloco)."""
+        refs = [op.ref for op in chunk if op.data is not None and not op.merge]
+        existing = {(snap.reference.parent.id, snap.id) for snap in self.db.get_all(refs) if snap.exists}
+        return [op for op in chunk if (op.ref.parent.id, op.ref.id) not in existing]
+
+    def _commit_chunk(self, chunk):
+        """Grava o bloco e retorna as operações efetivamente gravadas."""
+        for attempt in range(self.max_retries + 1):
+            # Refeito a cada tentativa: um commit que "falhou" pode ter sido aplicado
+            ops = self._missing(chunk) if self.skip_existing else chunk
+            if not ops:
+                return ops
+            # Batch novo a cada tentativa: um batch não pode ser reutilizado após commit
+            batch = self.db.batch()
+            for op in ops:
+                if op.data is None:
+                    batch.delete(op.ref)
+                elif self.skip_existing and not op.merge:
+                    batch.create(op.ref, op.data)
+                else:
+                    batch.set(op.ref, op.data, merge=op.merge)
+            if self.before_commit:
+                self.before_commit(batch, ops)
+            try:
+                batch.commit()
+                return ops
+            except gexc.AlreadyExists:
+                # Outra escrita criou algum documento entre o get_all e o commit
+                if not self.skip_existing or attempt == self.max_retries:
+                    raise
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class FamilyCache:
+    """
+    Cache read-through compartilhado pelo processo, chaveado por (coleção, family_id).
+
+    Cada entrada expira após `ttl` segundos e, ao passar de `max_entries`,
+    a entrada usada há mais tempo é descartada (LRU). As sessões do Streamlit
+    rodam em threads diferentes, por isso todo acesso passa pelo lock.
+
+    Cada (coleção, família) tem um número de geração que a invalidação
+    incrementa: uma leitura que começou antes de uma escrita não guarda o
+    resultado velho no cache.
+    """
+
+    def __init__(self, ttl=120, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, collection, family_id, loader, variant=None):
+        """
+        Retorna o valor em cache ou chama `loader()` e guarda o resultado.
+
+        `variant` permite mais de uma leitura por (coleção, família), ex.: um
+        intervalo de datas; todas as variantes caem juntas na invalidação.
+        """
+        key = (collection, family_id, variant)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation(collection, family_id)
+
+        # Carrega fora do lock para não serializar leituras de famílias diferentes
+        value = loader()
+
+        with self._lock:
+            if self._generation(collection, family_id) != generation:
+                return value  # Invalidado durante a leitura: não guarda o valor (talvez velho)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _generation(self, collection, family_id):
+        return self._epoch, self._generations.get((collection, family_id), 0), self._generations.get((None, family_id), 0)
+
+    def generation(self, collection, family_id):
+        """Valor que muda a cada invalidação da coleção da família (ou de toda a família, ou `clear`)."""
+        with self._lock:
+            return self._generation(collection, family_id)
+
+    def invalidate(self, family_id, *collections):
+        """Descarta as entradas da família para as coleções informadas (todas se vazio)."""
+        with self._lock:
+            for collection in collections or (None,):
+                self._generations[(collection, family_id)] = self._generations.get((collection, family_id), 0) + 1
+            for key in list(self._entries):
+                if key[1] == family_id and (not collections or key[0] in collections):
+                    del self._entries[key]
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(family_id, *collections)
+
+    def on_invalidate(self, listener):
+        """Registra `listener(family_id, *coleções)`, chamado após cada invalidação."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+
+family_cache = FamilyCache()
+
+
+def get_family_docs(db, collection, family_id):
+    """
+    Lista os documentos de `collection` da família: da visão em tempo real
+    (services.live) quando a família tem listener ativo, senão pelo cache.
+    Cada item é o dict do documento com a chave extra 'id'.
+    """
+    from services.live import live_store
+
+    docs = live_store.docs(collection, family_id)
+    if docs is not None:
+        return [dict(d) for d in docs]
+
+    def load():
+        docs = db.collection(collection).where('family_id', '==', family_id).stream()
+        return [d.to_dict() | {'id': d.id} for d in docs]
+
+    # Cópia rasa: as views adicionam/alteram chaves nos dicts retornados
+    return [dict(d) for d in family_cache.get(collection, family_id, load)]
@@ -0,0 +1,101 @@
+"""
+Consultor de Quitação (IA) com memoização pela "impressão digital" das dívidas.
+
+A resposta do LLM fica salva em `debt_strategies/{family_id}` e em memória,
+junto com o hash da lista normalizada de dívidas. Enquanto nenhuma dívida
+for incluída, excluída ou alterada, o hash é o mesmo e a análise é reaproveitada.
+Com a IA indisponível, `get_saved` devolve a última análise mesmo que as
+dívidas tenham mudado.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+COLLECTION = 'debt_strategies'
+
+_memo = {}
+_lock = threading.Lock()
+
+
+def normalize(debts):
+    """Lista canônica (ordem e formatação estáveis) dos campos que afetam a análise."""
+    rows = [
+        [
+            ' '.join(str(d.get('description', '')).split()).casefold(),
+            round(float(d.get('total_value', 0) or 0), 2),
+            round(float(d.get('installment_value', 0) or 0), 2),
+            int(d.get('remaining_installments', 0) or 0),
+            round(float(d.get('interest_rate', 0) or 0), 4),
+        ]
+        for d in debts
+    ]
+    return sorted(rows)
+
+
+def fingerprint(debts):
+    payload = json.dumps(normalize(debts), ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_prompt(debts):
+    debts_summary = "\n".join([f"- {d['description']}: R$ {d['total_value']} (Parcela R$ {d.get('installment_value',0)})" for d in debts])
+    return f"""
+    Atue como um especialista em recuperação de crédito. Analise essa lista de dívidas pessoais:
+    {debts_summary}
+
+    1. Identifique quais provavelmente têm os juros mais abusivos (ex: Crefisa, Cheque Especial, Cartão) e devem ser prioridade.
+    2. Sugira uma estratégia de quitação (Avalanche ou Bola de Neve) explicando o porquê.
+    3. Liste 3 perguntas que o usuário deve fazer ao credor para tentar negociar um desconto à vista.
+
+    Seja direto e prático. Use formatação markdown.
+    """
+
+
+def gemini_generate(prompt):
+    from services import llm
+
+    return llm.generate(prompt, site='debt_strategy')
+
+
+def get_cached(db, family_id, debts):
+    """Análise salva para exatamente esta lista de dívidas, ou None."""
+    fp = fingerprint(debts)
+    with _lock:
+        memo = _memo.get(family_id)
+    if memo and memo[0] == fp:
+        return memo[1]
+
+    doc = db.collection(COLLECTION).document(family_id).get()
+    data = doc.to_dict() if doc.exists else {}
+    content = data.get('content') if data.get('fingerprint') == fp else None
+    with _lock:
+        # (hash consultado, análise para ele ou None, última análise salva): o
+        # "não há análise para estas dívidas" também fica, e o rerun não relê o banco
+        _memo[family_id] = (fp, content, data.get('content'))
+    return content
+
+
+def get_saved(db, family_id):
+    """Última análise salva da família, para qualquer lista de dívidas, ou None."""
+    with _lock:
+        memo = _memo.get(family_id)
+    if memo:
+        return memo[2]
+    doc = db.collection(COLLECTION).document(family_id).get()
+    return doc.to_dict().get('content') if doc.exists else None
+
+
+def generate_strategy(db, family_id, debts, generate=gemini_generate):
+    """Chama o LLM, salva a análise com o hash atual das dívidas e a retorna."""
+    fp = fingerprint(debts)
+    content = generate(build_prompt(debts))
+    db.collection(COLLECTION).document(family_id).set({
+        'fingerprint': fp,
+        'content': content,
+        'family_id': family_id,
+        'created_at': datetime.now()
+    })
+    with _lock:
+        _memo[family_id] = (fp, content, content)
+    return content
@@ -0,0 +1,37 @@
+import json
+import os
+
+
+def load_secrets(path=".streamlit/secrets.toml"):
+    """Lê os segredos do Streamlit fora de um script Streamlit (jobs de linha de comando)."""
+    import tomllib
+
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def init_db():
+    """
+    Inicializa o Firebase Admin a partir de FIREBASE_KEY (variável de ambiente
+    ou secrets.toml) e retorna o cliente Firestore. Usado pelos comandos em services/.
+
+    Com STORAGE_BACKEND = "sqlite" retorna o banco local, sem Firebase.
+    """
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    from services.repository import create_client
+
+    secrets = load_secrets()
+    backend = os.environ.get("STORAGE_BACKEND") or secrets.get("STORAGE_BACKEND", "firestore")
+    if backend != "firestore":
+        return create_client(backend, os.environ.get("STORAGE_PATH") or secrets.get("STORAGE_PATH"))
+
+    if not firebase_admin._apps:
+        key = os.environ.get("FIREBASE_KEY") or secrets.get("FIREBASE_KEY")
+        if not key:
+            raise RuntimeError("FIREBASE_KEY não encontrada (env ou .streamlit/secrets.toml)")
+        firebase_admin.initialize_app(credentials.Certificate(json.loads(key)))
+    return firestore.client()
@@ -0,0 +1,134 @@
+"""
+Gravação dos itens importados (planilha, OFX, CSV) nas coleções da família.
+
+Separado da tela de importação para que o mesmo caminho seja usado pelo
+app e pelos benchmarks.
+
+Cada item vira um documento de id determinístico (`fingerprint`: família,
+coleção, descrição normalizada, valor, data e a ordem entre itens idênticos
+do mesmo arquivo). Reimportar o mesmo arquivo não duplica nada: o BulkWriter
+consulta os ids de cada bloco num get_all e grava só os que faltam, então o
+custo depende das linhas do arquivo, não do histórico da família.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from services import summaries
+from services.bulk_writer import BulkWriter, WriteOp
+
+
+def normalize_description(text):
+    """Descrição comparável: sem acentos, minúscula e com espaços colapsados."""
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode()
+    return re.sub(r'\s+', ' ', text).strip().casefold()
+
+
+def _item_key(family_id, collection, item):
+    d = item.get('date')
+    return '|'.join([
+        family_id,
+        collection,
+        normalize_description(item.get('description')),
+        f"{float(item.get('value') or 0):.2f}",
+        d.isoformat() if d else '',
+    ])
+
+
+def _hash(key, ordinal):
+    return hashlib.sha256(f"{key}|{ordinal}".encode('utf-8')).hexdigest()[:32]
+
+
+def fingerprint(family_id, collection, item, ordinal=0):
+    """Id de documento determinístico do item importado (sha256 truncado, 32 hex)."""
+    return _hash(_item_key(family_id, collection, item), ordinal)
+
+
+def _collection_for(item):
+    return {'debt': 'debts', 'recurring': 'recurring_expenses'}.get(item['type'], 'transactions')
+
+
+def build_import_ops(db, items, family_id, uid, user_name='User'):
+    """
+    Converte os itens do importador em WriteOps para debts, recurring_expenses
+    e transactions, com ids de `fingerprint`. Itens idênticos no mesmo arquivo
+    (ex.: dois cafés iguais no mesmo dia) recebem ordinais 0, 1, ...
+    """
+    ops = []
+    seen = Counter()
+
+    for item in items:
+        collection = _collection_for(item)
+        key = _item_key(family_id, collection, item)
+        ref = db.collection(collection).document(_hash(key, seen[key]))
+        seen[key] += 1
+
+        # 1. Dívidas
+        if collection == 'debts':
+            ops.append(WriteOp(ref, {
+                'description': item['description'],
+                'total_value': float(item['value']),
+                'remaining_installments': int(item.get('installments_count', 1)),
+                'installment_value': float(item.get('installment_value', item['value'])),
+                'family_id': family_id,
+                'user_id': uid,
+                'created_at': datetime.now()
+            }))
+
+        # 2. Despesas Fixas / Recorrentes
+        elif collection == 'recurring_expenses':
+            day = 1
+            if item.get('date'):
+                day = item['date'].day
+
+            ops.append(WriteOp(ref, {
+                'description': item['description'],
+                'amount': float(item['value']),
+                'due_day': int(day),
+                'family_id': family_id,
+                'user_id': uid
+            }))
+
+        # 3. Transações (Despesas comuns; 'income' dos extratos vira Receita)
+        else:
+            date_val = datetime.now()
+            if item.get('date'):
+                # Converter date object para datetime
+                d = item['date']
+                date_val = datetime(d.year, d.month, d.day)
+
+            ops.append(WriteOp(ref, {
+                'description': item['description'],
+                'value': float(item['value']),
+                'type': 'Receita' if item['type'] == 'income' else 'Despesa',
+                'category': 'Importado',
+                'date': date_val,
+                'family_id': family_id,
+                'user_name': user_name,
+                'user_id': uid,
+                'updated_at': SERVER_TIMESTAMP
+            }))
+
+    return ops
+
+
+def write_import(db, ops, family_id, progress=None, **writer_options):
+    """
+    Grava as operações em blocos paralelos, com o resumo mensal de cada bloco
+    no mesmo batch, pulando os documentos que já existem (reimportação).
+    Retorna as contagens gravadas por coleção e, em 'skipped', quantos itens
+    já existiam; levanta BulkWriteError.
+    """
+    def add_summaries(batch, chunk):
+        # Resumo mensal no mesmo batch das transações do bloco
+        trans = [op.data for op in chunk if op.ref.parent.id == 'transactions']
+        summaries.apply_transactions(batch, db, family_id, trans)
+
+    writer = BulkWriter(db, before_commit=add_summaries, skip_existing=True, **writer_options)
+    counts = writer.write(ops, progress=progress)
+    counts['skipped'] = sum(writer.skipped.values())
+    return counts
@@ -0,0 +1,199 @@
+"""
+Dados da família em tempo real, compartilhados pelo processo.
+
+Um listener `on_snapshot` por coleção e por família ativa mantém em memória
+a visão atual de transactions, debts, recurring_expenses e credit_cards.
+Todas as sessões do Streamlit da família (os dois parceiros) leem da mesma
+visão, sem ir à rede no render, e veem as alterações do outro na hora.
+
+Uma escrita feita pelo app (toda escrita invalida o `family_cache`) marca
+a coleção como desatualizada: até o listener entregar um snapshot lido
+depois da escrita (ou STALE_TIMEOUT segundos), as leituras dessa coleção
+voltam para o cache/banco. Assim um rerun logo após excluir uma dívida não
+mostra de novo o documento apagado.
+
+Cada sessão segura um `Lease` (guardado no session_state). Quando a última
+sessão da família termina, os listeners são encerrados após GRACE segundos;
+o prazo evita derrubar e recriar tudo em reconexões rápidas.
+"""
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+
+from services.cache import family_cache
+
+COLLECTIONS = ('transactions', 'debts', 'recurring_expenses', 'credit_cards')
+GRACE = 60
+STALE_TIMEOUT = 10
+
+
+class FamilyStore:
+    """Visão em memória das coleções de uma família, alimentada pelos listeners."""
+
+    def __init__(self, db, family_id, collections=COLLECTIONS):
+        self.family_id = family_id
+        self.version = 0
+        self.versions = dict.fromkeys(collections, 0)
+        self._docs = {c: {} for c in collections}
+        self._ready = set()
+        # coleção -> (instante da escrita em UTC, monotonic) até o listener alcançá-la
+        self._stale = {}
+        self._rollup = None
+        self._lock = threading.Lock()
+        self._watches = [
+            db.collection(c).where('family_id', '==', family_id).on_snapshot(self._callback(c))
+            for c in collections
+        ]
+
+    def _callback(self, collection):
+        def on_snapshot(docs, changes, read_time):
+            with self._lock:
+                docs_by_id = self._docs[collection]
+                removed, added = [], []
+                for change in changes:
+                    old = docs_by_id.pop(change.document.id, None)
+                    if old is not None:
+                        removed.append(old)
+                    if change.type.name != 'REMOVED':
+                        docs_by_id[change.document.id] = change.document.to_dict() | {'id': change.document.id}
+                        added.append(docs_by_id[change.document.id])
+                if collection == 'transactions' and self._rollup is not None:
+                    self._rollup.apply_rows(removed, sign=-1)
+                    self._rollup.apply_rows(added)
+                self._ready.add(collection)
+                stale = self._stale.get(collection)
+                if stale and (read_time is None or read_time >= stale[0]):
+                    del self._stale[collection]
+                self.version += 1
+                self.versions[collection] += 1
+        return on_snapshot
+
+    def mark_stale(self, collections=None):
+        """Escrita local nas coleções (todas se None): ignora a visão até o listener vê-la."""
+        marked = (datetime.now(timezone.utc), time.monotonic())
+        with self._lock:
+            for collection in collections or self._docs:
+                if collection in self._docs:
+                    self._stale[collection] = marked
+
+    def _current(self, collection):
+        """True se a coleção carregou e não tem escrita local ainda não vista (com o lock)."""
+        if collection not in self._ready:
+            return False
+        stale = self._stale.get(collection)
+        if stale and time.monotonic() - stale[1] < STALE_TIMEOUT:
+            return False
+        return True
+
+    def docs(self, collection):
+        """Lista de dicts (com 'id') da coleção, ou None se ainda não carregou ou está atrás de uma escrita."""
+        with self._lock:
+            if not self._current(collection):
+                return None
+            return list(self._docs[collection].values())
+
+    def rollup(self):
+        """Cubo de gastos das transações (montado na primeira chamada), ou None se ainda não carregou."""
+        from services.rollups import RollupCube
+
+        with self._lock:
+            if not self._current('transactions'):
+                return None
+            if self._rollup is None:
+                self._rollup = RollupCube.from_rows(self._docs['transactions'].values())
+            return self._rollup
+
+    def close(self):
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+
+
+class Lease:
+    """Uso da família por uma sessão; liberado explicitamente ou quando é coletado."""
+
+    def __init__(self, manager, family_id):
+        self.family_id = family_id
+        self._finalizer = weakref.finalize(self, manager._release, family_id)
+
+    def release(self):
+        self._finalizer()
+
+
+class LiveStore:
+    """Listeners por família com contagem de referências."""
+
+    def __init__(self, grace=GRACE):
+        self.grace = grace
+        self._stores = {}
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, db, family_id):
+        """
+        Garante os listeners da família e retorna o Lease da sessão, ou None
+        se o cliente não suporta listeners (ex.: backend local).
+        """
+        if not hasattr(db.collection('transactions'), 'on_snapshot'):
+            return None
+        with self._lock:
+            if family_id not in self._stores:
+                self._stores[family_id] = FamilyStore(db, family_id)
+            self._refs[family_id] = self._refs.get(family_id, 0) + 1
+        return Lease(self, family_id)
+
+    def _release(self, family_id):
+        with self._lock:
+            self._refs[family_id] = self._refs.get(family_id, 1) - 1
+            if self._refs[family_id] > 0:
+                return
+        timer = threading.Timer(self.grace, self._stop_if_unused, args=(family_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _stop_if_unused(self, family_id):
+        with self._lock:
+            if self._refs.get(family_id, 0) > 0:
+                return
+            self._refs.pop(family_id, None)
+            store = self._stores.pop(family_id, None)
+        if store:
+            store.close()
+
+    def store(self, family_id):
+        with self._lock:
+            return self._stores.get(family_id)
+
+    def docs(self, collection, family_id):
+        """Documentos da família se há listener ativo e carregado, senão None."""
+        store = self.store(family_id)
+        if store is None or collection not in store._docs:
+            return None
+        return store.docs(collection)
+
+    def rollup(self, family_id):
+        """Cubo de gastos mantido pelos listeners, ou None sem listener."""
+        store = self.store(family_id)
+        if store is None or 'transactions' not in store._docs:
+            return None
+        return store.rollup()
+
+    def mark_stale(self, family_id, *collections):
+        """Gancho do `family_cache.invalidate`: a próxima leitura espera o listener alcançar a escrita."""
+        store = self.store(family_id)
+        if store is not None:
+            store.mark_stale(collections)
+
+    def version(self, family_id, collection=None):
+        """Contador de alterações recebidas, de todas as coleções ou de `collection` (None sem listener)."""
+        store = self.store(family_id)
+        if store is None:
+            return None
+        return store.version if collection is None else store.versions.get(collection)
+
+
+live_store = LiveStore()
+family_cache.on_invalidate(live_store.mark_stale)
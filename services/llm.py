@@ -0,0 +1,261 @@
+"""
+Gateway do Gemini compartilhado pelo processo.
+
+Toda chamada ao modelo (briefing, consultor de dívidas, OCR) passa por
+`generate`, que aplica, nesta ordem:
+
+- Disjuntor (circuit breaker): depois de FAILURE_THRESHOLD falhas seguidas
+  da API (cota, 5xx, timeout) as chamadas falham na hora com
+  `LLMUnavailable` por COOLDOWN segundos; depois disso uma chamada de teste
+  decide se o circuito fecha de novo. Quem chama mostra o conteúdo em cache
+  ou um texto padrão em vez de esperar.
+- Coalescência: pedidos idênticos (mesmo modelo e mesmo conteúdo) em voo ao
+  mesmo tempo, ex.: o casal abrindo o dashboard junto, viram uma só chamada.
+- Token bucket do processo (`configure(rate=...)`): no máximo `rate`
+  chamadas/segundo somando todas as sessões; quem espera mais que
+  `queue_timeout` recebe `LLMUnavailable`.
+- Timeout da requisição e latência registrada em `services.metrics` como
+  `llm.<site>` (sucesso), `llm.<site>.failed` e `llm.<site>.rejected`.
+
+O SDK (`google.generativeai`) é pesado para importar, então só é carregado
+na primeira chamada; a tela de login nunca paga esse custo.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+
+from services import metrics
+from services.rate_limit import TokenBucket
+
+MODEL_NAME = 'gemini-2.0-flash'
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 4
+# Segundos: resposta do modelo e espera na fila do token bucket
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_QUEUE_TIMEOUT = 30.0
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30.0
+
+_api_key = None
+_models = {}
+_lock = threading.Lock()
+
+
+class LLMUnavailable(Exception):
+    """A IA não foi chamada: circuito aberto ou fila do limite de taxa cheia."""
+
+
+def set_api_key(api_key):
+    """Guarda a chave; o SDK é configurado na primeira chamada ao modelo."""
+    global _api_key
+    with _lock:
+        if api_key != _api_key:
+            _api_key = api_key
+            _models.clear()
+
+
+def get_model(name=MODEL_NAME):
+    """GenerativeModel em cache (importa e configura o SDK na primeira vez)."""
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            import google.generativeai as genai
+
+            if _api_key:
+                genai.configure(api_key=_api_key)
+            model = _models[name] = genai.GenerativeModel(name)
+        return model
+
+
+def gemini_call(contents, name, timeout):
+    return get_model(name).generate_content(contents, request_options={'timeout': timeout}).text
+
+
+def is_outage(error):
+    """Falhas que indicam API degradada (contam para o disjuntor), e não um pedido inválido."""
+    if isinstance(error, ValueError):
+        return False  # Resposta bloqueada/vazia: o problema é o conteúdo
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return True
+
+
+def request_key(name, contents):
+    """Hash do modelo + conteúdo (texto ou partes com bytes) para coalescer pedidos iguais."""
+    h = hashlib.sha256(name.encode())
+    for part in contents if isinstance(contents, (list, tuple)) else [contents]:
+        if isinstance(part, dict):
+            h.update(b'\x00' + str(part.get('mime_type')).encode() + b'\x00')
+            data = part.get('data')
+            h.update(data if isinstance(data, bytes) else str(data).encode())
+        else:
+            h.update(b'\x01' + str(part).encode())
+    return h.hexdigest()
+
+
+class CircuitBreaker:
+    """Fechado -> aberto após `threshold` falhas seguidas -> meio-aberto após `cooldown` (uma chamada de teste)."""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return 'open'
+            return 'half-open'
+
+    def retry_in(self):
+        """Segundos até o circuito aceitar uma chamada de teste (0 se fechado)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Chamada de teste que terminou sem dizer nada sobre a API (ex.: pedido inválido)."""
+        with self._lock:
+            self._probing = False
+
+
+class Gateway:
+    """Limite de taxa, coalescência de pedidos, disjuntor e métricas em volta de `call`."""
+
+    def __init__(self, call=gemini_call, rate=DEFAULT_RATE, burst=DEFAULT_BURST, timeout=DEFAULT_TIMEOUT,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT, breaker=None):
+        self.call = call
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rate=None, burst=None, timeout=None, queue_timeout=None):
+        """Ajusta os limites (valores None ficam como estão); só troca o bucket se a taxa mudar."""
+        rate = float(rate if rate is not None else self.bucket.rate)
+        burst = float(burst if burst is not None else self.bucket.capacity)
+        if (self.bucket.rate, self.bucket.capacity) != (rate, burst):
+            self.bucket = TokenBucket(rate, capacity=burst)
+        if timeout is not None:
+            self.timeout = float(timeout)
+        if queue_timeout is not None:
+            self.queue_timeout = float(queue_timeout)
+
+    def available(self):
+        return self.breaker.state != 'open'
+
+    def generate(self, contents, site='default', name=MODEL_NAME):
+        """
+        Texto da resposta do modelo para `contents` (prompt ou lista de partes).
+        Levanta LLMUnavailable sem chamar a API se o circuito estiver aberto
+        ou a fila do limite de taxa estourar.
+        """
+        start = time.perf_counter()
+        key = request_key(name, contents)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            # Mesmo pedido já em voo: espera a resposta dele
+            try:
+                text = future.result()
+            except LLMUnavailable:
+                metrics.record(f"llm.{site}.rejected", time.perf_counter() - start)
+                raise
+            except Exception:
+                metrics.record(f"llm.{site}.failed", time.perf_counter() - start)
+                raise
+            metrics.record(f"llm.{site}", time.perf_counter() - start)
+            return text
+
+        try:
+            text = self._call(contents, site, name, start)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call(self, contents, site, name, start):
+        if not self.breaker.allow():
+            metrics.record(f"llm.{site}.rejected", time.perf_counter() - start)
+            raise LLMUnavailable(f"IA indisponível no momento (nova tentativa em {self.breaker.retry_in():.0f}s)")
+        if not self.bucket.acquire(timeout=self.queue_timeout):
+            self.breaker.release()
+            metrics.record(f"llm.{site}.rejected", time.perf_counter() - start)
+            raise LLMUnavailable("Muitas chamadas à IA agora, tente de novo em instantes")
+        try:
+            text = self.call(contents, name, self.timeout)
+        except Exception as e:
+            if is_outage(e):
+                self.breaker.failure()
+            else:
+                self.breaker.release()
+            metrics.record(f"llm.{site}.failed", time.perf_counter() - start)
+            raise
+        self.breaker.success()
+        metrics.record(f"llm.{site}", time.perf_counter() - start)
+        return text
+
+    def stats(self):
+        """Estado do disjuntor e latências por local de chamada (ms)."""
+        return {'breaker': self.breaker.state, 'sites': metrics.summary('llm.')}
+
+
+gateway = Gateway()
+
+
+def configure(rate=None, burst=None, timeout=None, queue_timeout=None):
+    gateway.configure(rate, burst, timeout, queue_timeout)
+
+
+def available():
+    """False enquanto o disjuntor estiver aberto (chamadas falhariam na hora)."""
+    return gateway.available()
+
+
+def generate(contents, site='default', name=MODEL_NAME):
+    """Texto da resposta do modelo, passando pelo gateway do processo."""
+    return gateway.generate(contents, site, name)
+
+
+def stats():
+    return gateway.stats()
@@ -0,0 +1,400 @@
+"""
+Cliente local (SQLite ou memória) compatível com o subconjunto da API do
+Firestore usado pelo app e pelos serviços: collection/document, where,
+order_by, limit, start_after, stream, count, batch (set/create/update/delete),
+get_all e os sentinelas
+Increment / DELETE_FIELD / SERVER_TIMESTAMP.
+
+Serve para desenvolver, medir e perfilar os caminhos quentes sem um projeto
+Firebase, com resultados determinísticos. Não implementa transações nem
+índices: filtros além de `family_id ==` são avaliados em Python.
+
+    db = LocalClient()                 # em memória
+    db = LocalClient('dados.sqlite3')  # persistido em arquivo
+"""
+import json
+import random
+import sqlite3
+import string
+import threading
+from datetime import date, datetime, timezone
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1.transforms import DELETE_FIELD, SERVER_TIMESTAMP, Increment
+
+DOCUMENT_ID = '__name__'
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b,
+    'not-in': lambda a, b: a not in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+}
+
+_MISSING = object()
+
+
+# --- Serialização (datetime/date sobrevivem ao JSON) ---
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if '__datetime__' in value:
+            return datetime.fromisoformat(value['__datetime__'])
+        if '__date__' in value:
+            return date.fromisoformat(value['__date__'])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _auto_id():
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(random.choice(alphabet) for _ in range(20))
+
+
+def _get_path(data, path):
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def _resolve(value, current=_MISSING):
+    """Aplica sentinelas a um valor novo, dado o valor atual do campo."""
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, Increment):
+        base = current if isinstance(current, (int, float)) else 0
+        return base + value.value
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items() if v is not DELETE_FIELD}
+    return value
+
+
+def _merge(target, data):
+    """Merge recursivo (set com merge=True)."""
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict):
+            child = target.get(key)
+            if not isinstance(child, dict):
+                child = target[key] = {}
+            _merge(child, value)
+        else:
+            target[key] = _resolve(value, target.get(key, _MISSING))
+
+
+def _update(target, data):
+    """Update com chaves em notação de ponto (campo.subcampo)."""
+    for path, value in data.items():
+        *parents, leaf = path.split('.')
+        node = target
+        for part in parents:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if value is DELETE_FIELD:
+            node.pop(leaf, None)
+        else:
+            node[leaf] = _resolve(value, node.get(leaf, _MISSING))
+
+
+# --- Snapshots e referências ---
+
+class LocalSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return None if self._data is None else _decode(self._data)
+
+    def get(self, field):
+        value = _get_path(self._data or {}, field)
+        if value is _MISSING:
+            raise KeyError(field)
+        return _decode(value)
+
+
+class LocalDocumentReference:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self.parent = LocalCollectionReference(client, collection)
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self.parent.id}/{self.id}"
+
+    def get(self):
+        return LocalSnapshot(self, self._client._read(self.parent.id, self.id))
+
+    def set(self, data, merge=False):
+        self._client._write([('set', self, data, merge)])
+
+    def update(self, data):
+        self._client._write([('update', self, data, False)])
+
+    def delete(self):
+        self._client._write([('delete', self, None, False)])
+
+    def __eq__(self, other):
+        return isinstance(other, LocalDocumentReference) and self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class _Count:
+    def __init__(self, value):
+        self.value = value
+
+
+class _AggregationQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def get(self):
+        return [[_Count(sum(1 for _ in self._query._run()))]]
+
+
+class LocalQuery:
+    def __init__(self, client, collection, filters=(), orders=(), limit=None, cursor=None):
+        self._client = client
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters, 'orders': self._orders,
+            'limit': self._limit, 'cursor': self._cursor,
+        }
+        state.update(changes)
+        return LocalQuery(self._client, self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"Operador não suportado: {op_string}")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def count(self):
+        return _AggregationQuery(self)
+
+    def get(self):
+        return list(self.stream())
+
+    def stream(self):
+        for doc_id, data in self._run():
+            yield LocalSnapshot(LocalDocumentReference(self._client, self._collection, doc_id), data)
+
+    def _value(self, doc_id, data, field):
+        return doc_id if field == DOCUMENT_ID else _decode(_get_path(data, field))
+
+    def _run(self):
+        family = next((v for f, op, v in self._filters if f == 'family_id' and op == '=='), _MISSING)
+        rows = self._client._scan(self._collection, None if family is _MISSING else family)
+
+        docs = []
+        for doc_id, data in rows:
+            ok = True
+            for field, op, expected in self._filters:
+                value = self._value(doc_id, data, field)
+                if value is _MISSING or not _OPERATORS[op](value, expected):
+                    ok = False
+                    break
+            # Como no Firestore, documentos sem o campo ordenado ficam de fora
+            if ok and all(f == DOCUMENT_ID or _get_path(data, f) is not _MISSING for f, _ in self._orders):
+                docs.append((doc_id, data))
+
+        # Ordenação estável campo a campo, do último critério para o primeiro
+        orders = self._orders or ((DOCUMENT_ID, ASCENDING),)
+        for field, direction in reversed(orders):
+            docs.sort(key=lambda d: self._value(d[0], d[1], field), reverse=(direction == DESCENDING))
+
+        if self._cursor is not None:
+            docs = self._after_cursor(docs, orders)
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        return docs
+
+    def _after_cursor(self, docs, orders):
+        if isinstance(self._cursor, LocalSnapshot):
+            cursor = tuple(
+                self._cursor.id if f == DOCUMENT_ID else self._cursor.get(f) for f, _ in orders
+            )
+        else:
+            cursor = tuple(self._cursor[f] for f, _ in orders)
+
+        def is_after(doc):
+            for (field, direction), expected in zip(orders, cursor):
+                value = self._value(doc[0], doc[1], field)
+                if value == expected:
+                    continue
+                return value < expected if direction == DESCENDING else value > expected
+            return False
+
+        return [d for d in docs if is_after(d)]
+
+
+class LocalCollectionReference(LocalQuery):
+    def __init__(self, client, collection):
+        super().__init__(client, collection)
+        self.id = collection
+
+    def document(self, document_id=None):
+        return LocalDocumentReference(self._client, self.id, document_id or _auto_id())
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        ref.set(document_data)
+        return datetime.now(), ref
+
+
+class LocalWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, reference, document_data, merge=False):
+        self._ops.append(('set', reference, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._ops.append(('create', reference, document_data, False))
+
+    def update(self, reference, field_updates):
+        self._ops.append(('update', reference, field_updates, False))
+
+    def delete(self, reference):
+        self._ops.append(('delete', reference, None, False))
+
+    def commit(self):
+        self._client._write(self._ops)
+        self._ops = []
+
+
+class LocalClient:
+    """Cliente Firestore-compatível sobre SQLite. `path=':memory:'` não persiste nada."""
+
+    def __init__(self, path=':memory:'):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " collection TEXT NOT NULL, id TEXT NOT NULL, family_id TEXT, data TEXT NOT NULL,"
+                " PRIMARY KEY (collection, id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS documents_family ON documents (collection, family_id)")
+            self._conn.commit()
+
+    def collection(self, name):
+        return LocalCollectionReference(self, name)
+
+    def batch(self):
+        return LocalWriteBatch(self)
+
+    def get_all(self, references):
+        for ref in references:
+            yield ref.get()
+
+    def close(self):
+        self._conn.close()
+
+    # --- Armazenamento ---
+
+    def _read(self, collection, doc_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _scan(self, collection, family_id=None):
+        sql = "SELECT id, data FROM documents WHERE collection = ?"
+        params = [collection]
+        if family_id is not None:
+            sql += " AND family_id = ?"
+            params.append(family_id)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(doc_id, json.loads(data)) for doc_id, data in rows]
+
+    def _write(self, ops):
+        """Aplica as operações atomicamente (uma transação SQLite)."""
+        with self._lock:
+            try:
+                for kind, ref, data, merge in ops:
+                    collection, doc_id = ref.parent.id, ref.id
+                    if kind == 'delete':
+                        self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+                        continue
+
+                    current = self._read(collection, doc_id)
+                    current = _decode(current) if current is not None else None
+                    if kind == 'create' and current is not None:
+                        raise AlreadyExists(f"Document already exists: {ref.path}")
+                    if kind == 'update':
+                        if current is None:
+                            raise NotFound(f"No document to update: {ref.path}")
+                        _update(current, data)
+                        new = current
+                    elif merge and current is not None:
+                        _merge(current, data)
+                        new = current
+                    else:
+                        new = {}
+                        _merge(new, data)
+
+                    family_id = new.get('family_id')
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO documents (collection, id, family_id, data) VALUES (?, ?, ?, ?)",
+                        (collection, doc_id, family_id if isinstance(family_id, str) else None, json.dumps(_encode(new)))
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
@@ -0,0 +1,34 @@
+"""
+Métricas de latência em memória, compartilhadas pelo processo.
+
+Cada nome (ex.: 'dashboard.transactions') guarda as últimas amostras em
+segundos; `summary()` devolve contagem, média, p95 e máximo em ms.
+"""
+import threading
+from collections import defaultdict, deque
+
+WINDOW = 500
+
+_samples = defaultdict(lambda: deque(maxlen=WINDOW))
+_lock = threading.Lock()
+
+
+def record(name, seconds):
+    with _lock:
+        _samples[name].append(seconds)
+
+
+def summary(prefix=''):
+    """Retorna {nome: {'count', 'avg_ms', 'p95_ms', 'max_ms'}} dos nomes com o prefixo."""
+    with _lock:
+        items = {k: sorted(v) for k, v in _samples.items() if k.startswith(prefix) and v}
+    result = {}
+    for name, values in items.items():
+        n = len(values)
+        result[name] = {
+            'count': n,
+            'avg_ms': 1000 * sum(values) / n,
+            'p95_ms': 1000 * values[min(n - 1, int(n * 0.95))],
+            'max_ms': 1000 * values[-1],
+        }
+    return result
@@ -0,0 +1,182 @@
+"""
+Leitura de comprovantes com a IA (OCR), com pré-processamento e cache.
+
+Antes do upload a imagem é reduzida, convertida para tons de cinza e
+recomprimida em JPEG: fotos de celular de 3-8 MB viram poucas centenas de KB.
+PDFs vão direto para o modelo. O JSON extraído fica em cache pelo SHA-256
+dos bytes originais, em memória e na coleção `receipt_cache`, então o mesmo
+comprovante enviado de novo (ou pelo parceiro) não chama o LLM.
+
+Em lote (`analyze_batch`) os comprovantes são lidos em paralelo, com no
+máximo `concurrency` por vez. O limite de chamadas/segundo ao LLM, somando
+todas as sessões, é o do gateway (`services.llm.configure`).
+"""
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+COLLECTION = 'receipt_cache'
+MAX_SIDE = 1600
+JPEG_QUALITY = 70
+DEFAULT_CONCURRENCY = 4
+
+BatchResult = namedtuple('BatchResult', 'index name digest data from_cache error duplicate_of', defaults=[None])
+
+RECEIPT_PROMPT = """
+Analise esta imagem de comprovante/recibo financeiro e extraia um JSON:
+{
+    "value": float (valor total, use ponto para decimais),
+    "description": string (nome do estabelecimento ou resumo curto),
+    "category": string (escolha uma: Casa, Mercado, Lazer, Transporte, Salário, Investimento, Outros),
+    "type": string (escolha uma: Despesa, Receita, Investimento),
+    "date": string (formato YYYY-MM-DD)
+}
+Se não encontrar algo, deixe null. Responda APENAS o JSON.
+"""
+
+
+def image_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_pdf(data):
+    return data[:5] == b'%PDF-'
+
+
+def receipt_id(family_id, digest):
+    """Id determinístico da transação criada a partir do comprovante (não duplica ao salvar de novo)."""
+    return hashlib.sha256(f"{family_id}:{digest}".encode()).hexdigest()[:32]
+
+
+def preprocess_image(data, max_side=MAX_SIDE, quality=JPEG_QUALITY):
+    """Reduz, converte para tons de cinza e recomprime a imagem. Retorna bytes JPEG."""
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data))
+    img = ImageOps.exif_transpose(img)  # Fotos de celular vêm rotacionadas via EXIF
+    img = img.convert('L')
+    img.thumbnail((max_side, max_side))
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def parse_response(text):
+    """Remove as cercas de código que o modelo às vezes devolve e faz o parse do JSON."""
+    text = text.replace("```json", "").replace("```", "").strip()
+    return json.loads(text)
+
+
+def gemini_extract(parts):
+    from services import llm
+
+    return llm.generate(parts, site='ocr')
+
+
+class ReceiptCache:
+    """Cache em duas camadas: LRU em memória na frente da coleção `receipt_cache`."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _doc_id(family_id, digest):
+        # Escopo por família: um comprovante nunca é servido para outra família
+        return f"{family_id}_{digest}"
+
+    def get(self, db, family_id, digest):
+        key = self._doc_id(family_id, digest)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        doc = db.collection(COLLECTION).document(key).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()['data']
+        self._remember(key, data)
+        return data
+
+    def put(self, db, family_id, digest, data):
+        key = self._doc_id(family_id, digest)
+        db.collection(COLLECTION).document(key).set({
+            'data': data,
+            'family_id': family_id,
+            'created_at': datetime.now()
+        })
+        self._remember(key, data)
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+receipt_cache = ReceiptCache()
+
+
+def receipt_part(data):
+    """Parte enviada ao modelo: o PDF como está ou a imagem reduzida em JPEG."""
+    if is_pdf(data):
+        return {'mime_type': 'application/pdf', 'data': data}
+    return {'mime_type': 'image/jpeg', 'data': preprocess_image(data)}
+
+
+def analyze_receipt(db, family_id, image_bytes, extract=gemini_extract, digest=None):
+    """
+    Extrai os dados do comprovante (imagem ou PDF) em `image_bytes`.
+    Retorna (dados, veio_do_cache). Com a IA indisponível o cache ainda
+    responde; sem cache, `llm.LLMUnavailable` sobe para quem chamou.
+    """
+    digest = digest or image_hash(image_bytes)
+    cached = receipt_cache.get(db, family_id, digest)
+    if cached is not None:
+        return cached, True
+
+    part = receipt_part(image_bytes)
+    data = parse_response(extract([RECEIPT_PROMPT, part]))
+    if data:
+        receipt_cache.put(db, family_id, digest, data)
+    return data, False
+
+
+def analyze_batch(db, family_id, files, concurrency=DEFAULT_CONCURRENCY, extract=gemini_extract):
+    """
+    Lê vários comprovantes em paralelo. `files` é uma lista de (nome, bytes).
+
+    Gera um BatchResult por arquivo na ordem em que terminam (`index` é a
+    posição em `files`); uma falha vem em `error` e não interrompe o lote.
+    Um arquivo repetido no lote (mesmo conteúdo) é lido uma vez só: as
+    cópias vêm sem dados e com `duplicate_of` = nome do primeiro.
+    Roda fora da thread do script: quem consome pode atualizar a tela a cada item.
+    """
+    def run(data, digest):
+        return analyze_receipt(db, family_id, data, extract, digest)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='doispes-ocr') as pool:
+        futures = {}
+        first = {}
+        duplicates = []
+        for i, (name, data) in enumerate(files):
+            digest = image_hash(data)
+            if digest in first:
+                duplicates.append(BatchResult(i, name, digest, None, False, None, first[digest]))
+                continue
+            first[digest] = name
+            futures[pool.submit(run, data, digest)] = (i, name, digest)
+        yield from duplicates
+        for future in as_completed(futures):
+            i, name, digest = futures[future]
+            try:
+                data, from_cache = future.result()
+                yield BatchResult(i, name, digest, data, from_cache, None)
+            except Exception as e:
+                yield BatchResult(i, name, digest, None, False, e)
@@ -0,0 +1,47 @@
+"""
+Execução concorrente de leituras independentes (I/O de rede).
+
+O pool é único por processo e compartilhado entre as sessões do Streamlit,
+para não criar threads novas a cada rerun.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import metrics
+
+_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='doispes-io')
+
+
+def run_parallel(tasks, metric_prefix=None):
+    """
+    Executa os callables de `tasks` ({nome: callable}) em paralelo.
+
+    Retorna (resultados, tempos) com os mesmos nomes; os tempos são em segundos.
+    Se uma tarefa falhar, a exceção é repassada depois que todas terminarem.
+    As funções não devem chamar `st.*`: rodam fora da thread do script.
+    """
+    start = time.perf_counter()
+    futures = {name: _pool.submit(_timed, fn) for name, fn in tasks.items()}
+
+    results = {}
+    timings = {}
+    error = None
+    for name, future in futures.items():
+        try:
+            results[name], timings[name] = future.result()
+        except Exception as e:
+            error = error or e
+    timings['total'] = time.perf_counter() - start
+
+    if metric_prefix:
+        for name, seconds in timings.items():
+            metrics.record(f"{metric_prefix}.{name}", seconds)
+    if error:
+        raise error
+    return results, timings
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
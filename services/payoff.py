@@ -0,0 +1,122 @@
+"""
+Simulador local de quitação de dívidas (Avalanche x Bola de Neve).
+
+Trabalha sobre os documentos de `debts`: `total_value` (saldo),
+`installment_value` (parcela mínima), `remaining_installments` e o campo
+opcional `interest_rate` (% ao mês). A simulação é mês a mês com arrays
+NumPy de forma (cenários, dívidas): centenas de valores de pagamento extra
+são avaliados de uma vez, em milissegundos.
+
+Regras: todo mês o saldo rende juros, as parcelas mínimas são pagas e o
+orçamento livre (extra + parcelas de dívidas já quitadas) vai para as
+dívidas na ordem de prioridade da estratégia.
+"""
+from datetime import datetime
+
+import numpy as np
+
+STRATEGIES = {
+    'avalanche': "Avalanche (maior juros primeiro)",
+    'snowball': "Bola de Neve (menor saldo primeiro)",
+    'custom': "Personalizada",
+}
+MAX_MONTHS = 360
+EPS = 0.005  # meio centavo: abaixo disso a dívida é considerada quitada
+
+
+def debt_arrays(debts):
+    """Converte a lista de dívidas em arrays (saldo, parcela, taxa mensal)."""
+    balance = np.array([float(d.get('total_value', 0) or 0) for d in debts])
+    payment = np.array([float(d.get('installment_value', 0) or 0) for d in debts])
+    remaining = np.array([int(d.get('remaining_installments', 0) or 0) for d in debts])
+    rate = np.array([float(d.get('interest_rate', 0) or 0) / 100 for d in debts])
+    # Sem parcela informada: divide o saldo pelas parcelas restantes
+    missing = (payment <= 0) & (remaining > 0)
+    payment[missing] = balance[missing] / remaining[missing]
+    return balance, payment, rate
+
+
+def priority_order(balance, rate, strategy, order=None):
+    """Índices das dívidas na ordem em que recebem o dinheiro extra."""
+    if strategy == 'avalanche':
+        return np.lexsort((balance, -rate))
+    if strategy == 'snowball':
+        return np.lexsort((-rate, balance))
+    if strategy == 'custom':
+        if order is None:
+            raise ValueError("Estratégia personalizada exige `order`")
+        order = list(order)
+        rest = [i for i in np.argsort(balance) if i not in order]
+        return np.array(order + rest, dtype=int)
+    raise ValueError(f"Estratégia desconhecida: {strategy}")
+
+
+def simulate(debts, extras=0.0, strategy='avalanche', order=None, max_months=MAX_MONTHS):
+    """
+    Simula a quitação para um ou vários valores de pagamento extra mensal.
+
+    Returns:
+        dict com arrays por cenário:
+            'extras' (S,), 'months' (S,) meses até quitar tudo (-1 se não quita),
+            'total_interest' (S,), 'payoff_month' (S, D) mês de quitação de cada
+            dívida (-1 se não quita) e 'balance' (S, meses+1) saldo total mês a mês.
+    """
+    balance, payment, rate = debt_arrays(debts)
+    extras = np.atleast_1d(np.asarray(extras, dtype=float))
+    n_scen = len(extras)
+    perm = priority_order(balance, rate, strategy, order)
+
+    bal = np.tile(balance, (n_scen, 1))
+    total_interest = np.zeros(n_scen)
+    payoff_month = np.where(bal > EPS, -1, 0)
+    history = [bal.sum(axis=1)]
+
+    for month in range(1, max_months + 1):
+        active = bal > EPS
+        if not active.any():
+            break
+        interest = bal * rate
+        bal += interest
+        total_interest += interest.sum(axis=1)
+
+        minimum = np.minimum(payment, bal)
+        bal -= minimum
+        # Parcelas que sobraram (dívidas quitadas ou última parcela menor) viram orçamento livre
+        budget = extras + (payment - minimum).sum(axis=1)
+
+        ordered = bal[:, perm]
+        before = np.cumsum(ordered, axis=1) - ordered
+        ordered -= np.clip(budget[:, None] - before, 0, ordered)
+        bal[:, perm] = ordered
+
+        newly_paid = active & (bal <= EPS)
+        payoff_month[newly_paid] = month
+        history.append(bal.sum(axis=1))
+
+    done = (payoff_month >= 0).all(axis=1)
+    months = np.where(done, payoff_month.max(axis=1, initial=0), -1)
+    return {
+        'extras': extras,
+        'months': months,
+        'total_interest': total_interest,
+        'payoff_month': payoff_month,
+        'balance': np.stack(history, axis=1),
+    }
+
+
+def compare_strategies(debts, extra=0.0, order=None):
+    """Roda as estratégias para um único valor extra. Retorna {estratégia: resultado}."""
+    strategies = ['avalanche', 'snowball'] + (['custom'] if order else [])
+    return {s: simulate(debts, extra, s, order) for s in strategies}
+
+
+def add_months(start, months):
+    """Data do mês `months` meses depois de `start` (dia 1)."""
+    total = start.year * 12 + start.month - 1 + int(months)
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def payoff_date(months, start=None):
+    if months < 0:
+        return None
+    return add_months(start or datetime.now(), months)
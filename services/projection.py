@@ -0,0 +1,94 @@
+"""
+Projeção de fluxo de caixa da família, dia a dia, para 12-36 meses.
+
+Entradas: renda mensal da família (soma de `users.income`), contas fixas
+(`recurring_expenses` pelo `due_day`), parcelas de dívidas (param depois de
+`remaining_installments`) e a média móvel dos gastos variáveis dos resumos
+mensais. Todo o cálculo é vetorizado sobre o eixo de dias; o resultado fica
+memoizado enquanto as entradas não mudarem.
+"""
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+INCOME_DAY = 5  # Dia do salário (5º dia útil, aproximado)
+DEBT_DUE_DAY = 10  # Dívidas não têm vencimento cadastrado
+HORIZONS = [12, 24, 36]
+
+
+def _month_start(d):
+    return np.datetime64(d, 'M')
+
+
+def project_cashflow(start, months, income, recurring, debts, variable_monthly, start_balance=0.0):
+    """
+    Projeta o saldo acumulado a partir de `start` (inclusive).
+
+    Args:
+        start: date inicial.
+        months: horizonte em meses.
+        income: renda mensal total da família.
+        recurring: lista de dicts com 'amount' e 'due_day'.
+        debts: lista de dicts com 'installment_value' e 'remaining_installments'.
+        variable_monthly: gasto variável médio por mês, distribuído por dia.
+        start_balance: saldo no dia inicial.
+
+    Returns:
+        dict com arrays somente leitura 'dates' (datetime64[D]), 'inflow',
+        'outflow' e 'balance' (um valor por dia).
+    """
+    rec_key = tuple(sorted((float(r.get('amount', 0) or 0), int(r.get('due_day', 1) or 1)) for r in recurring))
+    debt_key = tuple(sorted(
+        (float(d.get('installment_value', 0) or 0), int(d.get('remaining_installments', 0) or 0)) for d in debts
+    ))
+    return _project(start, int(months), float(income), rec_key, debt_key, round(float(variable_monthly), 2), float(start_balance))
+
+
+@lru_cache(maxsize=128)
+def _project(start, months, income, rec_key, debt_key, variable_monthly, start_balance):
+    first_month = _month_start(start)
+    end = (first_month + months).astype('datetime64[D]')
+    dates = np.arange(np.datetime64(start, 'D'), end)
+
+    month_of_day = dates.astype('datetime64[M]')
+    dom = (dates - month_of_day.astype('datetime64[D]')).astype(int) + 1
+    days_in_month = ((month_of_day + 1).astype('datetime64[D]') - month_of_day.astype('datetime64[D]')).astype(int)
+
+    def due_hits(days):
+        # (dias, itens): True no dia de vencimento; dia 31 cai no último dia de meses curtos
+        days = np.asarray(days, dtype=int)
+        return dom[:, None] == np.minimum(days[None, :], days_in_month[:, None])
+
+    inflow = np.where(dom == np.minimum(INCOME_DAY, days_in_month), income, 0.0)
+
+    outflow = variable_monthly / days_in_month
+    if rec_key:
+        amounts, due_days = np.array(rec_key).T
+        outflow = outflow + due_hits(due_days) @ amounts
+    if debt_key:
+        payments, remaining = np.array(debt_key).T
+        hits = due_hits(np.full(len(payments), DEBT_DUE_DAY))
+        # Só as próximas `remaining_installments` ocorrências de cada dívida
+        hits &= np.cumsum(hits, axis=0) <= remaining[None, :]
+        outflow = outflow + hits @ payments
+
+    balance = start_balance + np.cumsum(inflow - outflow)
+    result = {'dates': dates, 'inflow': inflow, 'outflow': outflow, 'balance': balance}
+    for arr in result.values():
+        arr.flags.writeable = False  # Compartilhado pelo cache entre sessões
+    return result
+
+
+def average_variable_spend(month_summaries, fallback=0.0):
+    """Média dos gastos variáveis (Despesa) dos resumos mensais informados."""
+    values = [float(s.get('totals', {}).get('Despesa', 0.0)) for s in month_summaries]
+    return sum(values) / len(values) if values else fallback
+
+
+def first_negative_day(projection):
+    """Primeira data em que o saldo projetado fica negativo, ou None."""
+    negative = np.flatnonzero(projection['balance'] < 0)
+    if not len(negative):
+        return None
+    return projection['dates'][negative[0]].astype(date)
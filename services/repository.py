@@ -0,0 +1,236 @@
+"""
+Camada de acesso a dados do app: users, transactions, debts,
+recurring_expenses, credit_cards e daily_briefings.
+
+O `Repository` funciona sobre qualquer cliente com a API do Firestore:
+o cliente oficial (backend 'firestore') ou o `LocalClient` em SQLite
+('sqlite', em arquivo) ou em memória ('memory'). O backend vem da
+configuração (`STORAGE_BACKEND` / `STORAGE_PATH` no secrets.toml ou no
+ambiente). As escritas feitas por aqui já invalidam o cache da família.
+"""
+import os
+import threading
+from datetime import datetime
+
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from services import summaries, transactions
+from services.cache import family_cache, get_family_docs
+from services.live import live_store
+
+BACKENDS = ('firestore', 'sqlite', 'memory')
+DEFAULT_SQLITE_PATH = 'doispes.sqlite3'
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def create_client(backend='firestore', path=None):
+    """
+    Retorna o cliente do backend, um por processo (o SQLite em memória
+    precisa sobreviver aos reruns do Streamlit).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND inválido: {backend} (use {', '.join(BACKENDS)})")
+    key = (backend, path)
+    with _clients_lock:
+        if key not in _clients:
+            if backend == 'firestore':
+                from firebase_admin import firestore
+                _clients[key] = firestore.client()
+            else:
+                from services.local_store import LocalClient
+                _clients[key] = LocalClient(':memory:' if backend == 'memory' else (path or DEFAULT_SQLITE_PATH))
+        return _clients[key]
+
+
+def client_from_config(config=None):
+    """Cria o cliente a partir de um mapeamento de configuração (ex.: st.secrets) ou do ambiente."""
+    config = config if config is not None else os.environ
+    return create_client(config.get('STORAGE_BACKEND', 'firestore'), config.get('STORAGE_PATH'))
+
+
+class Repository:
+    def __init__(self, client):
+        self.client = client
+
+    # --- users ---
+
+    def get_user(self, uid):
+        doc = self.client.collection('users').document(uid).get()
+        return doc.to_dict() if doc.exists else None
+
+    def create_user(self, uid, data):
+        self.client.collection('users').document(uid).set(data)
+        family_cache.invalidate(data.get('family_id'), 'users')
+
+    def update_user(self, uid, family_id, data):
+        self.client.collection('users').document(uid).update(data)
+        family_cache.invalidate(family_id, 'users')
+
+    def complete_setup(self, uid, family_id, profile, fixed_expenses, debts, initial_transaction=None):
+        """
+        Grava o resultado do wizard num único batch: os campos do perfil (com
+        setup_completed), as contas fixas, as dívidas e a transação de saldo
+        inicial (se houver) com o incremento do resumo mensal.
+        """
+        batch = self.client.batch()
+        batch.update(self.client.collection('users').document(uid), profile | {'setup_completed': True})
+        for collection, items in (('recurring_expenses', fixed_expenses), ('debts', debts)):
+            for item in items:
+                batch.set(self.client.collection(collection).document(), item | {'family_id': family_id, 'user_id': uid})
+        if initial_transaction:
+            trans = initial_transaction | {'family_id': family_id, 'updated_at': SERVER_TIMESTAMP}
+            batch.set(self.client.collection('transactions').document(), trans)
+            summaries.apply_transactions(batch, self.client, family_id, [trans])
+        batch.commit()
+        family_cache.invalidate(family_id, 'users', 'recurring_expenses', 'debts', 'transactions')
+
+    # --- avatars ---
+
+    def load_avatar(self, digest):
+        from services import avatars
+
+        return avatars.load_avatar(self.client, digest)
+
+    def set_avatar(self, uid, family_id, jpeg_bytes):
+        """Guarda a miniatura (por hash) e aponta o perfil para ela. Retorna o hash."""
+        from services import avatars
+
+        digest = avatars.set_user_avatar(self.client, self.client.collection('users').document(uid), jpeg_bytes)
+        family_cache.invalidate(family_id, 'users')
+        return digest
+
+    def migrate_avatar(self, uid, family_id, avatar_base64):
+        """Move a imagem embutida no perfil antigo para o armazenamento por hash. Retorna o hash."""
+        from services import avatars
+
+        digest = avatars.migrate_legacy_avatar(self.client, self.client.collection('users').document(uid), avatar_base64)
+        family_cache.invalidate(family_id, 'users')
+        return digest
+
+    def family_users(self, family_id):
+        return get_family_docs(self.client, 'users', family_id)
+
+    # --- debts, recurring_expenses, credit_cards (e demais coleções por família) ---
+
+    def list_family(self, collection, family_id):
+        return get_family_docs(self.client, collection, family_id)
+
+    def add(self, collection, data):
+        """Cria um documento com id automático; `data` precisa ter family_id."""
+        ref = self.client.collection(collection).document()
+        ref.set(data)
+        family_cache.invalidate(data['family_id'], collection)
+        return ref.id
+
+    def delete(self, collection, family_id, doc_id):
+        self.client.collection(collection).document(doc_id).delete()
+        family_cache.invalidate(family_id, collection)
+
+    # --- transactions ---
+
+    def add_transaction(self, data):
+        """Grava a transação e o incremento do resumo mensal no mesmo batch."""
+        batch = self.client.batch()
+        ref = self.client.collection('transactions').document()
+        # updated_at: marca d'água da sincronização dos snapshots
+        batch.set(ref, data | {'updated_at': SERVER_TIMESTAMP})
+        summaries.apply_transactions(batch, self.client, data['family_id'], [data])
+        batch.commit()
+        family_cache.invalidate(data['family_id'], 'transactions')
+        return ref.id
+
+    def add_transactions(self, family_id, rows, ids, progress=None):
+        """
+        Grava várias transações, com os resumos mensais, em blocos paralelos.
+        `ids` são ids determinísticos (ex.: do comprovante): as transações que
+        já existem são puladas. Retorna as contagens de `imports.write_import`.
+        """
+        from services import imports
+        from services.bulk_writer import WriteOp
+
+        col = self.client.collection('transactions')
+        ops = [WriteOp(col.document(doc_id), row | {'updated_at': SERVER_TIMESTAMP}) for doc_id, row in zip(ids, rows)]
+        try:
+            return imports.write_import(self.client, ops, family_id, progress=progress)
+        finally:
+            family_cache.invalidate(family_id, 'transactions')
+
+    def spending_rollup(self, family_id):
+        """Cubo mês × categoria × tipo × membro (services.rollups), da visão em tempo real ou do snapshot."""
+        from services import snapshots
+
+        cube = live_store.rollup(family_id)
+        if cube is not None:
+            return cube
+        return snapshots.rollup(self.client, family_id)
+
+    def transactions_page(self, family_id, cursor=None, **kwargs):
+        return transactions.fetch_page(self.client, family_id, cursor=cursor, **kwargs)
+
+    def month_summary(self, family_id, date=None):
+        return summaries.get_month_summary(self.client, family_id, date)
+
+    def previous_summaries(self, family_id, months=3, date=None):
+        return summaries.get_previous_summaries(self.client, family_id, months, date)
+
+    # --- importação e exclusões em massa ---
+
+    def import_items(self, family_id, items, uid, user_name='User', progress=None):
+        """
+        Grava os itens do importador (utils.importers) com ids determinísticos,
+        pulando os já importados. Retorna as contagens de
+        `imports.write_import`; levanta BulkWriteError.
+        """
+        from services import imports
+
+        ops = imports.build_import_ops(self.client, items, family_id, uid, user_name)
+        try:
+            return imports.write_import(self.client, ops, family_id, progress=progress)
+        finally:
+            family_cache.invalidate(family_id, 'debts', 'recurring_expenses', 'transactions')
+
+    def delete_user_data(self, uid, family_id, collections, checkpoint=None, progress=None):
+        """
+        Apaga os documentos do usuário nas `collections` e refaz os resumos
+        mensais. `checkpoint` e `progress` como em `bulk_delete.delete_collections`
+        (uma limpeza interrompida retoma de onde parou).
+        """
+        from services import bulk_delete
+
+        try:
+            bulk_delete.delete_collections(
+                self.client, collections, [('user_id', '==', uid)],
+                checkpoint=checkpoint, progress=progress, writer=self._delete_writer(family_id)
+            )
+        finally:
+            family_cache.invalidate(family_id, *collections)
+        summaries.rebuild_family(self.client, family_id)
+
+    def delete_transactions_between(self, family_id, start, end, progress=None):
+        """Apaga as transações da família em [start, end) e refaz os resumos mensais. Retorna quantas apagou."""
+        from services import bulk_delete
+
+        query = transactions.query_transactions(self.client, family_id, start, end)
+        try:
+            deleted = bulk_delete.delete_query(self.client, query, progress=progress, writer=self._delete_writer(family_id))
+        finally:
+            family_cache.invalidate(family_id, 'transactions')
+        summaries.rebuild_family(self.client, family_id)
+        return deleted
+
+    def _delete_writer(self, family_id):
+        from services import snapshots
+        from services.bulk_writer import BulkWriter
+
+        # Marcas de exclusão no mesmo batch: os snapshots locais removem as transações apagadas
+        return BulkWriter(self.client, before_commit=snapshots.tombstone_hook(self.client, family_id))
+
+    # --- daily_briefings ---
+
+    def get_briefing(self, family_id, date=None):
+        """Snapshot do briefing do dia (pode não existir ainda)."""
+        from services.briefings import briefing_id
+
+        return self.client.collection('daily_briefings').document(briefing_id(family_id, date or datetime.now())).get()
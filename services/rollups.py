@@ -0,0 +1,236 @@
+"""
+Cubo de gastos pré-agregado: mês × categoria × tipo × membro.
+
+Um array NumPy denso com a soma (e a contagem) dos lançamentos de cada
+célula. Os gráficos do dashboard consultam o cubo em vez de varrer as
+transações, então qualquer recorte de período e de membros custa o mesmo
+para um mês ou para anos de histórico (microssegundos).
+
+O cubo é montado uma vez a partir do snapshot Arrow (ou da visão em tempo
+real) e depois recebe só as diferenças: `apply_*(..., sign=-1)` para as
+versões antigas/excluídas e `sign=1` para as novas. A granularidade de
+data é o mês: intervalos são arredondados para meses inteiros.
+"""
+import threading
+from datetime import datetime
+
+import numpy as np
+
+AXES = ('month', 'category', 'type', 'member')
+DEFAULT_CATEGORY = 'Outros'
+DEFAULT_MEMBER = 'Sem nome'
+
+
+def month_index(date):
+    return date.year * 12 + date.month - 1
+
+
+def month_date(index):
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def months_window(months, date=None):
+    """(início, fim) dos `months` meses terminando no mês de `date`, com fim exclusivo."""
+    last = month_index(date or datetime.now())
+    return month_date(last - months + 1), month_date(last + 1)
+
+
+def _end_index(end):
+    """Índice exclusivo do mês final: um `end` no meio do mês inclui esse mês."""
+    if end.day == 1 and (not isinstance(end, datetime) or end.time() == datetime.min.time()):
+        return month_index(end)
+    return month_index(end) + 1
+
+
+class RollupCube:
+    """Somas e contagens por (mês, categoria, tipo, membro), com eixos que crescem sob demanda."""
+
+    def __init__(self):
+        self.first_month = None
+        self._labels = {axis: [] for axis in AXES[1:]}
+        self._index = {axis: {} for axis in AXES[1:]}
+        self.values = np.zeros((0, 0, 0, 0))
+        self.counts = np.zeros((0, 0, 0, 0), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_table(cls, table):
+        cube = cls()
+        cube.apply_table(table)
+        return cube
+
+    @classmethod
+    def from_rows(cls, rows):
+        cube = cls()
+        cube.apply_rows(rows)
+        return cube
+
+    # --- Eixos ---
+
+    @property
+    def categories(self):
+        return list(self._labels['category'])
+
+    @property
+    def types(self):
+        return list(self._labels['type'])
+
+    @property
+    def members(self):
+        return list(self._labels['member'])
+
+    @property
+    def months(self):
+        if self.first_month is None:
+            return []
+        return [month_date(self.first_month + i) for i in range(self.values.shape[0])]
+
+    def _codes(self, axis, encoded):
+        """
+        Índices do eixo para `encoded` = (rótulos distintos, posição de cada
+        linha nesses rótulos), criando os rótulos novos (e as fatias no array).
+        """
+        labels, inverse = encoded
+        index = self._index[axis]
+        new = [label for label in labels if label not in index]
+        if new:
+            for label in new:
+                index[label] = len(self._labels[axis])
+                self._labels[axis].append(label)
+            self._grow(AXES.index(axis), after=len(new))
+        return np.array([index[label] for label in labels], dtype=np.intp)[inverse]
+
+    def _month_codes(self, months):
+        lo, hi = int(months.min()), int(months.max())
+        if self.first_month is None:
+            self.first_month = lo
+            self._grow(0, after=hi - lo + 1)
+        else:
+            last = self.first_month + self.values.shape[0] - 1
+            if lo < self.first_month:
+                self._grow(0, before=self.first_month - lo)
+                self.first_month = lo
+            if hi > last:
+                self._grow(0, after=hi - last)
+        return months - self.first_month
+
+    def _grow(self, axis, before=0, after=0):
+        pad = [(0, 0)] * len(AXES)
+        pad[axis] = (before, after)
+        self.values = np.pad(self.values, pad)
+        self.counts = np.pad(self.counts, pad)
+
+    # --- Atualização ---
+
+    def _add(self, months, categories, types, members, values, sign):
+        if not len(months):
+            return
+        with self._lock:
+            coords = (
+                self._month_codes(np.asarray(months, dtype=np.int64)),
+                self._codes('category', categories),
+                self._codes('type', types),
+                self._codes('member', members),
+            )
+            flat = np.ravel_multi_index(coords, self.values.shape)
+            size = self.values.size
+            self.values += sign * np.bincount(flat, weights=values, minlength=size).reshape(self.values.shape)
+            self.counts += sign * np.bincount(flat, minlength=size).reshape(self.counts.shape)
+
+    def apply_rows(self, rows, sign=1):
+        """Soma (sign=1) ou subtrai (sign=-1) transações em dicts (date, value, type, category, user_name)."""
+        rows = [r for r in rows if r.get('date') and r.get('type')]
+        self._add(
+            [month_index(r['date']) for r in rows],
+            _encode(r.get('category') or DEFAULT_CATEGORY for r in rows),
+            _encode(r['type'] for r in rows),
+            _encode(r.get('user_name') or DEFAULT_MEMBER for r in rows),
+            np.array([float(r.get('value') or 0) for r in rows]),
+            sign,
+        )
+
+    def apply_table(self, table, sign=1):
+        """Mesmo que `apply_rows` para uma pyarrow.Table no esquema dos snapshots."""
+        import pyarrow.compute as pc
+
+        table = table.filter(pc.and_(pc.is_valid(table['date']), pc.is_valid(table['type'])))
+        if not table.num_rows:
+            return
+        months = (
+            pc.year(table['date']).to_numpy().astype(np.int64) * 12
+            + pc.month(table['date']).to_numpy().astype(np.int64) - 1
+        )
+        self._add(
+            months,
+            _dictionary(table['category'], DEFAULT_CATEGORY),
+            _dictionary(table['type'], None),
+            _dictionary(table['user_name'], DEFAULT_MEMBER),
+            pc.fill_null(table['value'], 0.0).to_numpy(),
+            sign,
+        )
+
+    # --- Consulta ---
+
+    def _slice(self, array, start, end, types, members, categories):
+        """Sub-cubo (cópia) de `array` no recorte pedido e os índices escolhidos em cada eixo."""
+        if self.first_month is None:
+            return None, None
+        m0 = 0 if start is None else max(month_index(start) - self.first_month, 0)
+        m1 = array.shape[0] if end is None else min(_end_index(end) - self.first_month, array.shape[0])
+        picks = [np.arange(m0, max(m1, m0))]
+        for axis, wanted in (('category', categories), ('type', types), ('member', members)):
+            index = self._index[axis]
+            if wanted is None:
+                picks.append(np.arange(len(index)))
+            else:
+                picks.append(np.array([index[w] for w in wanted if w in index], dtype=np.intp))
+        return array[np.ix_(*picks)], picks
+
+    def totals(self, start=None, end=None, by='category', types=('Despesa',), members=None, categories=None):
+        """
+        {rótulo: soma} agrupado pelo eixo `by`, no intervalo de meses
+        [start, end) e nos tipos/membros/categorias pedidos (None = todos).
+        Células zeradas (ex.: tudo excluído) ficam de fora.
+        """
+        with self._lock:
+            sub, picks = self._slice(self.values, start, end, types, members, categories)
+            if sub is None:
+                return {}
+            axis = AXES.index(by)
+            sums = sub.sum(axis=tuple(a for a in range(len(AXES)) if a != axis))
+            if by == 'month':
+                labels = [month_date(self.first_month + i) for i in picks[0]]
+            else:
+                labels = [self._labels[by][i] for i in picks[axis]]
+        return {label: float(total) for label, total in zip(labels, sums) if abs(total) > 1e-9}
+
+    def monthly(self, start=None, end=None, types=('Despesa',), members=None, categories=None):
+        """Série mensal (lista de datas, lista de somas) com todos os meses do intervalo, inclusive os vazios."""
+        with self._lock:
+            sub, picks = self._slice(self.values, start, end, types, members, categories)
+            if sub is None:
+                return [], []
+            return [month_date(self.first_month + i) for i in picks[0]], sub.sum(axis=(1, 2, 3)).tolist()
+
+    def count(self, start=None, end=None, types=None, members=None, categories=None):
+        """Quantidade de lançamentos no recorte."""
+        with self._lock:
+            sub, _ = self._slice(self.counts, start, end, types, members, categories)
+            return 0 if sub is None else int(sub.sum())
+
+
+def _encode(labels):
+    """(rótulos distintos, posição de cada item) de um iterável de rótulos."""
+    index = {}
+    inverse = [index.setdefault(label, len(index)) for label in labels]
+    return list(index), np.array(inverse, dtype=np.intp)
+
+
+def _dictionary(column, default):
+    """Mesmo que `_encode` para uma coluna Arrow, via dictionary_encode (sem um objeto por linha)."""
+    import pyarrow.compute as pc
+
+    if default is not None:
+        column = pc.fill_null(column, default)
+    encoded = pc.dictionary_encode(column.combine_chunks())
+    return encoded.dictionary.to_pylist(), encoded.indices.to_numpy(zero_copy_only=False).astype(np.intp)
@@ -0,0 +1,110 @@
+"""
+Sessões persistentes: o usuário volta ao app (reload, reconexão, TWA)
+sem digitar a senha de novo.
+
+No login é criado um id de sessão aleatório, que vai para o cookie do
+navegador. O refresh token do Firebase fica só no servidor, no documento
+`sessions/{sha256(id)}`: o cookie sozinho não é uma credencial do Firebase,
+um vazamento do banco não revela os cookies válidos, e apagar o documento
+encerra a sessão. Na reconexão, o refresh token é trocado por um ID token
+novo e o perfil vem do cache da família.
+
+O id é rotacionado a cada reconexão: o cookie antigo vale só por mais
+ROTATION_GRACE segundos (abas recarregadas ao mesmo tempo), então um cookie
+copiado para de funcionar assim que o dono volta ao app. O prazo total da
+sessão (SESSION_DAYS) conta desde o login e não é renovado.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from services.auth_client import AuthError
+from services.cache import family_cache
+
+COLLECTION = 'sessions'
+COOKIE_NAME = 'doispes_session'
+SESSION_DAYS = 14
+ROTATION_GRACE = 60
+# Erros do Firebase que invalidam o refresh token de vez (os demais podem ser passageiros)
+PERMANENT_ERRORS = ('INVALID_REFRESH_TOKEN', 'TOKEN_EXPIRED', 'USER_DISABLED', 'USER_NOT_FOUND')
+
+
+def _doc_id(session_id):
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+def create_session(db, uid, family_id, refresh_token, days=SESSION_DAYS, expires_at=None):
+    """Grava a sessão e retorna o id que vai para o cookie."""
+    session_id = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    db.collection(COLLECTION).document(_doc_id(session_id)).set({
+        'uid': uid,
+        'family_id': family_id,
+        'refresh_token': refresh_token,
+        'created_at': now,
+        'last_used_at': now,
+        'expires_at': expires_at or now + timedelta(days=days),
+    })
+    return session_id
+
+
+def delete_session(db, session_id):
+    db.collection(COLLECTION).document(_doc_id(session_id)).delete()
+
+
+def get_profile(repo, uid, family_id):
+    """Perfil do usuário pelo cache da família (cai junto com as escritas em `users`)."""
+    return family_cache.get('users', family_id, lambda: repo.get_user(uid), variant=('profile', uid))
+
+
+def is_permanent(error):
+    """AuthError que significa sessão revogada (e não Firebase fora do ar ou limite de taxa)."""
+    if any(error.code.startswith(code) for code in PERMANENT_ERRORS):
+        return True
+    return error.status is not None and 400 <= error.status < 500 and error.status != 429
+
+
+def restore_session(repo, auth_client, session_id):
+    """
+    Reabre a sessão do cookie: troca o refresh token por um ID token novo e
+    rotaciona o id da sessão.
+
+    Retorna {'uid', 'id_token', 'profile', 'session_id'} (o id novo, para o
+    cookie) ou None se a sessão não existe, expirou ou foi revogada no
+    Firebase (nesses casos o documento é apagado). Erros de rede, 5xx e 429
+    são repassados sem apagar nada, para não derrubar uma sessão válida.
+    """
+    ref = repo.client.collection(COLLECTION).document(_doc_id(session_id))
+    doc = ref.get()
+    if not doc.exists:
+        return None
+    session = doc.to_dict()
+    expires_at = session.get('expires_at')
+    if expires_at is None or expires_at < datetime.now(timezone.utc):
+        ref.delete()
+        return None
+
+    try:
+        tokens = auth_client.refresh(session['refresh_token'])
+    except AuthError as e:
+        if not is_permanent(e):
+            raise
+        # Refresh token revogado/expirado (senha trocada, conta desabilitada...)
+        ref.delete()
+        return None
+    if tokens.get('user_id') != session['uid']:
+        ref.delete()
+        return None
+
+    profile = get_profile(repo, session['uid'], session['family_id'])
+    if not profile:
+        return None
+
+    # Id novo com o mesmo prazo final (e o refresh token que o Firebase pode ter rotacionado)
+    new_id = create_session(
+        repo.client, session['uid'], session['family_id'],
+        tokens.get('refresh_token', session['refresh_token']), expires_at=expires_at
+    )
+    now = datetime.now(timezone.utc)
+    ref.update({'expires_at': min(expires_at, now + timedelta(seconds=ROTATION_GRACE)), 'last_used_at': now})
+    return {'uid': session['uid'], 'id_token': tokens.get('id_token'), 'profile': profile, 'session_id': new_id}
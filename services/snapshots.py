@@ -0,0 +1,310 @@
+"""
+Snapshot local (Arrow IPC, mapeado em memória) das transações de cada família.
+
+O dashboard lê a tabela do disco em vez de varrer as transações no
+Firestore. A cada sincronização só vêm os documentos com `updated_at`
+maior que a marca d'água guardada, mais as marcas de exclusão
+(`tombstones`, gravadas pelas exclusões em massa) com `deleted_at` maior
+que a marca d'água própria delas. Toda escrita de transação precisa levar
+`updated_at` (SERVER_TIMESTAMP). O que volta pela margem de segurança e já
+está na tabela (mesmo `updated_at`, exclusão já aplicada) é ignorado, então
+uma sincronização sem novidades não regrava o arquivo.
+
+Índices compostos necessários no Firestore:
+    transactions: family_id ASC, updated_at ASC
+    tombstones:   family_id ASC, deleted_at ASC
+
+Cada família sincronizada também mantém em memória um cubo de gastos
+(services.rollups) que recebe só as diferenças de cada sincronização.
+
+Um snapshot mais antigo que TOMBSTONE_DAYS é refeito do zero, então as
+marcas mais velhas que isso podem ser apagadas:
+    python -m services.snapshots --purge-tombstones
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from services.cache import family_cache
+
+SNAPSHOT_DIR = os.environ.get('DOISPES_SNAPSHOT_DIR', os.path.join('.cache', 'snapshots'))
+TOMBSTONES = 'tombstones'
+TOMBSTONE_DAYS = 30
+# Margem da marca d'água: cobre escritas confirmadas fora de ordem
+OVERLAP = timedelta(minutes=2)
+FORMAT_VERSION = 2
+
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('date', pa.timestamp('us')),
+    ('value', pa.float64()),
+    ('type', pa.string()),
+    ('category', pa.string()),
+    ('description', pa.string()),
+    ('user_name', pa.string()),
+    ('updated_at', pa.timestamp('us')),
+])
+_TIMESTAMPS = ('date', 'updated_at')
+
+_locks = {}
+_locks_guard = threading.Lock()
+# family_id -> (cubo, tabela a que ele corresponde)
+_rollups = {}
+
+
+def _family_lock(family_id):
+    with _locks_guard:
+        return _locks.setdefault(family_id, threading.Lock())
+
+
+def _paths(family_id, directory):
+    base = os.path.join(directory, family_id)
+    return base + '.arrow', base + '.json'
+
+
+def _naive_utc(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_table(docs):
+    return _rows_table([d.to_dict() | {'id': d.id} for d in docs])
+
+
+def _rows_table(rows):
+    columns = {
+        name: [_naive_utc(r.get(name)) if name in _TIMESTAMPS else r.get(name) for r in rows]
+        for name in SCHEMA.names
+    }
+    columns['value'] = [float(v) if v is not None else None for v in columns['value']]
+    return pa.table(columns, schema=SCHEMA)
+
+
+def _max_stamp(docs, field, current=None):
+    stamps = [d.to_dict().get(field) for d in docs]
+    stamps = [s for s in stamps if s is not None] + ([current] if current else [])
+    return max(stamps) if stamps else None
+
+
+def _load(family_id, directory):
+    """(tabela mapeada em memória, meta) do disco, ou (None, None)."""
+    table_path, meta_path = _paths(family_id, directory)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            return None, None
+        with pa.memory_map(table_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (OSError, ValueError, pa.ArrowInvalid):
+        return None, None
+    for key in ('watermark', 'tombstone_watermark'):
+        meta[key] = datetime.fromisoformat(meta[key]) if meta.get(key) else None
+    meta['synced_at'] = datetime.fromisoformat(meta['synced_at'])
+    return table, meta
+
+
+def _write_meta(meta_path, marks, synced_at, rows):
+    watermark, tombstone_watermark = marks
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({
+            'version': FORMAT_VERSION,
+            'watermark': watermark.isoformat() if watermark else None,
+            'tombstone_watermark': tombstone_watermark.isoformat() if tombstone_watermark else None,
+            'synced_at': synced_at.isoformat(),
+            'rows': rows,
+        }, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _save(family_id, directory, table, marks, synced_at):
+    """Grava tabela e meta (troca atômica); sem disco gravável, segue só em memória."""
+    table_path, meta_path = _paths(family_id, directory)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with pa.OSFile(table_path + '.tmp', 'wb') as sink:
+            with pa.ipc.new_file(sink, SCHEMA) as writer:
+                writer.write_table(table)
+        os.replace(table_path + '.tmp', table_path)
+        _write_meta(meta_path, marks, synced_at, table.num_rows)
+    except OSError:
+        return table
+    # Reabre mapeado: a tabela passa a apontar para o arquivo, não para a heap
+    mapped, _ = _load(family_id, directory)
+    return table if mapped is None else mapped
+
+
+def _full_sync(db, family_id):
+    docs = list(db.collection('transactions').where('family_id', '==', family_id).stream())
+    # Marcas de exclusão anteriores à leitura completa já estão refletidas nela
+    return _to_table(docs), (_max_stamp(docs, 'updated_at'), None)
+
+
+def _incremental_sync(db, family_id, table, meta):
+    """
+    Aplica alterações e exclusões desde as marcas d'água. Retorna (tabela,
+    marcas, diferença), com marcas = (updated_at, deleted_at) e diferença =
+    (linhas que saíram, linhas que entraram) ou None se nada mudou de fato.
+    """
+    since = (meta['watermark'] or meta['synced_at']) - OVERLAP
+    tombstone_since = (meta['tombstone_watermark'] or meta['synced_at']) - OVERLAP
+    changed = list(
+        db.collection('transactions')
+        .where('family_id', '==', family_id)
+        .where('updated_at', '>', since)
+        .stream()
+    )
+    tombstones = list(
+        db.collection(TOMBSTONES)
+        .where('family_id', '==', family_id)
+        .where('deleted_at', '>', tombstone_since)
+        .stream()
+    )
+    marks = (
+        _max_stamp(changed, 'updated_at', meta['watermark']),
+        _max_stamp(tombstones, 'deleted_at', meta['tombstone_watermark']),
+    )
+    if not changed and not tombstones:
+        return table, marks, None
+
+    # Versão (updated_at) de cada id citado que já está na tabela
+    ids = [d.id for d in changed] + [t.id for t in tombstones]
+    current = table.filter(pc.is_in(table['id'], value_set=pa.array(ids, pa.string())))
+    known = dict(zip(current['id'].to_pylist(), current['updated_at'].to_pylist()))
+    latest = dict(known)
+    for d in changed:
+        latest[d.id] = _naive_utc(d.to_dict().get('updated_at'))
+
+    # Exclusões mais novas que a versão conhecida (um id recriado depois da exclusão fica)
+    deleted = set()
+    for t in tombstones:
+        deleted_at = _naive_utc(t.to_dict().get('deleted_at'))
+        if t.id in latest and (latest[t.id] is None or deleted_at is None or latest[t.id] <= deleted_at):
+            deleted.add(t.id)
+    # Só o que a tabela ainda não tem (a margem devolve de novo as escritas recentes)
+    changed = [
+        d for d in changed
+        if d.id not in deleted and (d.id not in known or known[d.id] != latest[d.id])
+    ]
+    deleted &= known.keys()
+    if not changed and not deleted:
+        return table, marks, None
+
+    # Upsert por id: remove as versões antigas e as excluídas, depois anexa as novas
+    drop = pc.is_in(table['id'], value_set=pa.array([d.id for d in changed] + sorted(deleted), pa.string()))
+    removed, added = table.filter(drop), _to_table(changed)
+    table = pa.concat_tables([table.filter(pc.invert(drop)), added])
+    return table, marks, (removed, added)
+
+
+def sync(db, family_id, directory=SNAPSHOT_DIR):
+    """Sincroniza o snapshot da família e retorna a pyarrow.Table atualizada."""
+    with _family_lock(family_id):
+        table, meta = _load(family_id, directory)
+        now = datetime.now(timezone.utc)
+        if table is None or now - meta['synced_at'] > timedelta(days=TOMBSTONE_DAYS):
+            table, marks = _full_sync(db, family_id)
+            base = delta = None
+            _rollups.pop(family_id, None)
+        else:
+            base = table
+            table, marks, delta = _incremental_sync(db, family_id, base, meta)
+            if delta is None:
+                # Só registra a verificação: o snapshot continua válido
+                try:
+                    _write_meta(_paths(family_id, directory)[1], marks, now, table.num_rows)
+                except OSError:
+                    pass
+                _update_rollup(family_id, base, table)
+                return table
+        table = _save(family_id, directory, table, marks, now)
+        _update_rollup(family_id, base, table, delta)
+        return table
+
+
+def _update_rollup(family_id, base, table, delta=None):
+    """Leva o cubo da família (se já montado sobre `base`) para a nova versão da tabela."""
+    entry = _rollups.get(family_id)
+    if entry is None:
+        return
+    cube = entry[0]
+    if entry[1].num_rows != base.num_rows:
+        # O cubo não corresponde ao que estava em disco: remonta na próxima leitura
+        _rollups.pop(family_id)
+        return
+    if delta is not None:
+        removed, added = delta
+        cube.apply_table(removed, sign=-1)
+        cube.apply_table(added)
+    _rollups[family_id] = (cube, table)
+
+
+def rollup(db, family_id, directory=SNAPSHOT_DIR):
+    """
+    Cubo de gastos (services.rollups.RollupCube) da família, consistente com o
+    snapshot em cache. É montado uma vez a partir da tabela mapeada e depois
+    só recebe as diferenças das sincronizações.
+    """
+    from services.rollups import RollupCube
+
+    table = family_cache.get('transactions', family_id, lambda: sync(db, family_id, directory), variant='snapshot')
+    with _family_lock(family_id):
+        entry = _rollups.get(family_id)
+        if entry is None or entry[1] is not table:
+            entry = _rollups[family_id] = (RollupCube.from_table(table), table)
+        return entry[0]
+
+
+def tombstone_hook(db, family_id):
+    """
+    `before_commit` do BulkWriter que grava uma marca de exclusão para cada
+    transação apagada no mesmo batch (1 write extra por operação do bloco).
+    """
+    def before_commit(batch, chunk):
+        for op in chunk:
+            if op.data is None and op.ref.parent.id == 'transactions':
+                batch.set(db.collection(TOMBSTONES).document(op.ref.id), {
+                    'family_id': family_id,
+                    'deleted_at': SERVER_TIMESTAMP
+                })
+    return before_commit
+
+
+def purge_tombstones(db, days=TOMBSTONE_DAYS):
+    """Apaga marcas de exclusão mais antigas que `days` dias. Retorna quantas."""
+    from google.cloud.firestore_v1.field_path import FieldPath
+
+    from services.bulk_delete import delete_query
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    query = (
+        db.collection(TOMBSTONES)
+        .where('deleted_at', '<', cutoff)
+        .order_by('deleted_at')
+        .order_by(FieldPath.document_id())
+    )
+    return delete_query(db, query)
+
+
+def main():
+    from services.firebase import init_db
+
+    parser = argparse.ArgumentParser(description="Manutenção dos snapshots de transações.")
+    parser.add_argument('--purge-tombstones', action='store_true', help=f"apaga marcas de exclusão com mais de {TOMBSTONE_DAYS} dias")
+    args = parser.parse_args()
+
+    if args.purge_tombstones:
+        print(f"{purge_tombstones(init_db())} marcas apagadas")
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Resumos mensais por família (coleção `monthly_summaries`).
+
+Cada documento `{family_id}_{YYYY-MM}` guarda os totais do mês por tipo
+(Receita/Despesa/Investimento), por tipo e categoria, e a contagem de
+lançamentos. Os totais são incrementados no mesmo batch que grava as
+transações, então o dashboard lê 1 documento em vez do histórico inteiro.
+
+Para regenerar a partir das transações:
+    python -m services.summaries --family FAMILIA
+    python -m services.summaries --all
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+from google.cloud.firestore import Increment
+
+COLLECTION = 'monthly_summaries'
+
+
+def month_key(date):
+    return date.strftime('%Y-%m')
+
+
+def summary_id(family_id, month):
+    return f"{family_id}_{month}"
+
+
+def _aggregate(transactions):
+    """Agrupa transações por mês: {mes: {'count', 'totals', 'by_category'}}"""
+    months = defaultdict(lambda: {'count': 0, 'totals': defaultdict(float), 'by_category': defaultdict(lambda: defaultdict(float))})
+    for t in transactions:
+        if not t.get('date') or not t.get('type'):
+            continue
+        value = float(t.get('value', 0) or 0)
+        m = months[month_key(t['date'])]
+        m['count'] += 1
+        m['totals'][t['type']] += value
+        m['by_category'][t['type']][t.get('category') or 'Outros'] += value
+    return months
+
+
+def apply_transactions(batch, db, family_id, transactions):
+    """
+    Acrescenta ao `batch` os incrementos dos resumos mensais das `transactions`.
+    Gera no máximo um write por mês distinto; retorna quantos writes adicionou.
+    """
+    months = _aggregate(transactions)
+    for month, agg in months.items():
+        ref = db.collection(COLLECTION).document(summary_id(family_id, month))
+        batch.set(ref, {
+            'family_id': family_id,
+            'month': month,
+            'count': Increment(agg['count']),
+            'totals': {k: Increment(v) for k, v in agg['totals'].items()},
+            'by_category': {t: {c: Increment(v) for c, v in cats.items()} for t, cats in agg['by_category'].items()},
+            'updated_at': datetime.now()
+        }, merge=True)
+    return len(months)
+
+
+def get_month_summary(db, family_id, date=None):
+    """Retorna o resumo do mês de `date` (padrão: mês atual) ou um resumo zerado."""
+    month = month_key(date or datetime.now())
+    doc = db.collection(COLLECTION).document(summary_id(family_id, month)).get()
+    if doc.exists:
+        return doc.to_dict()
+    return {'family_id': family_id, 'month': month, 'count': 0, 'totals': {}, 'by_category': {}}
+
+
+def get_previous_summaries(db, family_id, months=3, date=None):
+    """
+    Resumos dos `months` meses completos anteriores ao mês de `date`,
+    lidos num único get_all. Meses sem documento são omitidos.
+    """
+    date = date or datetime.now()
+    keys = []
+    year, month = date.year, date.month
+    for _ in range(months):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        keys.append(f"{year:04d}-{month:02d}")
+    refs = [db.collection(COLLECTION).document(summary_id(family_id, k)) for k in keys]
+    return [doc.to_dict() for doc in db.get_all(refs) if doc.exists]
+
+
+def rebuild_family(db, family_id):
+    """Recalcula do zero os resumos da família a partir da coleção `transactions`."""
+    docs = db.collection('transactions').where('family_id', '==', family_id).stream()
+    months = _aggregate(d.to_dict() for d in docs)
+
+    batch = db.batch()
+    pending = 0
+    # Remove resumos de meses que não têm mais transações
+    for old in db.collection(COLLECTION).where('family_id', '==', family_id).stream():
+        if old.to_dict().get('month') not in months:
+            batch.delete(old.reference)
+            pending += 1
+    for month, agg in months.items():
+        ref = db.collection(COLLECTION).document(summary_id(family_id, month))
+        batch.set(ref, {
+            'family_id': family_id,
+            'month': month,
+            'count': agg['count'],
+            'totals': dict(agg['totals']),
+            'by_category': {t: dict(cats) for t, cats in agg['by_category'].items()},
+            'updated_at': datetime.now()
+        })
+        pending += 1
+        if pending >= 400:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    return len(months)
+
+
+def main():
+    from services.firebase import init_db
+
+    parser = argparse.ArgumentParser(description="Regenera os resumos mensais a partir das transações.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--family', help="family_id a regenerar")
+    group.add_argument('--all', action='store_true', help="regenera todas as famílias")
+    args = parser.parse_args()
+
+    db = init_db()
+    if args.all:
+        families = {u.to_dict().get('family_id') for u in db.collection('users').stream()}
+        families.discard(None)
+    else:
+        families = {args.family}
+
+    for family_id in sorted(families):
+        n = rebuild_family(db, family_id)
+        print(f"{family_id}: {n} meses")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Consultas de transações filtradas no servidor.
+
+As consultas combinam `family_id ==` com intervalo/ordenação em `date`,
+o que exige o índice composto no Firestore:
+    transactions: family_id ASC, date DESC, __name__ DESC
+(o console do Firebase sugere o link de criação na primeira execução).
+"""
+from datetime import datetime
+
+from google.cloud.firestore import Query
+from google.cloud.firestore_v1.field_path import FieldPath
+
+PAGE_SIZE = 50
+
+
+def month_range(date=None):
+    """Retorna (início, fim) do mês de `date`, com fim exclusivo."""
+    date = date or datetime.now()
+    start = datetime(date.year, date.month, 1)
+    if date.month == 12:
+        end = datetime(date.year + 1, 1, 1)
+    else:
+        end = datetime(date.year, date.month + 1, 1)
+    return start, end
+
+
+def query_transactions(db, family_id, start=None, end=None, descending=True):
+    """
+    Monta a consulta de transações da família entre `start` (inclusive) e
+    `end` (exclusive), ordenada por data e desempatada pelo id do documento
+    para que o cursor de paginação seja estável.
+    """
+    direction = Query.DESCENDING if descending else Query.ASCENDING
+    query = db.collection('transactions').where('family_id', '==', family_id)
+    if start is not None:
+        query = query.where('date', '>=', start)
+    if end is not None:
+        query = query.where('date', '<', end)
+    return query.order_by('date', direction=direction).order_by(FieldPath.document_id(), direction=direction)
+
+
+def fetch_page(db, family_id, page_size=PAGE_SIZE, cursor=None, start=None, end=None, descending=True):
+    """
+    Busca uma página de transações.
+
+    `cursor` é o último snapshot da página anterior (ou None para a primeira).
+    Retorna (linhas, próximo_cursor); o próximo cursor é None na última página.
+    """
+    query = query_transactions(db, family_id, start, end, descending).limit(page_size)
+    if cursor is not None:
+        query = query.start_after(cursor)
+    docs = list(query.stream())
+    rows = [d.to_dict() | {'id': d.id} for d in docs]
+    next_cursor = docs[-1] if len(docs) == page_size else None
+    return rows, next_cursor
@@ -0,0 +1,59 @@
+"""Fixtures compartilhadas pelos testes unitários."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.auth_client import AuthClient
+
+
+class StandIn:
+    """Servidor local: responde com a fila `responses` de (status, corpo, atraso) e registra as requisições."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                stand_in.requests.append((self.path, self.rfile.read(length)))
+                status, body, delay = stand_in.responses.pop(0) if stand_in.responses else (200, {}, 0)
+                time.sleep(delay)
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except OSError:
+                    pass  # O cliente desistiu (timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reply(self, status, body=None, delay=0):
+        self.responses.append((status, body or {}, delay))
+
+    def client(self, **kwargs):
+        kwargs.setdefault('base_delay', 0)
+        return AuthClient('test-key', base_url=self.url + '/v1', token_url=self.url + '/token', **kwargs)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
@@ -0,0 +1,86 @@
+"""
+AuthClient contra um servidor HTTP local que imita o Identity Toolkit:
+retry com backoff e classificação dos erros.
+"""
+import json
+import socket
+
+import pytest
+import requests
+
+from services.auth_client import AuthClient, AuthError
+
+
+def firebase_error(message):
+    return {'error': {'message': message}}
+
+
+def test_sign_in_returns_response(stand_in):
+    stand_in.reply(200, {'localId': 'u1', 'idToken': 'id', 'refreshToken': 'rt'})
+    data = stand_in.client().sign_in('a@b.com', 'segredo')
+    assert data['localId'] == 'u1'
+    path, body = stand_in.requests[0]
+    assert path == '/v1/accounts:signInWithPassword?key=test-key'
+    assert json.loads(body) == {'email': 'a@b.com', 'password': 'segredo', 'returnSecureToken': True}
+
+
+def test_retries_5xx_then_succeeds(stand_in):
+    stand_in.reply(503)
+    stand_in.reply(502)
+    stand_in.reply(200, {'localId': 'u1'})
+    assert stand_in.client(max_retries=2).sign_in('a@b.com', 'x') == {'localId': 'u1'}
+    assert len(stand_in.requests) == 3
+
+
+def test_gives_up_after_max_retries(stand_in):
+    for _ in range(5):
+        stand_in.reply(503, firebase_error('UNAVAILABLE'))
+    with pytest.raises(AuthError) as info:
+        stand_in.client(max_retries=2).sign_in('a@b.com', 'x')
+    assert info.value.status == 503
+    assert info.value.code == 'UNAVAILABLE'
+    assert len(stand_in.requests) == 3
+
+
+def test_client_errors_are_not_retried(stand_in):
+    stand_in.reply(400, firebase_error('INVALID_LOGIN_CREDENTIALS'))
+    with pytest.raises(AuthError) as info:
+        stand_in.client().sign_in('a@b.com', 'errada')
+    assert info.value.code == 'INVALID_LOGIN_CREDENTIALS'
+    assert info.value.status == 400
+    assert len(stand_in.requests) == 1
+
+
+def test_error_without_json_body(stand_in):
+    stand_in.reply(500)
+    with pytest.raises(AuthError) as info:
+        stand_in.client(max_retries=0).send_password_reset('a@b.com')
+    assert info.value.code == 'HTTP 500'
+
+
+def test_password_reset_is_not_retried(stand_in):
+    # Repetir depois de um 5xx poderia mandar o email duas vezes
+    stand_in.reply(503, firebase_error('UNAVAILABLE'))
+    stand_in.reply(200, {})
+    with pytest.raises(AuthError) as info:
+        stand_in.client(max_retries=2).send_password_reset('a@b.com')
+    assert info.value.status == 503
+    assert len(stand_in.requests) == 1
+
+
+def test_timeout_is_retried_and_raised(stand_in):
+    stand_in.reply(200, {}, delay=0.5)
+    stand_in.reply(200, {}, delay=0.5)
+    with pytest.raises(requests.exceptions.Timeout):
+        stand_in.client(timeout=0.1, max_retries=1).refresh('rt')
+    assert len(stand_in.requests) == 2
+
+
+def test_connection_error_is_retried_and_raised():
+    # Porta sem servidor: recusa a conexão
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    client = AuthClient('k', base_url=url, token_url=url + '/token', base_delay=0, max_retries=1)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.refresh('rt')
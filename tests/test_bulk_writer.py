@@ -0,0 +1,118 @@
+"""BulkWriter sobre o LocalClient: divisão em blocos, retry e documentos já existentes."""
+import pytest
+from google.api_core import exceptions as gexc
+
+from services.bulk_writer import BulkWriteError, BulkWriter, WriteOp
+from services.local_store import LocalClient
+
+
+class FlakyClient(LocalClient):
+    """LocalClient cujos commits levantam, em ordem, os erros de `failures` antes de gravar."""
+
+    def __init__(self, failures=()):
+        super().__init__()
+        self.failures = list(failures)
+        self.commits = []
+
+    def batch(self):
+        batch = super().batch()
+        commit = batch.commit
+
+        def flaky_commit():
+            self.commits.append(len(batch._ops))
+            if self.failures:
+                raise self.failures.pop(0)
+            commit()
+        batch.commit = flaky_commit
+        return batch
+
+
+@pytest.fixture
+def db():
+    client = FlakyClient()
+    yield client
+    client.close()
+
+
+def ops(db, ids, collection='transactions'):
+    return [WriteOp(db.collection(collection).document(f"d{i}"), {'family_id': 'F1', 'n': i}) for i in ids]
+
+
+def stored(db, collection='transactions'):
+    return sorted(doc.to_dict()['n'] for doc in db.collection(collection).stream())
+
+
+def test_chunk_size_is_validated(db):
+    with pytest.raises(ValueError):
+        BulkWriter(db, chunk_size=501)
+
+
+def test_splits_into_chunks_and_counts_by_collection(db):
+    progress = []
+    writer = BulkWriter(db, chunk_size=100, max_workers=2)
+    counts = writer.write(ops(db, range(250)) + ops(db, range(5), 'debts'), progress=lambda done, total: progress.append((done, total)))
+    assert counts == {'transactions': 250, 'debts': 5}
+    assert sorted(db.commits) == [55, 100, 100]
+    assert progress[0] == (0, 255)
+    assert progress[-1] == (255, 255)
+    assert stored(db) == list(range(250))
+
+
+def test_deletes(db):
+    BulkWriter(db).write(ops(db, range(3)))
+    BulkWriter(db).write([WriteOp(db.collection('transactions').document('d1'), None)])
+    assert stored(db) == [0, 2]
+
+
+def test_transient_errors_are_retried(db):
+    db.failures = [gexc.ServiceUnavailable('x'), gexc.Aborted('x')]
+    counts = BulkWriter(db, base_delay=0).write(ops(db, range(10)))
+    assert counts == {'transactions': 10}
+    assert len(db.commits) == 3
+
+
+def test_gives_up_after_max_retries(db):
+    db.failures = [gexc.DeadlineExceeded('x')] * 3
+    with pytest.raises(BulkWriteError) as info:
+        BulkWriter(db, max_retries=2, base_delay=0).write(ops(db, range(10)))
+    assert info.value.counts == {}
+    assert stored(db) == []
+
+
+def test_permanent_errors_are_not_retried(db):
+    db.failures = [gexc.PermissionDenied('x')]
+    with pytest.raises(BulkWriteError):
+        BulkWriter(db, base_delay=0).write(ops(db, range(10)))
+    assert len(db.commits) == 1
+
+
+def test_before_commit_joins_the_batch(db):
+    def add_total(batch, chunk):
+        batch.set(db.collection('totals').document(f"c{chunk[0].data['n']}"), {'family_id': 'F1', 'n': len(chunk)})
+
+    BulkWriter(db, chunk_size=4, max_workers=1, before_commit=add_total).write(ops(db, range(10)))
+    assert sorted(db.commits) == [3, 5, 5]
+    assert stored(db, 'totals') == [2, 4, 4]
+
+
+def test_skip_existing(db):
+    BulkWriter(db).write(ops(db, [0, 1]))
+    seen = []
+    writer = BulkWriter(db, skip_existing=True, before_commit=lambda batch, chunk: seen.extend(op.data['n'] for op in chunk))
+    counts = writer.write(ops(db, range(5)))
+    assert counts == {'transactions': 3}
+    assert writer.skipped == {'transactions': 2}
+    assert sorted(seen) == [2, 3, 4]
+
+
+def test_skip_existing_recovers_from_a_racing_create(db):
+    def racing_write(batch, chunk):
+        # Outra escrita cria d0 entre o get_all e o commit, só na primeira tentativa
+        if not db.commits:
+            db.collection('transactions').document('d0').set({'family_id': 'F1', 'n': 0})
+
+    writer = BulkWriter(db, skip_existing=True, base_delay=0, before_commit=racing_write)
+    assert writer.write(ops(db, range(3))) == {'transactions': 2}
+    assert writer.skipped == {'transactions': 1}
+    assert len(db.commits) == 2
+    assert stored(db) == [0, 1, 2]
@@ -0,0 +1,70 @@
+"""Consultor de dívidas: memoização pela impressão digital da lista e leituras do banco."""
+import pytest
+
+from services import debt_strategy
+from services.local_store import LocalClient
+
+
+class CountingClient(LocalClient):
+    """LocalClient que conta as leituras da coleção de análises."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def collection(self, name):
+        if name == debt_strategy.COLLECTION:
+            self.reads += 1
+        return super().collection(name)
+
+
+@pytest.fixture
+def db():
+    debt_strategy._memo.clear()
+    client = CountingClient()
+    yield client
+    client.close()
+
+
+DEBTS = [
+    {'description': 'Cartão  Nubank', 'total_value': 3000, 'installment_value': 300, 'remaining_installments': 10},
+    {'description': 'Carro', 'total_value': 20000.0, 'installment_value': 800.0, 'remaining_installments': 25},
+]
+
+
+def test_fingerprint_ignores_order_and_formatting():
+    reordered = [DEBTS[1], DEBTS[0] | {'description': 'cartão nubank', 'total_value': 3000.0}]
+    assert debt_strategy.fingerprint(reordered) == debt_strategy.fingerprint(DEBTS)
+    changed = [DEBTS[0], DEBTS[1] | {'remaining_installments': 24}]
+    assert debt_strategy.fingerprint(changed) != debt_strategy.fingerprint(DEBTS)
+
+
+def test_missing_analysis_is_memoized(db):
+    assert debt_strategy.get_cached(db, 'F1', DEBTS) is None
+    assert debt_strategy.get_cached(db, 'F1', DEBTS) is None
+    assert debt_strategy.get_saved(db, 'F1') is None
+    assert db.reads == 1
+
+
+def test_generated_analysis_is_reused_until_debts_change(db):
+    calls = []
+    content = debt_strategy.generate_strategy(db, 'F1', DEBTS, generate=lambda prompt: calls.append(prompt) or "Pague o cartão")
+    assert content == "Pague o cartão"
+    assert 'Carro' in calls[0]
+    assert debt_strategy.get_cached(db, 'F1', DEBTS) == "Pague o cartão"
+
+    changed = DEBTS[:1]
+    assert debt_strategy.get_cached(db, 'F1', changed) is None
+    assert debt_strategy.get_cached(db, 'F1', changed) is None
+    # A última análise continua disponível (ex.: IA fora do ar)
+    assert debt_strategy.get_saved(db, 'F1') == "Pague o cartão"
+    assert db.reads == 2  # Só a gravação e a primeira consulta do hash novo
+
+
+def test_saved_analysis_is_read_once_per_process(db):
+    debt_strategy.generate_strategy(db, 'F1', DEBTS, generate=lambda prompt: "Análise")
+    debt_strategy._memo.clear()  # Outro processo
+    reads = db.reads
+    assert debt_strategy.get_cached(db, 'F1', DEBTS) == "Análise"
+    assert debt_strategy.get_cached(db, 'F1', DEBTS) == "Análise"
+    assert db.reads == reads + 1
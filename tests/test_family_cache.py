@@ -0,0 +1,117 @@
+"""FamilyCache: expiração, LRU, invalidação e leituras concorrentes com escritas."""
+import threading
+
+from services.cache import FamilyCache
+
+
+def counting_loader(value):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return value
+    return load, calls
+
+
+def test_hit_after_miss():
+    cache = FamilyCache()
+    load, calls = counting_loader([1])
+    assert cache.get('debts', 'F1', load) == [1]
+    assert cache.get('debts', 'F1', load) == [1]
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_expiry():
+    cache = FamilyCache(ttl=0)
+    load, calls = counting_loader('x')
+    cache.get('debts', 'F1', load)
+    cache.get('debts', 'F1', load)
+    assert len(calls) == 2
+
+
+def test_lru_eviction():
+    cache = FamilyCache(max_entries=2)
+    cache.get('debts', 'F1', lambda: 1)
+    cache.get('debts', 'F2', lambda: 2)
+    cache.get('debts', 'F1', lambda: 1)  # F1 passa a ser a mais recente
+    cache.get('debts', 'F3', lambda: 3)
+    load, calls = counting_loader(1)
+    cache.get('debts', 'F1', load)
+    assert not calls
+    load, calls = counting_loader(2)
+    cache.get('debts', 'F2', load)
+    assert len(calls) == 1
+
+
+def test_invalidate_drops_variants_of_the_collection_only():
+    cache = FamilyCache()
+    cache.get('transactions', 'F1', lambda: 'jan', variant='2026-01')
+    cache.get('transactions', 'F1', lambda: 'fev', variant='2026-02')
+    cache.get('debts', 'F1', lambda: 'dividas')
+    cache.get('transactions', 'F2', lambda: 'outra familia')
+
+    cache.invalidate('F1', 'transactions')
+
+    assert cache.get('transactions', 'F1', lambda: 'novo', variant='2026-01') == 'novo'
+    assert cache.get('transactions', 'F1', lambda: 'novo', variant='2026-02') == 'novo'
+    assert cache.get('debts', 'F1', lambda: 'novo') == 'dividas'
+    assert cache.get('transactions', 'F2', lambda: 'novo') == 'outra familia'
+
+
+def test_invalidate_without_collections_drops_whole_family():
+    cache = FamilyCache()
+    cache.get('debts', 'F1', lambda: 'a')
+    cache.get('users', 'F1', lambda: 'b')
+    cache.invalidate('F1')
+    assert cache.get('debts', 'F1', lambda: 'novo') == 'novo'
+    assert cache.get('users', 'F1', lambda: 'novo') == 'novo'
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = FamilyCache()
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        return 'antes da escrita'
+
+    result = []
+    reader = threading.Thread(target=lambda: result.append(cache.get('debts', 'F1', slow_load)))
+    reader.start()
+    loading.wait(5)
+    cache.invalidate('F1', 'debts')  # Escrita no meio da leitura
+    release.set()
+    reader.join(5)
+
+    assert result == ['antes da escrita']
+    assert cache.get('debts', 'F1', lambda: 'depois da escrita') == 'depois da escrita'
+
+
+def test_load_racing_clear_is_not_cached():
+    cache = FamilyCache()
+
+    def load():
+        cache.clear()
+        return 'velho'
+
+    cache.get('debts', 'F1', load)
+    assert cache.get('debts', 'F1', lambda: 'novo') == 'novo'
+
+
+
+def test_generation_changes_with_invalidation():
+    cache = FamilyCache()
+    before = cache.generation('transactions', 'F1')
+    cache.invalidate('F1', 'debts')
+    cache.invalidate('F2', 'transactions')
+    assert cache.generation('transactions', 'F1') == before
+    cache.invalidate('F1', 'transactions')
+    after = cache.generation('transactions', 'F1')
+    assert after != before
+    cache.invalidate('F1')
+    assert cache.generation('transactions', 'F1') != after
+    after = cache.generation('transactions', 'F1')
+    cache.clear()
+    assert cache.generation('transactions', 'F1') != after
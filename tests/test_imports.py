@@ -0,0 +1,73 @@
+"""Gravação de importações: ids determinísticos e reimportação sem duplicar."""
+from datetime import date
+
+import pytest
+
+from services import imports
+from services.cache import family_cache
+from services.local_store import LocalClient
+
+
+@pytest.fixture
+def db():
+    family_cache.clear()
+    client = LocalClient()
+    yield client
+    client.close()
+
+
+def item(description='Padaria', value=12.5, day=5, type_='expense', **extra):
+    return {'description': description, 'value': value, 'date': date(2026, 3, day), 'type': type_, **extra}
+
+
+def test_normalize_description():
+    assert imports.normalize_description('  PÃO   de Açúcar ') == 'pao de acucar'
+    assert imports.normalize_description(None) == ''
+
+
+def test_fingerprint_ignores_accents_case_and_spacing():
+    a = imports.fingerprint('F1', 'transactions', item('Pão  de Açúcar'))
+    assert a == imports.fingerprint('F1', 'transactions', item('PAO DE ACUCAR'))
+    assert len(a) == 32
+    assert a != imports.fingerprint('F2', 'transactions', item('Pão de Açúcar'))
+    assert a != imports.fingerprint('F1', 'transactions', item('Pão de Açúcar', value=12.51))
+    assert a != imports.fingerprint('F1', 'transactions', item('Pão de Açúcar', day=6))
+    assert a != imports.fingerprint('F1', 'transactions', item('Pão de Açúcar'), ordinal=1)
+
+
+def test_identical_items_get_ordinals(db):
+    ops = imports.build_import_ops(db, [item(), item(), item('Café')], 'F1', 'u1')
+    ids = [op.ref.id for op in ops]
+    assert len(set(ids)) == 3
+    assert ids[0] == imports.fingerprint('F1', 'transactions', item(), 0)
+    assert ids[1] == imports.fingerprint('F1', 'transactions', item(), 1)
+    # Mesmo arquivo, mesmos ids
+    assert ids == [op.ref.id for op in imports.build_import_ops(db, [item(), item(), item('Café')], 'F1', 'u1')]
+
+
+def test_items_are_routed_by_type(db):
+    items = [
+        item('Carro', 2000.0, type_='debt', installments_count=10, installment_value=200.0),
+        item('Luz', 150.0, type_='recurring'),
+        item('Salário', 3000.0, type_='income'),
+    ]
+    debt, recurring, income = imports.build_import_ops(db, items, 'F1', 'u1', 'Ana')
+    assert debt.ref.parent.id == 'debts'
+    assert (debt.data['remaining_installments'], debt.data['installment_value']) == (10, 200.0)
+    assert recurring.ref.parent.id == 'recurring_expenses'
+    assert recurring.data['due_day'] == 5
+    assert income.ref.parent.id == 'transactions'
+    assert (income.data['type'], income.data['user_name']) == ('Receita', 'Ana')
+
+
+def test_reimport_skips_existing_documents(db):
+    items = [item(), item(), item('Café', 4.0)]
+    counts = imports.write_import(db, imports.build_import_ops(db, items, 'F1', 'u1'), 'F1')
+    assert counts['transactions'] == 3
+    assert counts['skipped'] == 0
+
+    counts = imports.write_import(db, imports.build_import_ops(db, items + [item('Pão', 8.0)], 'F1', 'u1'), 'F1')
+    assert counts['transactions'] == 1
+    assert counts['skipped'] == 3
+    docs = [d.to_dict() for d in db.collection('transactions').stream()]
+    assert sorted(d['value'] for d in docs) == [4.0, 8.0, 12.5, 12.5]
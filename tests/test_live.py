@@ -0,0 +1,123 @@
+"""
+Visão em tempo real (FamilyStore) com listeners falsos: carga inicial,
+alterações e o bypass da visão após uma escrita local até o listener vê-la.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services import live
+from services.cache import FamilyCache, family_cache
+
+
+class FakeQuery:
+    def __init__(self, db, collection):
+        self.db = db
+        self.collection = collection
+
+    def where(self, *args):
+        return self
+
+    def on_snapshot(self, callback):
+        self.db.callbacks[self.collection] = callback
+        return SimpleNamespace(unsubscribe=lambda: None)
+
+
+class FakeDB:
+    """Cliente com on_snapshot: guarda os callbacks para o teste disparar as alterações."""
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def push(self, collection, changes, read_time=None):
+        self.callbacks[collection](None, changes, read_time or datetime.now(timezone.utc))
+
+
+def change(kind, doc_id, **data):
+    document = SimpleNamespace(id=doc_id, to_dict=lambda: {'family_id': 'F1', **data})
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=document)
+
+
+@pytest.fixture
+def db():
+    return FakeDB()
+
+
+@pytest.fixture
+def store(db):
+    store = live.FamilyStore(db, 'F1')
+    yield store
+    store.close()
+
+
+def test_docs_after_first_snapshot(db, store):
+    assert store.docs('debts') is None
+    db.push('debts', [change('ADDED', 'd1', description='Cartão')])
+    assert store.docs('debts') == [{'family_id': 'F1', 'description': 'Cartão', 'id': 'd1'}]
+    db.push('debts', [change('MODIFIED', 'd1', description='Cartão Nubank'), change('ADDED', 'd2', description='Carro')])
+    assert sorted(d['description'] for d in store.docs('debts')) == ['Carro', 'Cartão Nubank']
+    db.push('debts', [change('REMOVED', 'd1')])
+    assert [d['id'] for d in store.docs('debts')] == ['d2']
+
+
+def test_versions_count_changes_per_collection(db, store):
+    db.push('debts', [change('ADDED', 'd1', description='Cartão')])
+    db.push('transactions', [])
+    db.push('transactions', [change('ADDED', 't1', value=10.0)])
+    assert store.version == 3
+    assert store.versions['transactions'] == 2
+    assert store.versions['debts'] == 1
+
+
+def test_local_write_bypasses_view_until_listener_sees_it(db, store):
+    db.push('debts', [change('ADDED', 'd1', description='Cartão')])
+    store.mark_stale(['debts'])
+    assert store.docs('debts') is None
+
+    # Snapshot lido antes da escrita não libera a visão
+    db.push('credit_cards', [])
+    db.push('debts', [], read_time=datetime.now(timezone.utc) - timedelta(seconds=5))
+    assert store.docs('debts') is None
+
+    db.push('debts', [change('REMOVED', 'd1')])
+    assert store.docs('debts') == []
+
+
+def test_stale_view_expires(db, store, monkeypatch):
+    db.push('debts', [])
+    store.mark_stale(['debts'])
+    monkeypatch.setattr(live, 'STALE_TIMEOUT', 0)
+    assert store.docs('debts') == []
+
+
+def test_rollup_follows_listener(db, store):
+    db.push('transactions', [change('ADDED', 't1', date=datetime(2026, 3, 5), value=40.0, type='Despesa', category='Lazer', user_name='ana')])
+    cube = store.rollup()
+    assert cube.totals() == {'Lazer': 40.0}
+    db.push('transactions', [change('MODIFIED', 't1', date=datetime(2026, 3, 5), value=25.0, type='Despesa', category='Casa', user_name='ana')])
+    assert store.rollup().totals() == {'Casa': 25.0}
+
+
+def test_cache_invalidation_marks_live_view_stale(db):
+    lease = live.live_store.acquire(db, 'F9')
+    try:
+        db.push('debts', [])
+        assert live.live_store.docs('debts', 'F9') == []
+        family_cache.invalidate('F9', 'debts')
+        assert live.live_store.docs('debts', 'F9') is None
+        assert live.live_store.docs('recurring_expenses', 'F9') is None  # Ainda não carregou
+    finally:
+        lease.release()
+
+
+def test_invalidation_listeners():
+    cache = FamilyCache()
+    seen = []
+    cache.on_invalidate(lambda family_id, *collections: seen.append((family_id, collections)))
+    cache.invalidate('F1', 'debts', 'transactions')
+    cache.invalidate('F2')
+    assert seen == [('F1', ('debts', 'transactions')), ('F2', ())]
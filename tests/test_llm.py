@@ -0,0 +1,138 @@
+"""Gateway da IA com uma chamada falsa: coalescência, disjuntor, fila do limite de taxa e métricas."""
+import threading
+import time
+
+import pytest
+
+from services import metrics
+from services.llm import CircuitBreaker, Gateway, LLMUnavailable, request_key
+
+
+class APIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeModel:
+    """`call` do gateway: responde com o prompt ou levanta os erros de `errors`, em ordem."""
+
+    def __init__(self, errors=(), wait=None):
+        self.errors = list(errors)
+        self.wait = wait
+        self.calls = []
+        self.started = threading.Event()
+
+    def __call__(self, contents, name, timeout):
+        self.calls.append(contents)
+        self.started.set()
+        if self.wait:
+            self.wait.wait(5)
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"resposta: {contents}"
+
+
+def gateway(model, **kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(threshold=2, cooldown=60))
+    return Gateway(call=model, rate=1000, burst=1000, **kwargs)
+
+
+def test_identical_requests_in_flight_share_one_call():
+    release = threading.Event()
+    model = FakeModel(wait=release)
+    gw = gateway(model)
+    results = []
+    leader = threading.Thread(target=lambda: results.append(gw.generate('oi', site='test_coalesce')))
+    leader.start()
+    model.started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(gw.generate('oi', site='test_coalesce'))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    time.sleep(0.2)  # Os seguidores chegam enquanto o primeiro ainda espera a API
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+    assert results == ['resposta: oi'] * 4
+    assert model.calls == ['oi']
+    # Terminada a chamada, o mesmo pedido vai de novo à API
+    gw.generate('oi', site='test_coalesce')
+    assert len(model.calls) == 2
+    assert metrics.summary('llm.test_coalesce')['llm.test_coalesce']['count'] == 5
+
+
+def test_request_key_covers_binary_parts():
+    image = {'mime_type': 'image/png', 'data': b'\x89PNG1'}
+    assert request_key('m', ['leia', image]) == request_key('m', ['leia', dict(image)])
+    assert request_key('m', ['leia', image]) != request_key('m', ['leia', {**image, 'data': b'\x89PNG2'}])
+    assert request_key('m', 'leia') != request_key('outro', 'leia')
+
+
+def test_breaker_opens_after_outages_and_rejects_without_calling():
+    model = FakeModel(errors=[APIError(503), APIError(429)])
+    gw = gateway(model)
+    for _ in range(2):
+        with pytest.raises(APIError):
+            gw.generate('a', site='test_breaker')
+    assert not gw.available()
+    with pytest.raises(LLMUnavailable):
+        gw.generate('a', site='test_breaker')
+    assert len(model.calls) == 2
+    sites = metrics.summary('llm.test_breaker')
+    assert sites['llm.test_breaker.failed']['count'] == 2
+    assert sites['llm.test_breaker.rejected']['count'] == 1
+    assert gw.stats()['breaker'] == 'open'
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    model = FakeModel(errors=[APIError(500), APIError(500)])
+    gw = gateway(model, breaker=breaker)
+    with pytest.raises(APIError):
+        gw.generate('a')
+    assert breaker.state == 'half-open'
+    # Chamada de teste falha: abre de novo
+    with pytest.raises(APIError):
+        gw.generate('a')
+    assert breaker.state == 'half-open'
+    assert gw.generate('a') == 'resposta: a'
+    assert breaker.state == 'closed'
+
+
+def test_only_one_probe_while_half_open():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    model = FakeModel(errors=[APIError(400), ValueError('bloqueado'), APIError(400)])
+    gw = gateway(model)
+    for error in (APIError, ValueError, APIError):
+        with pytest.raises(error):
+            gw.generate('a')
+    assert gw.available()
+    assert gw.generate('a') == 'resposta: a'
+
+
+def test_full_queue_is_rejected():
+    model = FakeModel()
+    gw = Gateway(call=model, rate=0.001, burst=1, queue_timeout=0.05)
+    gw.generate('a', site='test_queue')
+    with pytest.raises(LLMUnavailable):
+        gw.generate('b', site='test_queue')
+    assert model.calls == ['a']
+    assert gw.available()
+
+
+def test_configure_keeps_bucket_unless_limits_change():
+    gw = gateway(FakeModel())
+    bucket = gw.bucket
+    gw.configure(timeout=5)
+    assert gw.bucket is bucket
+    assert gw.timeout == 5.0
+    gw.configure(rate=3)
+    assert (gw.bucket.rate, gw.bucket.capacity) == (3.0, 1000.0)
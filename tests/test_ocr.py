@@ -0,0 +1,72 @@
+"""Leitura de comprovantes em lote com uma IA falsa: cache por conteúdo, falhas e arquivos repetidos."""
+import json
+
+import pytest
+
+from services import ocr
+from services.local_store import LocalClient
+
+
+@pytest.fixture
+def db():
+    ocr.receipt_cache._entries.clear()
+    client = LocalClient()
+    yield client
+    client.close()
+
+
+class FakeExtract:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, parts):
+        data = parts[1]['data']
+        self.calls.append(data)
+        if b'ilegivel' in data:
+            raise ValueError('resposta bloqueada')
+        return '```json\n' + json.dumps({'value': 10.0, 'description': data.decode()[5:]}) + '\n```'
+
+
+def pdf(text):
+    return b'%PDF-' + text.encode()
+
+
+def by_index(results):
+    return sorted(results, key=lambda r: r.index)
+
+
+def test_batch_reads_each_file_and_caches(db):
+    extract = FakeExtract()
+    files = [('a.pdf', pdf('padaria')), ('b.pdf', pdf('mercado'))]
+    first = by_index(ocr.analyze_batch(db, 'F1', files, extract=extract))
+    assert [r.data['description'] for r in first] == ['padaria', 'mercado']
+    assert not any(r.from_cache for r in first)
+
+    again = by_index(ocr.analyze_batch(db, 'F1', files, extract=extract))
+    assert all(r.from_cache for r in again)
+    assert len(extract.calls) == 2
+
+
+def test_failure_does_not_stop_the_batch(db):
+    results = by_index(ocr.analyze_batch(db, 'F1', [('a.pdf', pdf('ilegivel')), ('b.pdf', pdf('padaria'))], extract=FakeExtract()))
+    assert isinstance(results[0].error, ValueError)
+    assert results[1].data['description'] == 'padaria'
+
+
+def test_repeated_file_is_read_once(db):
+    extract = FakeExtract()
+    files = [('a.pdf', pdf('padaria')), ('b.pdf', pdf('mercado')), ('a (1).pdf', pdf('padaria'))]
+    results = by_index(ocr.analyze_batch(db, 'F1', files, extract=extract))
+    assert len(extract.calls) == 2
+    copy = results[2]
+    assert (copy.duplicate_of, copy.data, copy.digest) == ('a.pdf', None, results[0].digest)
+    assert results[0].duplicate_of is None
+
+
+def test_cache_is_scoped_by_family(db):
+    extract = FakeExtract()
+    files = [('a.pdf', pdf('padaria'))]
+    list(ocr.analyze_batch(db, 'F1', files, extract=extract))
+    list(ocr.analyze_batch(db, 'F2', files, extract=extract))
+    assert len(extract.calls) == 2
+    assert ocr.receipt_id('F1', 'x') != ocr.receipt_id('F2', 'x')
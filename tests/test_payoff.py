@@ -0,0 +1,82 @@
+"""Simulador de quitação de dívidas: prazos, juros, estratégias e cenários vetorizados."""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from services import payoff
+
+
+def debt(total, installment, rate=0.0, remaining=0):
+    return {'total_value': total, 'installment_value': installment, 'interest_rate': rate, 'remaining_installments': remaining}
+
+
+DEBTS = [
+    debt(5000.0, 200.0, rate=2.0),   # Maior juros
+    debt(800.0, 100.0, rate=0.5),    # Menor saldo
+    debt(3000.0, 150.0, rate=1.0),
+]
+
+
+def test_single_debt_without_interest():
+    result = payoff.simulate([debt(1000.0, 100.0)], extras=[0.0, 100.0])
+    assert result['months'].tolist() == [10, 5]
+    assert result['total_interest'].tolist() == [0.0, 0.0]
+    assert result['balance'][0, :3].tolist() == [1000.0, 900.0, 800.0]
+
+
+def test_interest_accrues_on_the_balance():
+    result = payoff.simulate([debt(1000.0, 1010.0, rate=1.0)])
+    assert result['months'].tolist() == [1]
+    assert result['total_interest'][0] == pytest.approx(10.0)
+
+
+def test_payment_below_interest_never_pays_off():
+    result = payoff.simulate([debt(1000.0, 5.0, rate=1.0)], max_months=24)
+    assert result['months'].tolist() == [-1]
+    assert result['payoff_month'].tolist() == [[-1]]
+
+
+def test_installment_from_remaining_installments():
+    _, payment, _ = payoff.debt_arrays([debt(1200.0, 0, remaining=12)])
+    assert payment.tolist() == [100.0]
+
+
+def test_priority_orders():
+    balance, _, rate = payoff.debt_arrays(DEBTS)
+    assert payoff.priority_order(balance, rate, 'avalanche').tolist() == [0, 2, 1]
+    assert payoff.priority_order(balance, rate, 'snowball').tolist() == [1, 2, 0]
+    assert payoff.priority_order(balance, rate, 'custom', order=[2]).tolist() == [2, 1, 0]
+    with pytest.raises(ValueError):
+        payoff.priority_order(balance, rate, 'custom')
+    with pytest.raises(ValueError):
+        payoff.priority_order(balance, rate, 'aleatória')
+
+
+def test_avalanche_pays_less_interest_and_snowball_clears_small_debt_first():
+    results = payoff.compare_strategies(DEBTS, extra=300.0)
+    avalanche, snowball = results['avalanche'], results['snowball']
+    assert avalanche['total_interest'][0] < snowball['total_interest'][0]
+    assert snowball['payoff_month'][0, 1] < avalanche['payoff_month'][0, 1]
+    assert 'custom' not in results
+
+
+def test_scenarios_match_individual_runs():
+    extras = np.linspace(0, 1000, 11)
+    together = payoff.simulate(DEBTS, extras, 'snowball')
+    for i, extra in enumerate(extras):
+        alone = payoff.simulate(DEBTS, extra, 'snowball')
+        assert together['months'][i] == alone['months'][0]
+        assert together['total_interest'][i] == pytest.approx(alone['total_interest'][0])
+    # Mais dinheiro extra nunca atrasa a quitação
+    assert (np.diff(together['months']) <= 0).all()
+
+
+def test_no_debts():
+    result = payoff.simulate([], extras=[0.0, 50.0])
+    assert result['months'].tolist() == [0, 0]
+
+
+def test_payoff_date():
+    assert payoff.payoff_date(14, datetime(2026, 11, 20)) == datetime(2028, 1, 1)
+    assert payoff.payoff_date(-1) is None
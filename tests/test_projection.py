@@ -0,0 +1,65 @@
+"""Projeção de fluxo de caixa: datas, vencimentos, parcelas restantes e memoização."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from services import projection
+
+
+def day_index(result, d):
+    return int(np.flatnonzero(result['dates'] == np.datetime64(d))[0])
+
+
+def test_dates_cover_whole_months_from_start():
+    result = projection.project_cashflow(date(2026, 1, 15), 2, 0, [], [], 0)
+    assert result['dates'][0] == np.datetime64('2026-01-15')
+    assert result['dates'][-1] == np.datetime64('2026-02-28')
+    assert len(result['balance']) == 17 + 28
+
+
+def test_income_bills_and_variable_spend():
+    result = projection.project_cashflow(
+        date(2026, 1, 1), 1, 3000.0, [{'amount': 200.0, 'due_day': 20}], [], 310.0, start_balance=100.0,
+    )
+    assert result['inflow'][day_index(result, date(2026, 1, 5))] == 3000.0
+    assert result['inflow'].sum() == 3000.0
+    assert result['outflow'][day_index(result, date(2026, 1, 20))] == pytest.approx(210.0)
+    assert result['outflow'][0] == pytest.approx(10.0)
+    assert result['balance'][-1] == pytest.approx(100.0 + 3000.0 - 200.0 - 310.0)
+
+
+def test_due_day_31_falls_on_last_day_of_short_months():
+    result = projection.project_cashflow(date(2026, 2, 1), 1, 0, [{'amount': 50.0, 'due_day': 31}], [], 0)
+    assert result['outflow'][day_index(result, date(2026, 2, 28))] == 50.0
+
+
+def test_debts_stop_after_remaining_installments():
+    result = projection.project_cashflow(
+        date(2026, 1, 1), 6, 0, [], [{'installment_value': 100.0, 'remaining_installments': 2}], 0,
+    )
+    paid = result['dates'][result['outflow'] > 0]
+    assert paid.tolist() == [date(2026, 1, 10), date(2026, 2, 10)]
+    assert result['balance'][-1] == -200.0
+
+
+def test_first_negative_day():
+    result = projection.project_cashflow(date(2026, 1, 1), 3, 1000.0, [{'amount': 1500.0, 'due_day': 8}], [], 0, start_balance=600.0)
+    assert projection.first_negative_day(result) == date(2026, 2, 8)
+    assert projection.first_negative_day(projection.project_cashflow(date(2026, 1, 1), 3, 1000.0, [], [], 0)) is None
+
+
+def test_same_inputs_are_memoized_and_read_only():
+    recurring = [{'amount': 100.0, 'due_day': 3}, {'amount': 40.0, 'due_day': 15}]
+    a = projection.project_cashflow(date(2026, 1, 1), 12, 3000.0, recurring, [], 500.0)
+    # Mesmo conteúdo em outra ordem e com tipos diferentes: mesma entrada no cache
+    b = projection.project_cashflow(date(2026, 1, 1), '12', 3000, list(reversed(recurring)), [], 500)
+    assert a is b
+    with pytest.raises(ValueError):
+        a['balance'][0] = 0
+
+
+def test_average_variable_spend():
+    summaries = [{'totals': {'Despesa': 100.0}}, {'totals': {'Despesa': 300.0, 'Receita': 50.0}}, {'totals': {}}]
+    assert projection.average_variable_spend(summaries) == pytest.approx(400.0 / 3)
+    assert projection.average_variable_spend([], fallback=75.0) == 75.0
@@ -0,0 +1,116 @@
+"""Repository sobre o LocalClient: leituras pelo cache da família e escritas que o invalidam."""
+from datetime import datetime
+
+import pytest
+
+from services.cache import family_cache
+from services.local_store import LocalClient
+from services.repository import Repository, create_client
+
+
+@pytest.fixture
+def repo():
+    family_cache.clear()
+    client = LocalClient()
+    yield Repository(client)
+    client.close()
+
+
+def transaction(value, type_='Despesa', category='Mercado'):
+    return {
+        'family_id': 'F1',
+        'date': datetime.now(),
+        'value': value,
+        'type': type_,
+        'category': category,
+        'description': 'compra',
+        'user_name': 'ana',
+    }
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        create_client('postgres')
+
+
+def test_users(repo):
+    repo.create_user('u1', {'family_id': 'F1', 'name': 'Ana'})
+    assert [u['name'] for u in repo.family_users('F1')] == ['Ana']
+    repo.update_user('u1', 'F1', {'name': 'Ana Maria'})
+    assert repo.get_user('u1')['name'] == 'Ana Maria'
+    assert [u['name'] for u in repo.family_users('F1')] == ['Ana Maria']
+
+
+def test_add_and_delete_invalidate_family_list(repo):
+    assert repo.list_family('debts', 'F1') == []
+    debt_id = repo.add('debts', {'family_id': 'F1', 'description': 'Cartão'})
+    assert [d['id'] for d in repo.list_family('debts', 'F1')] == [debt_id]
+    repo.delete('debts', 'F1', debt_id)
+    assert repo.list_family('debts', 'F1') == []
+
+
+def test_family_lists_are_isolated(repo):
+    repo.add('debts', {'family_id': 'F1', 'description': 'a'})
+    repo.add('debts', {'family_id': 'F2', 'description': 'b'})
+    assert [d['description'] for d in repo.list_family('debts', 'F2')] == ['b']
+
+
+def test_add_transaction_updates_month_summary(repo):
+    repo.add_transaction(transaction(30.0))
+    repo.add_transaction(transaction(20.0))
+    repo.add_transaction(transaction(100.0, type_='Receita', category='Salário'))
+    summary = repo.month_summary('F1')
+    assert summary['totals'] == {'Despesa': 50.0, 'Receita': 100.0}
+    assert summary['count'] == 3
+    rows, _ = repo.transactions_page('F1')
+    assert sorted(r['value'] for r in rows) == [20.0, 30.0, 100.0]
+
+
+def test_add_transactions_skips_existing_ids(repo):
+    rows = [transaction(10.0), transaction(15.0)]
+    repo.add_transactions('F1', rows, ['r1', 'r2'])
+    counts = repo.add_transactions('F1', rows, ['r1', 'r2'])
+    assert counts['skipped'] == 2
+    assert repo.month_summary('F1')['totals'] == {'Despesa': 25.0}
+
+
+def test_complete_setup(repo):
+    repo.create_user('u1', {'family_id': 'F1'})
+    repo.complete_setup(
+        'u1', 'F1', {'income': 5000.0, 'initial_balance': 800.0},
+        [{'description': 'Luz', 'amount': 120.0, 'due_day': 10}],
+        [{'description': 'Carro', 'total_value': 20000.0}],
+        transaction(800.0, type_='Receita', category='Saldo Inicial'),
+    )
+    user = repo.get_user('u1')
+    assert user['setup_completed'] is True
+    assert user['income'] == 5000.0
+    assert [r['user_id'] for r in repo.list_family('recurring_expenses', 'F1')] == ['u1']
+    assert [d['description'] for d in repo.list_family('debts', 'F1')] == ['Carro']
+    assert repo.month_summary('F1')['totals'] == {'Receita': 800.0}
+
+
+def test_import_items_is_idempotent(repo):
+    items = [
+        {'description': 'Padaria', 'value': 12.5, 'date': datetime(2026, 3, 5).date(), 'type': 'expense'},
+        {'description': 'Carro', 'value': 2000.0, 'date': None, 'type': 'debt', 'installments_count': 10},
+    ]
+    assert repo.list_family('debts', 'F1') == []
+    counts = repo.import_items('F1', items, 'u1', 'ana')
+    assert (counts['transactions'], counts['debts'], counts['skipped']) == (1, 1, 0)
+    assert [d['description'] for d in repo.list_family('debts', 'F1')] == ['Carro']
+    assert repo.import_items('F1', items, 'u1', 'ana')['skipped'] == 2
+
+
+def test_bulk_deletes_rebuild_summaries(repo):
+    for day, value in ((1, 10.0), (10, 20.0), (20, 40.0)):
+        repo.add_transaction(transaction(value) | {'date': datetime(2026, 3, day), 'user_id': 'u1'})
+    repo.add('debts', {'family_id': 'F1', 'description': 'Cartão', 'user_id': 'u1'})
+
+    assert repo.delete_transactions_between('F1', datetime(2026, 3, 5), datetime(2026, 3, 15)) == 1
+    assert repo.month_summary('F1', datetime(2026, 3, 1))['totals'] == {'Despesa': 50.0}
+
+    repo.delete_user_data('u1', 'F1', ['transactions', 'debts'])
+    assert repo.list_family('debts', 'F1') == []
+    assert repo.transactions_page('F1')[0] == []
+    assert repo.month_summary('F1', datetime(2026, 3, 1))['totals'] == {}
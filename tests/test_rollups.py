@@ -0,0 +1,88 @@
+"""RollupCube: totais por eixo, séries mensais, contagens e aplicação de diferenças."""
+from datetime import datetime
+
+import pyarrow as pa
+import pytest
+
+from services.rollups import RollupCube, months_window
+
+
+def row(date, value, category='Mercado', type_='Despesa', member='ana'):
+    return {'date': date, 'value': value, 'category': category, 'type': type_, 'user_name': member}
+
+
+ROWS = [
+    row(datetime(2026, 1, 10), 100.0),
+    row(datetime(2026, 1, 20), 50.0, category='Lazer', member='bia'),
+    row(datetime(2026, 3, 5), 30.0),
+    row(datetime(2026, 3, 6), 2000.0, category='Salário', type_='Receita'),
+]
+
+
+@pytest.fixture
+def cube():
+    return RollupCube.from_rows(ROWS)
+
+
+def test_totals_by_axis(cube):
+    assert cube.totals() == {'Mercado': 130.0, 'Lazer': 50.0}
+    assert cube.totals(by='member') == {'ana': 130.0, 'bia': 50.0}
+    assert cube.totals(by='type', types=None) == {'Despesa': 180.0, 'Receita': 2000.0}
+    assert cube.totals(members=['bia']) == {'Lazer': 50.0}
+    assert cube.totals(members=['ninguém']) == {}
+
+
+def test_month_range_is_end_exclusive(cube):
+    assert cube.totals(datetime(2026, 1, 1), datetime(2026, 3, 1)) == {'Mercado': 100.0, 'Lazer': 50.0}
+    # Um fim no meio do mês inclui o mês inteiro
+    assert cube.totals(datetime(2026, 3, 1), datetime(2026, 3, 2)) == {'Mercado': 30.0}
+
+
+def test_monthly_includes_empty_months(cube):
+    months, values = cube.monthly()
+    assert months == [datetime(2026, 1, 1), datetime(2026, 2, 1), datetime(2026, 3, 1)]
+    assert values == [150.0, 0.0, 30.0]
+
+
+def test_count(cube):
+    assert cube.count() == 4
+    assert cube.count(types=('Despesa',)) == 3
+    assert cube.count(start=datetime(2026, 2, 1)) == 2
+
+
+def test_subtracting_rows_removes_them(cube):
+    cube.apply_rows([ROWS[1]], sign=-1)
+    assert cube.totals() == {'Mercado': 130.0}
+    assert cube.count() == 3
+
+
+def test_axes_grow_in_both_directions(cube):
+    cube.apply_rows([row(datetime(2025, 11, 1), 10.0, category='Casa'), row(datetime(2026, 6, 1), 5.0)])
+    assert cube.months[0] == datetime(2025, 11, 1)
+    assert cube.months[-1] == datetime(2026, 6, 1)
+    assert cube.totals() == {'Mercado': 135.0, 'Lazer': 50.0, 'Casa': 10.0}
+
+
+def test_rows_without_date_or_type_are_ignored():
+    cube = RollupCube.from_rows([row(None, 10.0), row(datetime(2026, 1, 1), 10.0, type_=None)])
+    assert cube.count() == 0
+    assert cube.totals() == {}
+
+
+def test_table_matches_rows():
+    table = pa.table({
+        'date': [r['date'] for r in ROWS] + [None],
+        'value': [r['value'] for r in ROWS] + [1.0],
+        'category': [r['category'] for r in ROWS[:-1]] + [None, 'Mercado'],
+        'type': [r['type'] for r in ROWS] + ['Despesa'],
+        'user_name': [r['user_name'] for r in ROWS] + [None],
+    })
+    from_table = RollupCube.from_table(table)
+    expected = RollupCube.from_rows(ROWS[:-1] + [row(ROWS[-1]['date'], 2000.0, category='Outros', type_='Receita')])
+    assert from_table.totals(types=None) == expected.totals(types=None)
+    assert from_table.count() == 4
+
+
+def test_months_window():
+    assert months_window(3, datetime(2026, 2, 15)) == (datetime(2025, 12, 1), datetime(2026, 3, 1))
+    assert months_window(1, datetime(2026, 12, 31)) == (datetime(2026, 12, 1), datetime(2027, 1, 1))
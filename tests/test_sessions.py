@@ -0,0 +1,55 @@
+"""
+Sessões persistentes com o servidor de token local: rotação do id e o que
+apaga ou preserva a sessão salva quando a troca do refresh token falha.
+"""
+import pytest
+
+from services import sessions
+from services.auth_client import AuthError
+from services.cache import family_cache
+from services.local_store import LocalClient
+from services.repository import Repository
+
+
+def firebase_error(message):
+    return {'error': {'message': message}}
+
+
+@pytest.fixture
+def repo():
+    family_cache.clear()
+    repo = Repository(LocalClient())
+    repo.create_user('u1', {'family_id': 'F1', 'email': 'a@b.com'})
+    return repo
+
+
+def session_exists(repo, session_id):
+    return repo.client.collection(sessions.COLLECTION).document(sessions._doc_id(session_id)).get().exists
+
+
+def test_restore_rotates_session_id(stand_in, repo):
+    session_id = sessions.create_session(repo.client, 'u1', 'F1', 'rt')
+    stand_in.reply(200, {'user_id': 'u1', 'id_token': 'novo', 'refresh_token': 'rt2'})
+    restored = sessions.restore_session(repo, stand_in.client(), session_id)
+    assert restored['id_token'] == 'novo'
+    assert restored['profile']['family_id'] == 'F1'
+    assert restored['session_id'] != session_id
+    assert session_exists(repo, restored['session_id'])
+
+
+@pytest.mark.parametrize('status', [500, 503, 429])
+def test_restore_keeps_session_on_outage(stand_in, repo, status):
+    session_id = sessions.create_session(repo.client, 'u1', 'F1', 'rt')
+    for _ in range(3):
+        stand_in.reply(status, firebase_error('QUOTA_EXCEEDED' if status == 429 else 'UNAVAILABLE'))
+    with pytest.raises(AuthError):
+        sessions.restore_session(repo, stand_in.client(), session_id)
+    assert session_exists(repo, session_id)
+
+
+@pytest.mark.parametrize('message', ['TOKEN_EXPIRED', 'INVALID_REFRESH_TOKEN', 'USER_DISABLED'])
+def test_restore_deletes_session_on_revoked_token(stand_in, repo, message):
+    session_id = sessions.create_session(repo.client, 'u1', 'F1', 'rt')
+    stand_in.reply(400, firebase_error(message))
+    assert sessions.restore_session(repo, stand_in.client(), session_id) is None
+    assert not session_exists(repo, session_id)
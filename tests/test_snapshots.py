@@ -0,0 +1,167 @@
+"""
+Sincronização incremental dos snapshots Arrow sobre o LocalClient:
+alterações, marcas de exclusão, marcas d'água e o cubo que os acompanha.
+"""
+from datetime import datetime
+
+import pyarrow.compute as pc
+import pytest
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from services import snapshots
+from services.bulk_writer import BulkWriter, WriteOp
+from services.cache import family_cache
+from services.local_store import LocalClient
+from services.rollups import RollupCube
+
+FAMILY = 'F1'
+
+
+@pytest.fixture
+def db():
+    family_cache.clear()
+    snapshots._rollups.clear()
+    client = LocalClient()
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    """Conta as regravações do arquivo Arrow."""
+    calls = []
+    save = snapshots._save
+
+    def counting_save(*args):
+        calls.append(args[0])
+        return save(*args)
+
+    monkeypatch.setattr(snapshots, '_save', counting_save)
+    return calls
+
+
+def transaction(i, value=10.0, category='Mercado'):
+    return {
+        'family_id': FAMILY,
+        'date': datetime(2026, 1 + i % 12, 1 + i % 28),
+        'value': value,
+        'type': 'Despesa',
+        'category': category,
+        'description': f"t{i}",
+        'user_name': 'ana',
+        'updated_at': SERVER_TIMESTAMP,
+    }
+
+
+def write(db, ids, **kwargs):
+    BulkWriter(db).write([WriteOp(db.collection('transactions').document(f"t{i}"), transaction(i, **kwargs)) for i in ids])
+
+
+def delete(db, ids):
+    writer = BulkWriter(db, before_commit=snapshots.tombstone_hook(db, FAMILY))
+    writer.write([WriteOp(db.collection('transactions').document(f"t{i}"), None) for i in ids])
+
+
+def values_by_id(table):
+    return dict(zip(table['id'].to_pylist(), table['value'].to_pylist()))
+
+
+def test_full_then_incremental_sync(db, tmp_path, saves):
+    write(db, range(20))
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert table.num_rows == 20
+    assert len(saves) == 1
+
+    write(db, [3], value=99.0)
+    write(db, [20])
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert table.num_rows == 21
+    assert values_by_id(table)['t3'] == 99.0
+    assert len(saves) == 2
+
+
+def test_sync_without_changes_does_not_rewrite(db, tmp_path, saves):
+    write(db, range(20))
+    snapshots.sync(db, FAMILY, tmp_path)
+    write(db, [5], value=50.0)
+    snapshots.sync(db, FAMILY, tmp_path)
+    assert len(saves) == 2
+
+    # A margem de segurança devolve a escrita recente, mas ela já está na tabela
+    for _ in range(3):
+        table = snapshots.sync(db, FAMILY, tmp_path)
+    assert len(saves) == 2
+    assert values_by_id(table)['t5'] == 50.0
+
+
+def test_tombstones_delete_rows_once(db, tmp_path, saves):
+    write(db, range(50))
+    snapshots.sync(db, FAMILY, tmp_path)
+    delete(db, range(30))
+
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert table.num_rows == 20
+    assert len(saves) == 2
+
+    # As marcas já aplicadas não regravam o snapshot
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert table.num_rows == 20
+    assert len(saves) == 2
+    _, meta = snapshots._load(FAMILY, tmp_path)
+    assert meta['tombstone_watermark'] is not None
+
+
+def test_recreated_id_survives_old_tombstone(db, tmp_path):
+    write(db, range(5))
+    snapshots.sync(db, FAMILY, tmp_path)
+    delete(db, [0])
+    snapshots.sync(db, FAMILY, tmp_path)
+
+    write(db, [0], value=7.0)
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert values_by_id(table)['t0'] == 7.0
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert values_by_id(table)['t0'] == 7.0
+
+
+def test_snapshot_survives_restart(db, tmp_path, saves):
+    write(db, range(10))
+    snapshots.sync(db, FAMILY, tmp_path)
+    table, meta = snapshots._load(FAMILY, tmp_path)
+    assert table.num_rows == 10
+    assert meta['rows'] == 10
+    # Outro processo: carrega do disco e só confere as novidades
+    snapshots.sync(db, FAMILY, tmp_path)
+    assert len(saves) == 1
+
+
+def test_stale_format_triggers_full_sync(db, tmp_path, saves):
+    write(db, range(3))
+    snapshots.sync(db, FAMILY, tmp_path)
+    _, meta_path = snapshots._paths(FAMILY, tmp_path)
+    with open(meta_path) as f:
+        text = f.read()
+    with open(meta_path, 'w') as f:
+        f.write(text.replace(f'"version": {snapshots.FORMAT_VERSION}', '"version": 0'))
+
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    assert table.num_rows == 3
+    assert len(saves) == 2
+    assert pc.all(pc.is_valid(table['updated_at'])).as_py()
+
+
+def test_rollup_follows_deltas(db, tmp_path):
+    write(db, range(40))
+    cube = snapshots.rollup(db, FAMILY, tmp_path)
+    assert cube.count() == 40
+
+    write(db, [1], value=500.0, category='Lazer')
+    delete(db, range(10, 20))
+    family_cache.invalidate(FAMILY, 'transactions')
+    cube = snapshots.rollup(db, FAMILY, tmp_path)
+
+    table = snapshots.sync(db, FAMILY, tmp_path)
+    expected = RollupCube.from_table(table)
+    assert cube.count() == expected.count() == 30
+    assert cube.totals() == pytest.approx(expected.totals())
+    assert cube.totals()['Lazer'] == 500.0
@@ -0,0 +1,3 @@
+def format_currency(value):
+    """Formata valor float para moeda BRL (R$ 1.000,00)"""
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -1,151 +1,659 @@
 
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import codecs
+import csv
+import io
 import re
-import pandas as pd
+import unicodedata
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+
+# Namespaced Excel 2003 XML tags/attributes, compared directly against iterparse events
+SS_NS = '{urn:schemas-microsoft-com:office:spreadsheet}'
+WORKSHEET_TAG = SS_NS + 'Worksheet'
+TABLE_TAG = SS_NS + 'Table'
+ROW_TAG = SS_NS + 'Row'
+CELL_TAG = SS_NS + 'Cell'
+DATA_TAG = SS_NS + 'Data'
+INDEX_ATTR = SS_NS + 'Index'
+MERGE_ACROSS_ATTR = SS_NS + 'MergeAcross'
+
+HEADER_LABELS = ['DÍVIDAS', 'DESCRIÇÃO']
+
 
 def parse_excel_xml(file_content):
     """
     Parses an Excel 2003 XML file to extract debts and expenses.
     
+    Thin wrapper over `iter_excel_xml` that materializes the items.
+    
     Args:
-        file_content: The content of the XML file (bytes or string).
+        file_content: The content of the XML file (bytes, string or a binary file-like object).
         
     Returns:
-        dict: A dictionary containing 'debts' and 'recurring_expenses' lists.
+        dict: {"items": [...]} on success or {"error": "..."} on failure.
     """
     try:
-        # Define namespaces
-        namespaces = {
-            'ss': 'urn:schemas-microsoft-com:office:spreadsheet',
-            'o': 'urn:schemas-microsoft-com:office:office',
-            'x': 'urn:schemas-microsoft-com:office:excel',
-            'html': 'http://www.w3.org/TR/REC-html40'
-        }
+        return {"items": list(iter_excel_xml(file_content))}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _open_source(file_content):
+    if isinstance(file_content, str):
+        file_content = file_content.encode('utf-8')
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    return file_content
+
+
+def iter_rows(file_content, all_sheets=False):
+    """
+    Streams the rows of the first worksheet (or of every worksheet, in
+    order, with `all_sheets`) as lists of cell texts.
+    
+    Uses iterparse and drops each row once read, so memory stays bounded
+    regardless of the number of rows. Sparse cells (ss:Index) and merged
+    cells (ss:MergeAcross) are expanded so list positions match columns.
+    
+    Raises:
+        ValueError: if the file has no worksheet or no table.
+    """
+    found_sheet = False
+    has_table = False
+    table = None
+    
+    for event, elem in ET.iterparse(_open_source(file_content), events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == WORKSHEET_TAG:
+                found_sheet = True
+            elif elem.tag == TABLE_TAG and found_sheet and table is None:
+                table = elem
+            continue
         
-        root = ET.fromstring(file_content)
+        if elem.tag == ROW_TAG and table is not None:
+            yield _row_values(elem)
+            # Release the row: rows are direct children of Table
+            elem.clear()
+            table.remove(elem)
+        elif elem.tag == WORKSHEET_TAG:
+            if not all_sheets:
+                break  # Only the first worksheet
+            if table is not None:
+                has_table = True
+            table = None
+            elem.clear()
+    
+    if not found_sheet:
+        raise ValueError("No worksheet found")
+    if table is None and not has_table:
+        raise ValueError("No table found")
+
+
+def _row_values(row):
+    values = []
+    for cell in row:
+        if cell.tag != CELL_TAG:
+            continue
+        index = cell.get(INDEX_ATTR)
+        if index:
+            # ss:Index is 1-based and skips empty columns
+            values.extend([None] * (int(index) - 1 - len(values)))
+        data = next(cell.iter(DATA_TAG), None)
+        values.append(data.text if data is not None else None)
+        merge = cell.get(MERGE_ACROSS_ATTR)
+        if merge:
+            values.extend([None] * int(merge))
+    return values
+
+
+def _cell(values, index, type_conversion=None):
+    """Gets a cell value safely, returning None for empty/invalid cells"""
+    if index < len(values) and values[index]:
+        val = values[index]
+        if type_conversion:
+            try:
+                return type_conversion(val)
+            except:
+                return None
+        return val
+    return None
+
+
+def _is_installment_str(s):
+    # Heuristic to find Installment Details ("999 x 9" pattern)
+    return s and 'x' in str(s).lower() and any(c.isdigit() for c in str(s))
+
+
+def iter_excel_xml(file_content, all_sheets=False):
+    """
+    Streams the items of an Excel 2003 XML file, one dict per valid row.
+    
+    Args:
+        file_content: bytes, string or a binary file-like object (e.g. the Streamlit upload).
+        all_sheets: read every worksheet instead of only the first one.
         
-        # Find the first worksheet
-        worksheet = root.find('.//ss:Worksheet', namespaces)
-        if worksheet is None:
-            return {"error": "No worksheet found"}
-            
-        table = worksheet.find('.//ss:Table', namespaces)
-        if table is None:
-            return {"error": "No table found"}
-            
-        rows = table.findall('.//ss:Row', namespaces)
+    Yields:
+        dict: item with description, value, date, entry_value, installment_details and type.
+    """
+    for values in iter_rows(file_content, all_sheets):
+        if not values:
+            continue
+        # Skip headers (simplified heuristic: first cell is "DÍVIDAS" or similar), one per worksheet
+        if values[0] and values[0].strip().upper() in HEADER_LABELS:
+            continue
+        item = _build_item(values)
+        if item:
+            yield item
+
+
+def _build_item(values):
+    """Maps a row (list of cell texts) to an item dict, or None if the row is not an item"""
+    # Mapping based on DIVIDAS-GIGI.xml structure:
+    # Cell 0: Description
+    # Cell 1: Total Value / Installment Value
+    # Cell 2: Date
+    # Cell 3: Entry Value (optional) OR Installment Details (if misplaced)
+    # Cell 4: Installment Details (optional)
+    
+    description = _cell(values, 0, str)
+    value = _cell(values, 1, float)
+    date_str = _cell(values, 2, str)
+    
+    col3_raw = _cell(values, 3, str)
+    col4_raw = _cell(values, 4, str)
+    
+    entry_value = None
+    installment_details = None
+    
+    if _is_installment_str(col4_raw):
+        installment_details = col4_raw
+        # Try to parse entry value from col3 if it's a number
+        try:
+            entry_value = float(col3_raw)
+        except:
+            pass
+    elif _is_installment_str(col3_raw):
+        # Misplaced installment details in col3
+        installment_details = col3_raw
+        entry_value = None
+    else:
+        # No installments found, try to parse col3 as entry value
+        if col3_raw:
+            try:
+                entry_value = float(col3_raw)
+            except:
+                pass
+    
+    if not description or value is None:
+        return None
         
-        items = []
+    # Parse Date
+    date_obj = None
+    if date_str:
+        try:
+            # Excel XML dates are usually ISO format 2026-01-19T00:00:00.000
+            date_obj = datetime.fromisoformat(date_str).date()
+        except ValueError:
+            pass
+    
+    item = {
+        "description": description,
+        "value": value,
+        "date": date_obj,
+        "entry_value": entry_value,
+        "installment_details": installment_details,
+        "type": "undefined"
+    }
+    
+    # Logic to distinguish Debt vs Recurring vs One-time
+    # If it has installment details (e.g., "x 2"), it's likely a Debt installment plan
+    if installment_details and 'x' in installment_details.lower():
+        item["type"] = "debt"
+        # Parse "964,00 x 2" -> Value per installment X Num installments
+        try:
+            parts = installment_details.lower().split('x')
+            inst_val_str = parts[0].strip().replace('.','').replace(',','.')
+            num_inst = int(parts[1].strip())
+            item["installments_count"] = num_inst
+            item["installment_value"] = float(inst_val_str) if inst_val_str else value
+        except:
+            item["installments_count"] = 1
+            item["installment_value"] = value
+    elif date_obj and date_obj.day <= 10: # Heuristic: bills usually due early month
+        item["type"] = "recurring"
+    else:
+        item["type"] = "expense" # Default to single expense
         
-        # Skip header if present (simplified heuristic: checks if first row has "DÍVIDAS" or similar)
-        start_row_index = 0
-        first_row_cells = rows[0].findall('.//ss:Cell', namespaces)
-        if first_row_cells and first_row_cells[0].find('.//ss:Data', namespaces).text.strip().upper() in ['DÍVIDAS', 'DESCRIÇÃO']:
-            start_row_index = 1
-            
-        for row in rows[start_row_index:]:
-            cells = row.findall('.//ss:Cell', namespaces)
-            if not cells:
-                continue
-                
-            # Helper to get cell data safely
-            def get_cell_data(index, type_conversion=None):
-                if index < len(cells):
-                    data_elem = cells[index].find('.//ss:Data', namespaces)
-                    if data_elem is not None and data_elem.text:
-                        val = data_elem.text
-                        if type_conversion:
-                            try:
-                                return type_conversion(val)
-                            except:
-                                return None
-                        return val
-                return None
+    return item
+
+
+# --- Format registry ---
+
+Importer = namedtuple('Importer', 'name label extensions sniff iter_items')
+
+IMPORTERS = {}
+SNIFF_BYTES = 4096
+
+
+def register_importer(name, label, extensions, sniff):
+    """
+    Decorator that registers a streaming parser under `name`.
+    
+    Args:
+        label: human readable name shown in the UI.
+        extensions: file extensions (without dot) associated with the format.
+        sniff: callable(head_text) -> bool, True if the first bytes (decoded) look like this format.
+    
+    The decorated function takes a binary file-like object and yields items
+    in the same schema as `iter_excel_xml`.
+    """
+    def decorator(fn):
+        IMPORTERS[name] = Importer(name, label, tuple(extensions), sniff, fn)
+        return fn
+    return decorator
+
+
+def supported_extensions():
+    return sorted({ext for importer in IMPORTERS.values() for ext in importer.extensions})
+
+
+def _peek(source, size=SNIFF_BYTES):
+    """Returns (head bytes, source) without consuming the stream."""
+    if source.seekable():
+        position = source.tell()
+        head = source.read(size)
+        source.seek(position)
+        return head, source
+    source = io.BufferedReader(source, buffer_size=max(size, io.DEFAULT_BUFFER_SIZE))
+    return source.peek(size)[:size], source
+
+
+def _sniff_encoding(head, default='cp1252'):
+    """utf-8 if the head decodes as (possibly truncated) UTF-8, else the legacy Windows encoding banks still use."""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return default
+
+
+def detect_format(file_content, filename=None):
+    """
+    Name of the registered format for the file, by content first and then by extension.
+    
+    Raises:
+        ValueError: if no importer recognizes the file.
+    """
+    head, _ = _peek(_open_source(file_content))
+    text = head.decode(_sniff_encoding(head), errors='replace')
+    for importer in IMPORTERS.values():
+        if importer.sniff(text):
+            return importer.name
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else None
+    for importer in IMPORTERS.values():
+        if ext in importer.extensions:
+            return importer.name
+    raise ValueError("Unrecognized file format")
 
-            # Mapping based on DIVIDAS-GIGI.xml structure:
-            # Cell 0: Description
-            # Cell 1: Total Value / Installment Value
-            # Cell 2: Date
-            # Cell 3: Entry Value (optional) OR Installment Details (if misplaced)
-            # Cell 4: Installment Details (optional)
-            
-            description = get_cell_data(0, str)
-            value = get_cell_data(1, float)
-            date_str = get_cell_data(2, str)
-            
-            col3_raw = get_cell_data(3, str)
-            col4_raw = get_cell_data(4, str)
-            
-            entry_value = None
-            installment_details = None
-            
-            # Heuristic to find Installment Details ("999 x 9" pattern)
-            def is_installment_str(s):
-                return s and 'x' in str(s).lower() and any(c.isdigit() for c in str(s))
-            
-            if is_installment_str(col4_raw):
-                installment_details = col4_raw
-                # Try to parse entry value from col3 if it's a number
-                try:
-                    entry_value = float(col3_raw)
-                except:
-                    pass
-            elif is_installment_str(col3_raw):
-                # Misplaced installment details in col3
-                installment_details = col3_raw
-                entry_value = None
-            else:
-                # No installments found, try to parse col3 as entry value
-                if col3_raw:
-                    try:
-                        entry_value = float(col3_raw)
-                    except:
-                        pass
-            
-            if not description or value is None:
-                continue
-                
-            # Parse Date
-            date_obj = None
-            if date_str:
-                try:
-                    # Excel XML dates are usually ISO format 2026-01-19T00:00:00.000
-                    date_obj = datetime.fromisoformat(date_str).date()
-                except ValueError:
-                    pass
-            
-            item = {
-                "description": description,
-                "value": value,
-                "date": date_obj,
-                "entry_value": entry_value,
-                "installment_details": installment_details,
-                "type": "undefined"
-            }
-            
-            # Logic to distinguish Debt vs Recurring vs One-time
-            # If it has installment details (e.g., "x 2"), it's likely a Debt installment plan
-            if installment_details and 'x' in installment_details.lower():
-                item["type"] = "debt"
-                # Parse "964,00 x 2" -> Value per installment X Num installments
-                try:
-                    parts = installment_details.lower().split('x')
-                    inst_val_str = parts[0].strip().replace('.','').replace(',','.')
-                    num_inst = int(parts[1].strip())
-                    item["installments_count"] = num_inst
-                    item["installment_value"] = float(inst_val_str) if inst_val_str else value
-                except:
-                    item["installments_count"] = 1
-                    item["installment_value"] = value
-            elif date_obj and date_obj.day <= 10: # Heuristic: bills usually due early month
-                item["type"] = "recurring"
-            else:
-                item["type"] = "expense" # Default to single expense
-                
-            items.append(item)
-            
-        return {"items": items}
 
+def parse_file(file_content, filename=None, format=None):
+    """
+    Like `parse_excel_xml` for any registered format.
+    
+    Returns:
+        dict: {"items": [...], "format": name} on success or {"error": "..."} on failure.
+    """
+    try:
+        source = _open_source(file_content)
+        name = format or detect_format(source, filename)
+        return {"items": list(IMPORTERS[name].iter_items(source)), "format": name}
     except Exception as e:
         return {"error": str(e)}
+
+
+def _candidate_encodings(encoding):
+    """A sniffed utf-8 only covers the first bytes: fall back to the legacy encoding for the rest."""
+    return [encoding, 'cp1252'] if encoding == 'utf-8' else [encoding]
+
+
+def _decoded(source, encodings, parse):
+    """
+    Yields from `parse(text stream)`, decoding `source` strictly with the first
+    of `encodings`. On a decoding error the whole stream is read again with the
+    next one (seekable sources only), skipping what was already yielded: the
+    line structure is ASCII, so both passes produce the same sequence.
+    """
+    start = source.tell() if source.seekable() else None
+    yielded = 0
+    for attempt, encoding in enumerate(encodings):
+        # newline='' leaves line endings to the parsers (csv needs them untranslated)
+        stream = io.TextIOWrapper(source, encoding=encoding, newline='')
+        try:
+            for i, value in enumerate(parse(stream)):
+                if i >= yielded:
+                    yield value
+                    yielded += 1
+            return
+        except UnicodeDecodeError:
+            if start is None or attempt == len(encodings) - 1:
+                raise
+            source.seek(start)
+        finally:
+            # Leave the caller's file open (TextIOWrapper closes it otherwise)
+            stream.detach()
+
+
+# --- Brazilian formats ---
+
+def parse_brl_number(text):
+    """
+    Parses amounts as exported by Brazilian banks.
+    
+    Accepts "1.234,56", "-1.234,56", "1234.56", "R$ 1.234,56", "(1.234,56)",
+    "1.234,56-" and "1.234,56 D"/"C". With both separators the last one is
+    the decimal mark; a lone '.' followed by exactly three digits is a
+    thousands separator.
+    
+    Returns:
+        float, or None if the text is not a number.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    s = text.strip().upper().replace('R$', '').replace('\xa0', '').replace(' ', '')
+    if not s:
+        return None
+    negative = False
+    if s.startswith('(') and s.endswith(')'):
+        negative, s = True, s[1:-1]
+    if s[-1:] in ('D', 'C') and len(s) > 1:
+        negative, s = negative or s[-1] == 'D', s[:-1]
+    if s.endswith('-'):
+        negative, s = True, s[:-1]
+    if s.startswith(('-', '+')):
+        negative, s = negative or s[0] == '-', s[1:]
+    
+    comma, dot = s.rfind(','), s.rfind('.')
+    if comma >= 0 and dot >= 0:
+        decimal = ',' if comma > dot else '.'
+        thousands = '.' if decimal == ',' else ','
+        s = s.replace(thousands, '').replace(decimal, '.')
+    elif comma >= 0:
+        s = s.replace('.', '').replace(',', '.') if s.count(',') == 1 else s.replace(',', '')
+    elif s.count('.') > 1 or (dot >= 0 and len(s) - dot - 1 == 3):
+        s = s.replace('.', '')
+    try:
+        value = float(s)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+BR_DATE = re.compile(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{2}|\d{4})$')
+ISO_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})$')
+
+
+@lru_cache(maxsize=4096)
+def parse_brl_date(text):
+    """
+    Parses dd/mm/yyyy, dd/mm/yy, dd-mm-yyyy, dd.mm.yyyy or ISO yyyy-mm-dd into a date, or None.
+    
+    Cached: a statement has few distinct dates, so most rows are a dict lookup.
+    """
+    if not text:
+        return None
+    text = text.strip()[:10]
+    match = BR_DATE.match(text)
+    if match:
+        day, month, year = (int(g) for g in match.groups())
+        year += 2000 if year < 100 else 0
+    else:
+        match = ISO_DATE.match(text)
+        if not match:
+            return None
+        year, month, day = (int(g) for g in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _statement_item(description, amount, date_obj):
+    """Item for a bank statement line: negative amounts are expenses, positive are income."""
+    return {
+        "description": description,
+        "value": abs(amount),
+        "date": date_obj,
+        "entry_value": None,
+        "installment_details": None,
+        "type": "expense" if amount < 0 else "income"
+    }
+
+
+# --- Excel 2003 XML ---
+
+def _sniff_excel_xml(head):
+    return 'urn:schemas-microsoft-com:office:spreadsheet' in head
+
+
+@register_importer('excel_xml', 'Planilha XML (Excel 2003)', ('xml',), _sniff_excel_xml)
+def iter_workbook(file_content):
+    """Items of every worksheet of an Excel 2003 XML workbook."""
+    return iter_excel_xml(file_content, all_sheets=True)
+
+
+# --- OFX ---
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_CHUNK = 64 * 1024
+OFX_HEADER_FIELD = re.compile(rb'^(ENCODING|CHARSET):[ \t]*([A-Za-z0-9_-]+)', re.MULTILINE)
+XML_ENCODING = re.compile(rb'<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)')
+
+
+def _sniff_ofx(head):
+    return 'OFXHEADER' in head or '<OFX>' in head.upper()
+
+
+def _parse_ofx_amount(text):
+    # The spec has no thousands separator; Brazilian banks often use ',' as decimal mark
+    try:
+        return float(text.strip().replace(',', '.'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _parse_ofx_date(text):
+    # YYYYMMDD[HHMMSS[.XXX]][[-3:BRT]]
+    text = text.strip()
+    try:
+        return date(int(text[:4]), int(text[4:6]), int(text[6:8]))
+    except ValueError:
+        return None
+
+
+def _ofx_encoding(head):
+    """
+    Encoding declared by the OFX header: ENCODING/CHARSET in the SGML (1.x)
+    header (CHARSET:1252 is Windows-1252) or the XML declaration (2.x).
+    None when the header says nothing usable.
+    """
+    header = dict(OFX_HEADER_FIELD.findall(head))
+    xml = XML_ENCODING.search(head)
+    if xml:
+        declared = xml.group(1)
+    elif header.get(b'ENCODING', b'').upper().replace(b'-', b'') == b'UTF8':
+        declared = b'utf-8'
+    else:
+        charset = header.get(b'CHARSET', b'')
+        declared = b'cp' + charset if charset.isdigit() else charset
+    try:
+        return codecs.lookup(declared.decode('ascii')).name if declared else None
+    except (LookupError, UnicodeDecodeError):
+        return None  # CHARSET:NONE and the like
+
+
+def iter_ofx_tags(file_content):
+    """
+    Streams (tag, text) pairs of an OFX file, SGML (1.x) or XML (2.x).
+    
+    Closing tags are yielded as ('/TAG', ''). Reads fixed-size chunks and
+    keeps only the unfinished tail between them, so memory is bounded. The
+    text is decoded with the encoding the header declares, or sniffed.
+    """
+    head, source = _peek(_open_source(file_content))
+    declared = _ofx_encoding(head)
+    encodings = [declared] if declared else _candidate_encodings(_sniff_encoding(head))
+    return _decoded(source, encodings, _ofx_tags)
+
+
+def _ofx_tags(stream):
+    tail = ''
+    while True:
+        chunk = stream.read(OFX_CHUNK)
+        buffer = tail + chunk
+        # Keep the last (possibly incomplete) tag for the next chunk
+        cut = max(buffer.rfind('<'), 0) if chunk else len(buffer)
+        position = 0
+        for match in OFX_TAG.finditer(buffer, 0, cut):
+            closing, tag, text = match.groups()
+            yield (('/' if closing else '') + tag.upper(), text.strip())
+            position = match.end()
+        tail = buffer[position:] if chunk else ''
+        if not chunk:
+            break
+
+
+@register_importer('ofx', 'Extrato OFX', ('ofx', 'qfx'), _sniff_ofx)
+def iter_ofx(file_content):
+    """
+    Streams the transactions (STMTTRN) of an OFX bank or credit card statement.
+    
+    Yields:
+        dict: item with description (MEMO or NAME), absolute value, date and type
+        "expense" (negative TRNAMT) or "income".
+    """
+    current = None
+    for tag, text in iter_ofx_tags(file_content):
+        if tag == 'STMTTRN':
+            current = {}
+        elif tag == '/STMTTRN' and current is not None:
+            amount = _parse_ofx_amount(current.get('TRNAMT'))
+            date_obj = _parse_ofx_date(current.get('DTPOSTED', ''))
+            description = current.get('MEMO') or current.get('NAME')
+            if amount and date_obj and description:
+                yield _statement_item(description, amount, date_obj)
+            current = None
+        elif current is not None and text and not tag.startswith('/'):
+            current[tag] = text
+
+
+# --- Bank CSV ---
+
+CSV_COLUMNS = {
+    'date': ('data', 'data lancamento', 'data do lancamento', 'data movimento', 'data da compra', 'date', 'dt'),
+    'description': ('descricao', 'historico', 'lancamento', 'estabelecimento', 'titulo', 'title', 'memo', 'description', 'detalhes'),
+    'value': ('valor', 'quantia', 'amount', 'value'),
+    'debit': ('debito', 'saida', 'saidas', 'valor debito'),
+    'credit': ('credito', 'entrada', 'entradas', 'valor credito'),
+}
+# Balance lines some banks put among the transactions
+CSV_SKIP = re.compile(r'^(s ?a ?l ?d ?o|saldo)\b', re.IGNORECASE)
+CSV_HEADER_SCAN = 30
+
+
+def _normalize_label(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    # "Valor (R$)" -> "valor"
+    return ' '.join(re.sub(r'[^a-z0-9 ]', ' ', text.lower().replace('r$', '')).split())
+
+
+def _csv_columns(header):
+    """Maps a header row to {'date': i, 'description': i, 'value'|'debit'/'credit': i}, or None."""
+    labels = [_normalize_label(h) for h in header]
+    columns = {}
+    for key, aliases in CSV_COLUMNS.items():
+        for i, label in enumerate(labels):
+            if label in aliases and i not in columns.values():
+                columns[key] = i
+                break
+    if 'date' in columns and 'description' in columns and ('value' in columns or 'debit' in columns or 'credit' in columns):
+        return columns
+    return None
+
+
+def _sniff_csv(head):
+    first_lines = head.splitlines()[:CSV_HEADER_SCAN]
+    return any(
+        _csv_columns(next(csv.reader([line], delimiter=_csv_delimiter(line)))) for line in first_lines if line.strip()
+    )
+
+
+def _csv_delimiter(line):
+    return max((';', ',', '\t', '|'), key=line.count)
+
+
+@register_importer('csv', 'Extrato CSV', ('csv', 'txt'), _sniff_csv)
+def iter_bank_csv(file_content):
+    """
+    Streams the lines of a bank statement exported as CSV.
+    
+    The delimiter (; , tab or |) and the header row are detected from the
+    first lines, so preambles like account name and period are skipped. The
+    amount comes from a single signed column or from separate debit/credit
+    columns; balance lines ("Saldo", "S A L D O") are ignored.
+    
+    The text is decoded strictly: as utf-8 when the first bytes allow it,
+    and the whole file again as cp1252 if a later byte does not.
+    
+    Yields:
+        dict: item with description, absolute value, date and type "expense" or "income".
+    """
+    head, source = _peek(_open_source(file_content))
+    return _decoded(source, _candidate_encodings(_sniff_encoding(head)), _bank_csv_items)
+
+
+def _bank_csv_items(stream):
+    columns = None
+    reader = None
+    for n, line in enumerate(stream):
+        if n >= CSV_HEADER_SCAN:
+            break
+        if not line.strip():
+            continue
+        delimiter = _csv_delimiter(line)
+        columns = _csv_columns(next(csv.reader([line], delimiter=delimiter)))
+        if columns:
+            reader = csv.reader(stream, delimiter=delimiter)
+            break
+    if reader is None:
+        raise ValueError("No header with date, description and amount columns found")
+    
+    for values in reader:
+        item = _csv_item(values, columns)
+        if item:
+            yield item
+
+
+def _csv_item(values, columns):
+    def cell(key):
+        i = columns.get(key)
+        return values[i].strip() if i is not None and i < len(values) else ''
+    
+    description = cell('description')
+    date_obj = parse_brl_date(cell('date'))
+    if not description or not date_obj or CSV_SKIP.match(description):
+        return None
+    if 'value' in columns:
+        amount = parse_brl_number(cell('value'))
+    else:
+        debit, credit = parse_brl_number(cell('debit')), parse_brl_number(cell('credit'))
+        amount = (credit or 0.0) - abs(debit or 0.0)
+    if not amount:
+        return None
+    return _statement_item(description, amount, date_obj)
+